@@ -0,0 +1,57 @@
+"""Setup shared by the benchmarks: a scratch working directory and an in-process ASGI driver.
+
+Import this before the server module, which opens leaderboard.db in the
+working directory on import. The scratch directory is removed on exit.
+"""
+import atexit
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# Paths given on the command line are relative to where the benchmark was started
+LAUNCH_DIR = Path.cwd()
+_workdir = tempfile.TemporaryDirectory(prefix="maze-bench-")
+atexit.register(_workdir.cleanup)
+os.chdir(_workdir.name)
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.responses import PlainTextResponse  # noqa: E402
+
+
+def build_app(*middleware):
+    """A one-route app (GET /ping) wrapped in ``middleware``, the first one innermost"""
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return PlainTextResponse("pong")
+
+    for cls in middleware:
+        app.add_middleware(cls)
+    return app
+
+
+async def drive(app, requests: int) -> float:
+    """Seconds per request over ``requests`` calls of GET /ping, straight into the ASGI app"""
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/ping", "raw_path": b"/ping", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    for _ in range(200):  # warm up routing and the middleware stack
+        await app(dict(scope), receive, send)
+    started = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), receive, send)
+    return (time.perf_counter() - started) / requests
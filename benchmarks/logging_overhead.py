@@ -0,0 +1,83 @@
+"""Request throughput with the access log off, queued, and written inline.
+
+Drives a one-route ASGI app directly (no sockets, no HTTP client) and logs
+every request (no sampling) to a file:
+
+- off: no AccessLogMiddleware
+- queued: the server's setup, records handed to its batching writer thread
+- inline: a plain StreamHandler formatting and writing on the loop thread
+
+--sink-delay-ms makes every write sleep, standing in for a stdout pipe whose
+reader (a terminal, a log shipper) has fallen behind.
+
+    python benchmarks/logging_overhead.py [--requests 20000] [--sink PATH] [--sink-delay-ms 0]
+"""
+import argparse
+import asyncio
+import logging
+import queue
+import time
+
+from _harness import LAUNCH_DIR, build_app, drive
+import maze_game_standalone as server
+
+
+class SlowSink:
+    """A file whose writes take at least ``delay_s``"""
+
+    def __init__(self, stream, delay_s: float) -> None:
+        self.stream = stream
+        self.delay_s = delay_s
+
+    def write(self, text: str) -> None:
+        time.sleep(self.delay_s)
+        self.stream.write(text)
+
+    def flush(self) -> None:
+        self.stream.flush()
+
+
+def use_handler(handler: logging.Handler) -> None:
+    handler.addFilter(server.RequestIdFilter())
+    logging.getLogger().handlers[:] = [handler]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--sink", help="file the log lines go to (default: a scratch file)")
+    parser.add_argument("--sink-delay-ms", type=float, default=0.0, help="extra time each write takes")
+    args = parser.parse_args()
+
+    # Log every request
+    server.access_log_rates.clear()
+    logging.getLogger().setLevel(logging.INFO)
+    # Stands in for setup_logging(), which would also stop buffering the import-time records
+    server.logger.removeHandler(server._startup_log_buffer)
+    sink = open(LAUNCH_DIR / args.sink if args.sink else "access.log", "a")
+    output = logging.StreamHandler(SlowSink(sink, args.sink_delay_ms / 1000) if args.sink_delay_ms else sink)
+    output.setFormatter(server.JsonFormatter())
+
+    off = 1 / asyncio.run(drive(build_app(), args.requests))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    writer = server.BatchingLogWriter(records, output)
+    writer.start()
+    use_handler(server.DeferredQueueHandler(records))
+    queued = 1 / asyncio.run(drive(build_app(server.AccessLogMiddleware), args.requests))
+    drain_started = time.perf_counter()
+    writer.stop()
+    drain_ms = (time.perf_counter() - drain_started) * 1000
+
+    use_handler(output)
+    inline = 1 / asyncio.run(drive(build_app(server.AccessLogMiddleware), args.requests))
+    sink.close()
+
+    print(f"access log off        {off:10.0f} req/s")
+    print(f"access log, queued    {queued:10.0f} req/s  ({(queued - off) / off * 100:+.1f}%, "
+          f"writer drained the backlog in {drain_ms:.0f} ms)")
+    print(f"access log, inline    {inline:10.0f} req/s  ({(inline - off) / off * 100:+.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
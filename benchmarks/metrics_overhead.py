@@ -0,0 +1,48 @@
+"""Per-request cost of the /metrics instrumentation.
+
+Times the registry primitives on their own, then drives a one-route ASGI app
+directly (no sockets, no HTTP client) with and without MetricsMiddleware and
+reports the difference per request.
+
+    python benchmarks/metrics_overhead.py [--requests 20000]
+"""
+import argparse
+import asyncio
+import timeit
+
+from _harness import build_app, drive
+import maze_game_standalone as server
+
+
+def per_call_ns(stmt, number: int = 200_000) -> float:
+    return min(timeit.repeat(stmt, number=number, repeat=5)) / number * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    counter = server.metrics.counter("bench_total", "benchmark counter", ("route",))
+    histogram = server.metrics.histogram("bench_seconds", "benchmark histogram", ("route",))
+    print(f"Counter.inc             {per_call_ns(lambda: counter.inc('/ping')):8.0f} ns")
+    print(f"Histogram.observe       {per_call_ns(lambda: histogram.observe(0.003, '/ping')):8.0f} ns")
+
+    def timed_block():
+        with server.db_timer("bench"):
+            pass
+    print(f"db_timer block          {per_call_ns(timed_block):8.0f} ns")
+
+    async def compare():
+        plain = await drive(build_app(), args.requests) * 1e6
+        instrumented = await drive(build_app(server.MetricsMiddleware), args.requests) * 1e6
+        return plain, instrumented
+    plain, instrumented = asyncio.run(compare())
+    print(f"request, plain          {plain:8.1f} us")
+    print(f"request, instrumented   {instrumented:8.1f} us")
+    print(f"instrumentation cost    {instrumented - plain:8.1f} us/request "
+          f"({(instrumented - plain) / plain * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Microbenchmarks for the game's hot paths, with a regression check.
+
+Covers maze generation at several sizes, move checks, rendering a frame
+through a call-counting stand-in for the canvas 2D context (no browser, no
+Pyodide), and leaderboard queries against a synthetic database.
+
+    python benchmarks/suite.py [--rows 1000000] [--only maze,move,render,leaderboard] [--out results.json]
+    python benchmarks/suite.py --compare baseline.json [current.json] [--threshold 0.10]
+
+Compare mode runs the suite (or reads current.json) and exits non-zero when a
+result is worse than the baseline by more than the threshold.
+"""
+import argparse
+import json
+import platform
+import random
+import sqlite3
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, List
+
+from _harness import LAUNCH_DIR
+import maze_engine
+import maze_game_standalone as server
+
+GROUPS = ("maze", "move", "render", "leaderboard")
+MAZE_SIZES = (10, 20, 50, 100)
+RENDER_SIZES = (20, 50)
+MOVES = 20_000
+REPEAT = 5
+
+
+class CountingContext:
+    """Stands in for a CanvasRenderingContext2D and counts every method call"""
+
+    def __init__(self) -> None:
+        self.calls: Dict[str, int] = {}
+
+    def __getattr__(self, name: str):
+        calls = self.calls
+
+        def method(*args):
+            calls[name] = calls.get(name, 0) + 1
+        # Cache it so later lookups cost what a real method lookup does
+        self.__dict__[name] = method
+        return method
+
+    def total(self) -> int:
+        return sum(self.calls.values())
+
+
+def best_of(fn: Callable[[], None], number: int = 1, repeat: int = REPEAT) -> float:
+    """Fastest per-call time in seconds over ``repeat`` runs of ``number`` calls"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def result(value: float, unit: str) -> Dict[str, object]:
+    return {"value": round(value, 3), "unit": unit}
+
+
+def bench_maze() -> Dict[str, Dict[str, object]]:
+    results = {}
+    for size in MAZE_SIZES:
+        rng = random.Random(size)
+        number = max(1, 2000 // (size * size) * 10)
+        seconds = best_of(lambda: maze_engine.generate_maze(size, size, rng), number)
+        results[f"generate_maze_{size}x{size}"] = result(seconds * 1e3, "ms")
+    return results
+
+
+def playing_state(size: int) -> maze_engine.GameState:
+    state = maze_engine.GameState()
+    walls = maze_engine.generate_maze(size, size, random.Random(7))
+    maze_engine.start_game(state, walls, size, size, now=0.0)
+    return state
+
+
+def bench_move() -> Dict[str, Dict[str, object]]:
+    size = 20
+    state = playing_state(size)
+    rng = random.Random(3)
+    names = [direction for direction, _, _ in maze_engine.DIRECTIONS]
+    checks = [(rng.randrange(size), rng.randrange(size), rng.choice(names)) for _ in range(MOVES)]
+    moves = [rng.choice(names) for _ in range(MOVES)]
+
+    def run_checks():
+        for x, y, direction in checks:
+            maze_engine.can_move_to(state, x, y, direction)
+
+    def run_moves():
+        # A random walk; bumping into walls is part of the realistic mix
+        state.player_cell = list(maze_engine.START_POS)
+        state.finished = False
+        for direction in moves:
+            maze_engine.try_move(state, direction, now=0.0)
+
+    return {
+        "can_move_to": result(best_of(run_checks) / MOVES * 1e9, "ns"),
+        "try_move": result(best_of(run_moves) / MOVES * 1e9, "ns"),
+    }
+
+
+def bench_render() -> Dict[str, Dict[str, object]]:
+    results = {}
+    for size in RENDER_SIZES:
+        state = playing_state(size)
+        ctx = CountingContext()
+        cell = maze_engine.CELL_PIXELS
+        renderer = maze_engine.CanvasRenderer(ctx, size * cell, size * cell)
+        renderer.render(state)
+        results[f"render_calls_{size}x{size}"] = result(ctx.total(), "calls/frame")
+        results[f"render_{size}x{size}"] = result(best_of(lambda: renderer.render(state), 20) * 1e6, "us")
+    return results
+
+
+def populate_leaderboard(rows: int) -> Dict[str, object]:
+    """Fill scores and both rollups with ``rows`` runs from rows // 2 players"""
+    config = server.DEFAULT_CONFIG
+    now = datetime.now(timezone.utc)
+    created = now.strftime("%Y-%m-%d %H:%M:%S")
+    players = max(1, rows // 2)
+    rng = random.Random(11)
+    conn = sqlite3.connect(server.DATABASE_FILE)
+    with conn:
+        conn.executemany(
+            "INSERT INTO scores (name, time, created_at, config) VALUES (?, ?, ?, ?)",
+            ((f"player-{i % players}", round(rng.uniform(5, 600), 2), created, config) for i in range(rows)),
+        )
+        conn.execute(
+            "INSERT INTO board_best (config, name, time) SELECT config, name, MIN(time) FROM scores GROUP BY config, name"
+        )
+        for board in ("daily", "weekly"):
+            conn.execute(
+                "INSERT INTO board_period_best (config, period, name, time) "
+                "SELECT config, ?, name, time FROM board_best",
+                (server.period_key(board, now),),
+            )
+    middle = conn.execute(
+        "SELECT time, name FROM board_best WHERE config = ? ORDER BY time, name LIMIT 1 OFFSET ?",
+        (config, players // 2),
+    ).fetchone()
+    # Ties share a rank: one more than the players strictly faster
+    ahead = conn.execute("SELECT COUNT(*) FROM board_best WHERE config = ? AND time < ?", (config, middle[0])).fetchone()[0]
+    conn.close()
+    return {"config": config, "period": server.period_key("daily", now), "middle": tuple(middle),
+            "middle_rank": ahead + 1, "players": players}
+
+
+def bench_leaderboard(rows: int) -> Dict[str, Dict[str, object]]:
+    started = time.perf_counter()
+    db = populate_leaderboard(rows)
+    print(f"  synthetic leaderboard: {rows} scores in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    config = db["config"]
+    # The rows went in behind the server's back: load them into the rank
+    # index outside the timed region, and make sure it ranks them right
+    server.rebuild_rank_indexes()
+    ranked = server.get_rank_index(config).rank(db["middle"][1], db["middle"][0])
+    if (ranked["rank"], ranked["total"]) != (db["middle_rank"], db["players"]):
+        raise RuntimeError(f"rank index is off: got {ranked}, expected rank {db['middle_rank']} of {db['players']}")
+    names = iter(range(10**9))
+    return {
+        "leaderboard_first_page": result(best_of(lambda: server.get_leaderboard_scores(config=config), 50) * 1e6, "us"),
+        "leaderboard_deep_page": result(
+            best_of(lambda: server.get_leaderboard_scores(after=db["middle"], config=config), 50) * 1e6, "us"),
+        "leaderboard_period_page": result(
+            best_of(lambda: server.get_leaderboard_scores(period=db["period"], config=config), 50) * 1e6, "us"),
+        "rank_lookup": result(
+            best_of(lambda: server.get_rank_index(config).rank(db["middle"][1], db["middle"][0]), 1000) * 1e6, "us"),
+        "save_score": result(
+            best_of(lambda: server.save_score(f"bench-{next(names)}", 42.0), 20) * 1e3, "ms"),
+    }
+
+
+def run_suite(groups: List[str], rows: int) -> Dict[str, object]:
+    results: Dict[str, Dict[str, object]] = {}
+    for group in groups:
+        print(f"⏱️  {group}", file=sys.stderr)
+        if group == "leaderboard":
+            results.update(bench_leaderboard(rows))
+        else:
+            results.update(globals()[f"bench_{group}"]())
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "rows": rows,
+            "at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+def compare(baseline: Dict[str, object], current: Dict[str, object], threshold: float) -> List[str]:
+    """Print a side-by-side table; return the names that regressed (every metric is lower-is-better)"""
+    regressions = []
+    for name, base in baseline["results"].items():
+        now = current["results"].get(name)
+        if now is None:
+            continue
+        change = (now["value"] - base["value"]) / base["value"] if base["value"] else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  ❌ regression"
+            regressions.append(name)
+        elif change < -threshold:
+            flag = "  ✅ faster"
+        print(f"{name:28} {base['value']:>12} {now['value']:>12} {now['unit']:12} {change:+7.1%}{flag}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", default=",".join(GROUPS), help="comma-separated groups: " + ",".join(GROUPS))
+    parser.add_argument("--rows", type=int, default=1_000_000, help="synthetic scores for the leaderboard group")
+    parser.add_argument("--out", help="write the results JSON here (default: stdout)")
+    parser.add_argument("--compare", nargs="+", metavar="JSON",
+                        help="baseline results, optionally followed by current results instead of a fresh run")
+    parser.add_argument("--threshold", type=float, default=0.10, help="relative slowdown that counts as a regression")
+    args = parser.parse_args()
+    groups = [group.strip() for group in args.only.split(",") if group.strip()]
+    unknown = set(groups) - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown group(s): {', '.join(sorted(unknown))}")
+
+    if args.compare and len(args.compare) > 1:
+        current = json.loads((LAUNCH_DIR / args.compare[1]).read_text())
+    else:
+        current = run_suite(groups, args.rows)
+    text = json.dumps(current, indent=2)
+    if args.out:
+        (LAUNCH_DIR / args.out).write_text(text + "\n")
+    elif not args.compare:
+        print(text)
+
+    if args.compare:
+        baseline = json.loads((LAUNCH_DIR / args.compare[0]).read_text())
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
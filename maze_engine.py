@@ -0,0 +1,390 @@
+"""Headless Maze Runner engine: maze generation, movement and win detection.
+
+Pure Python with no browser or server dependencies. The Pyodide client
+(static/game.py), the server and plain CPython scripts (benchmarks, bots)
+all import this module. The engine reports back through a
+``GameCallbacks`` object, and ``CanvasRenderer`` draws on anything with
+the 2D canvas context methods.
+"""
+import random
+import time
+import uuid
+from typing import Dict, Iterator, List, Optional, Tuple
+
+Cell = Tuple[int, int]
+Walls = Dict[Cell, Dict[str, bool]]
+
+START_POS = (0, 0)
+# Neighbour order is part of the generator: a seeded rng only reproduces a
+# maze if candidates are listed in the same order
+DIRECTIONS = (('N', 0, -1), ('S', 0, 1), ('E', 1, 0), ('W', -1, 0))
+STEPS = {direction: (dx, dy) for direction, dx, dy in DIRECTIONS}
+OPPOSITE = {'N': 'S', 'S': 'N', 'E': 'W', 'W': 'E'}
+
+DEFAULT_PLAYER_COLOR = "#22c55e"
+PATH_COLOR = "#0f172a"
+WALL_COLOR = "#334155"
+WALL_THICKNESS = 2
+CELL_PIXELS = 32
+
+
+# ------------------------------ State ------------------------------
+class GameState:
+    def __init__(self) -> None:
+        self.player_name: str = ""
+        self.player_color: str = DEFAULT_PLAYER_COLOR  # Player's chosen color
+        self.player_shape: str = "circle"  # Player's chosen shape
+        self.grid_width: int = 20
+        self.grid_height: int = 20
+        self.maze_walls: Optional[Walls] = None  # dict with walls per cell
+        self.player_cell = list(START_POS)
+        self.start_time_s: Optional[float] = None
+        self.finished: bool = False
+        self.final_time_s: float = 0.0
+        self.submitted: bool = False
+        # Sent with the score so retries and replays of one run are recorded once
+        self.run_id: str = ""
+        self.maze_generating: bool = False
+        # Double buffer: the next game's maze, built while this one is idle
+        self.next_maze: Optional["MazeBuild"] = None
+
+    @property
+    def exit_cell(self) -> Cell:
+        return (self.grid_width - 1, self.grid_height - 1)
+
+
+class GameCallbacks:
+    """Render/IO hooks the engine calls; subclasses override what they need"""
+
+    def render(self, state: GameState) -> None:
+        pass
+
+    def moved(self, state: GameState) -> None:
+        pass
+
+    def won(self, state: GameState) -> None:
+        pass
+
+
+NO_CALLBACKS = GameCallbacks()
+
+
+# ------------------------------ Maze Generation ------------------------------
+# Maze represented with walls for each cell: dict keyed by (x,y) -> {N,S,E,W: bool}
+# True means wall exists
+
+def new_walls(width: int, height: int) -> Walls:
+    """Every cell closed on all four sides"""
+    return {(x, y): {'N': True, 'S': True, 'E': True, 'W': True}
+            for y in range(height) for x in range(width)}
+
+
+def iter_carves(width: int, height: int, rng: Optional[random.Random] = None) -> Iterator[Tuple[int, int, str]]:
+    """Yield the walls a randomized depth-first search removes, in order.
+
+    Each item is ``(x, y, direction)``: the wall on ``direction`` side of
+    cell (x, y), whose neighbour is visited next. There are width*height - 1
+    carves, so the progress of a build is easy to compute.
+    """
+    rng = rng or random
+    visited = {START_POS}
+    stack = [START_POS]
+    while stack:
+        cx, cy = stack[-1]
+        unvisited_neighbors = []
+        for direction, dx, dy in DIRECTIONS:
+            nx, ny = cx + dx, cy + dy
+            if 0 <= nx < width and 0 <= ny < height and (nx, ny) not in visited:
+                unvisited_neighbors.append((nx, ny, direction))
+        if unvisited_neighbors:
+            nx, ny, direction = rng.choice(unvisited_neighbors)
+            visited.add((nx, ny))
+            stack.append((nx, ny))
+            yield cx, cy, direction
+        else:
+            stack.pop()
+
+
+def carve(walls: Walls, x: int, y: int, direction: str) -> Cell:
+    """Remove the wall between (x, y) and its neighbour; return the neighbour"""
+    dx, dy = STEPS[direction]
+    walls[(x, y)][direction] = False
+    walls[(x + dx, y + dy)][OPPOSITE[direction]] = False
+    return (x + dx, y + dy)
+
+
+def generate_maze(width: int, height: int, rng: Optional[random.Random] = None) -> Walls:
+    walls = new_walls(width, height)
+    for x, y, direction in iter_carves(width, height, rng):
+        carve(walls, x, y, direction)
+    return walls
+
+
+class MazeBuild:
+    """A maze generated in slices; ``carves`` keeps the order for replaying it"""
+
+    CHECK_EVERY = 64  # carves between clock reads when running on a budget
+
+    def __init__(self, width: int, height: int, rng: Optional[random.Random] = None) -> None:
+        self.width = width
+        self.height = height
+        self.walls = new_walls(width, height)
+        self.carves: List[Tuple[int, int, str]] = []
+        self.done = False
+        self._carver = iter_carves(width, height, rng)
+
+    def advance(self, budget_s: Optional[float] = None) -> bool:
+        """Carve until finished or until ``budget_s`` has passed; returns ``done``"""
+        deadline = None if budget_s is None else time.perf_counter() + budget_s
+        for x, y, direction in self._carver:
+            carve(self.walls, x, y, direction)
+            self.carves.append((x, y, direction))
+            if (deadline is not None and len(self.carves) % self.CHECK_EVERY == 0
+                    and time.perf_counter() >= deadline):
+                return False
+        self.done = True
+        return True
+
+
+def take_next_maze(state: GameState, width: int, height: int) -> Optional[MazeBuild]:
+    """Empty the next-maze slot if it holds a finished maze of this size"""
+    build = state.next_maze
+    state.next_maze = None
+    if build is None or not build.done or (build.width, build.height) != (width, height):
+        return None
+    return build
+
+
+def walls_from_carves(width: int, height: int, carves: List[Tuple[int, int, str]]) -> Walls:
+    """Rebuild a maze from a recorded carve order (e.g. served by /api/maze)"""
+    walls = new_walls(width, height)
+    for x, y, direction in carves:
+        carve(walls, x, y, direction)
+    return walls
+
+
+# ------------------------------ Game Logic ------------------------------
+
+def start_game(state: GameState, walls: Walls, width: int, height: int, now: Optional[float] = None) -> None:
+    """Put the player on the start cell of a fresh maze and start the clock"""
+    state.grid_width = width
+    state.grid_height = height
+    state.maze_walls = walls
+    state.player_cell = list(START_POS)
+    state.start_time_s = time.time() if now is None else now
+    state.finished = False
+    state.final_time_s = 0.0
+    state.submitted = False
+    state.run_id = uuid.uuid4().hex
+
+
+def can_move_to(state: GameState, from_x: int, from_y: int, dir_str: str) -> bool:
+    w = state.maze_walls[(from_x, from_y)]
+    if w[dir_str]:
+        return False
+    if dir_str == 'N':
+        return from_y - 1 >= 0
+    if dir_str == 'S':
+        return from_y + 1 < state.grid_height
+    if dir_str == 'W':
+        return from_x - 1 >= 0
+    if dir_str == 'E':
+        return from_x + 1 < state.grid_width
+    return False
+
+
+def try_move(state: GameState, dir_str: str, callbacks: GameCallbacks = NO_CALLBACKS,
+             now: Optional[float] = None) -> bool:
+    """Move one cell if no wall is in the way; returns whether the player moved"""
+    if state.finished or state.maze_walls is None:
+        return False
+    x, y = state.player_cell
+    if not can_move_to(state, x, y, dir_str):
+        return False
+    dx, dy = STEPS[dir_str]
+    state.player_cell = [x + dx, y + dy]
+    callbacks.render(state)
+    check_win(state, callbacks, now)
+    callbacks.moved(state)
+    return True
+
+
+def check_win(state: GameState, callbacks: GameCallbacks = NO_CALLBACKS, now: Optional[float] = None) -> bool:
+    if state.finished or tuple(state.player_cell) != state.exit_cell:
+        return False
+    state.finished = True
+    if state.start_time_s is not None:
+        state.final_time_s = (time.time() if now is None else now) - state.start_time_s
+    callbacks.won(state)
+    return True
+
+
+# ------------------------------ Rendering ------------------------------
+
+class CanvasRenderer:
+    """Draws a maze and the player on a 2D canvas context (or a stand-in)"""
+
+    def __init__(self, ctx, width_px: int, height_px: int, cell_pixels: int = CELL_PIXELS,
+                 path_color: str = PATH_COLOR, wall_color: str = WALL_COLOR,
+                 wall_thickness: int = WALL_THICKNESS) -> None:
+        self.ctx = ctx
+        self.width_px = width_px
+        self.height_px = height_px
+        self.cell_pixels = cell_pixels
+        self.path_color = path_color
+        self.wall_color = wall_color
+        self.wall_thickness = wall_thickness
+
+    def clear(self) -> None:
+        self.ctx.fillStyle = self.path_color
+        self.ctx.fillRect(0, 0, self.width_px, self.height_px)
+
+    def draw_maze(self, walls: Walls, start: Cell, exit_cell: Cell) -> None:
+        ctx = self.ctx
+        cell = self.cell_pixels
+        self.clear()
+        ctx.strokeStyle = self.wall_color
+        ctx.lineWidth = self.wall_thickness
+
+        for (x, y), w in walls.items():
+            px = x * cell
+            py = y * cell
+            if w['N']:
+                ctx.beginPath(); ctx.moveTo(px, py); ctx.lineTo(px + cell, py); ctx.stroke()
+            if w['S']:
+                ctx.beginPath(); ctx.moveTo(px, py + cell); ctx.lineTo(px + cell, py + cell); ctx.stroke()
+            if w['W']:
+                ctx.beginPath(); ctx.moveTo(px, py); ctx.lineTo(px, py + cell); ctx.stroke()
+            if w['E']:
+                ctx.beginPath(); ctx.moveTo(px + cell, py); ctx.lineTo(px + cell, py + cell); ctx.stroke()
+
+        # draw start & exit with glow effect
+        ctx.shadowColor = "#0ea5e9"
+        ctx.shadowBlur = 10
+        ctx.fillStyle = "#0ea5e9"
+        rectpad = 6
+        sx, sy = start
+        ex, ey = exit_cell
+        ctx.fillRect(sx * cell + rectpad, sy * cell + rectpad, cell - 2*rectpad, cell - 2*rectpad)
+
+        ctx.shadowColor = "#f97316"
+        ctx.fillStyle = "#f97316"
+        ctx.fillRect(ex * cell + rectpad, ey * cell + rectpad, cell - 2*rectpad, cell - 2*rectpad)
+
+        # Reset shadow
+        ctx.shadowBlur = 0
+
+    def erase_wall(self, x: int, y: int, direction: str) -> None:
+        """Paint over one carved wall segment, leaving the corners to its neighbours"""
+        ctx = self.ctx
+        cell = self.cell_pixels
+        t = self.wall_thickness
+        px = x * cell
+        py = y * cell
+        ctx.fillStyle = self.path_color
+        if direction == 'N':
+            ctx.fillRect(px + t, py - t, cell - 2*t, 2*t)
+        elif direction == 'S':
+            ctx.fillRect(px + t, py + cell - t, cell - 2*t, 2*t)
+        elif direction == 'W':
+            ctx.fillRect(px - t, py + t, 2*t, cell - 2*t)
+        elif direction == 'E':
+            ctx.fillRect(px + cell - t, py + t, 2*t, cell - 2*t)
+
+    def draw_player(self, cell_x: int, cell_y: int, color: str, shape: str) -> None:
+        ctx = self.ctx
+        cell = self.cell_pixels
+        px = cell_x * cell
+        py = cell_y * cell
+        pad = 8
+        size = cell - 2*pad
+        center_x = px + cell // 2
+        center_y = py + cell // 2
+
+        # Add glow effect to player using selected color
+        ctx.shadowColor = color
+        ctx.shadowBlur = 15
+        ctx.fillStyle = color
+
+        # Draw different shapes based on player selection
+        if shape == "star":
+            # Draw a star using multiple triangles
+            ctx.save()
+            ctx.translate(center_x, center_y)
+            ctx.rotate(3.14159 / 2)  # Rotate 90 degrees
+
+            # Draw 5-pointed star
+            for i in range(5):
+                ctx.rotate(2 * 3.14159 / 5)
+                ctx.beginPath()
+                ctx.moveTo(0, -size // 2)
+                ctx.lineTo(size // 8, -size // 4)
+                ctx.lineTo(size // 2, -size // 4)
+                ctx.lineTo(size // 4, 0)
+                ctx.lineTo(size // 2, size // 4)
+                ctx.lineTo(size // 8, size // 4)
+                ctx.closePath()
+                ctx.fill()
+            ctx.restore()
+
+        elif shape == "diamond":
+            ctx.beginPath()
+            ctx.moveTo(center_x, py + pad)
+            ctx.lineTo(px + cell - pad, center_y)
+            ctx.lineTo(center_x, py + cell - pad)
+            ctx.lineTo(px + pad, center_y)
+            ctx.closePath()
+            ctx.fill()
+
+        elif shape == "triangle":
+            ctx.beginPath()
+            ctx.moveTo(center_x, py + pad)
+            ctx.lineTo(px + pad, py + cell - pad)
+            ctx.lineTo(px + cell - pad, py + cell - pad)
+            ctx.closePath()
+            ctx.fill()
+
+        elif shape == "square":
+            ctx.fillRect(px + pad, py + pad, size, size)
+
+        elif shape == "rose":
+            # Draw a beautiful rose using petals
+            ctx.save()
+            ctx.translate(center_x, center_y)
+
+            # Draw multiple layers of petals for a realistic rose
+            for layer in range(3):
+                petal_count = 8 - layer * 2  # More petals in outer layers
+                petal_size = size // 2 - layer * 4
+
+                for i in range(petal_count):
+                    ctx.rotate(2 * 3.14159 / petal_count)
+                    ctx.fillStyle = color
+
+                    # Draw petal shape using ellipse
+                    ctx.beginPath()
+                    ctx.ellipse(0, -petal_size // 2, petal_size // 3, petal_size // 2, 0, 0, 2 * 3.14159)
+                    ctx.fill()
+
+            # Draw center
+            ctx.fillStyle = color
+            ctx.beginPath()
+            ctx.arc(0, 0, size // 8, 0, 2 * 3.14159)
+            ctx.fill()
+
+            ctx.restore()
+
+        else:
+            # Circle (also the fallback for unknown shapes)
+            ctx.beginPath()
+            ctx.arc(center_x, center_y, size // 2, 0, 2 * 3.14159)
+            ctx.fill()
+
+        # Reset shadow
+        ctx.shadowBlur = 0
+
+    def render(self, state: GameState) -> None:
+        if state.maze_walls is None:
+            return
+        self.draw_maze(state.maze_walls, START_POS, state.exit_cell)
+        self.draw_player(state.player_cell[0], state.player_cell[1], state.player_color, state.player_shape)
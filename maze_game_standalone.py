@@ -3,2305 +3,1415 @@ import os
 import time
 import json
 import sqlite3
-from typing import List, Dict, Any
+import asyncio
+import cProfile
+import gzip
+import bisect
+import hashlib
+import hmac
+import io
+import logging
+import logging.handlers
+import marshal
+import pstats
+import sys
+import zipfile
+import py_compile
+import queue
+import random
+import re
+import tempfile
+import threading
+import traceback
+import atexit
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Any, Optional
 from pathlib import Path
+from urllib.parse import quote
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, JSONResponse
-from pydantic import BaseModel, Field
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, Response
+from pydantic import BaseModel, Field, ValidationError
 import uvicorn
+
+import maze_engine
+
+try:
+    import brotli
+except ImportError:  # optional: assets are served gzip-only without it
+    brotli = None
 HOST = "0.0.0.0"
 PORT = 8001
 DATABASE_FILE = "leaderboard.db"
+# Time-windowed boards; "all" is served from board_best, the others from board_period_best
+LEADERBOARD_BOARDS = ("all", "daily", "weekly")
+# Scores only compete with runs of the same maze configuration
+DEFAULT_GRID_SIZE = 20
+DEFAULT_ALGORITHM = "dfs"
+MIN_GRID_SIZE = 5
+MAX_GRID_SIZE = 100
+ALGORITHM_PATTERN = "^[a-z0-9_-]{1,16}$"
+RUN_ID_PATTERN = "^[A-Za-z0-9_-]{8,64}$"
+MIGRATION_BATCH_SIZE = 2000
+MIGRATION_PAUSE_S = 0.05  # between batches, so requests and writers get the database
+
+def config_key(grid_size: int = DEFAULT_GRID_SIZE, algorithm: str = DEFAULT_ALGORITHM,
+               seed: Optional[int] = None) -> str:
+    """Board key of a maze configuration, e.g. ``20x20:dfs`` or ``20x20:dfs:42``"""
+    key = f"{grid_size}x{grid_size}:{algorithm}"
+    return key if seed is None else f"{key}:{seed}"
+
+DEFAULT_CONFIG = config_key()
+
+def period_key(board: str, when: datetime) -> str:
+    """Rollup key of the daily/weekly period containing ``when`` (UTC)"""
+    if board == "daily":
+        return f"day:{when:%Y-%m-%d}"
+    year, week, _ = when.isocalendar()
+    return f"week:{year}-W{week:02d}"
+
+# Keep only the better time when a (config, [period,] name) row already exists
+INSERT_SCORE = '''
+    INSERT INTO scores (name, time, created_at, grid_size, algorithm, seed, config)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+# Claims a run id; changes no row if the run was stored before
+INSERT_RUN = "INSERT OR IGNORE INTO score_runs (run_id) VALUES (?)"
+UPSERT_BOARD_BEST = '''
+    INSERT INTO board_best (config, name, time) VALUES (?, ?, ?)
+    ON CONFLICT (config, name) DO UPDATE SET time = excluded.time
+    WHERE excluded.time < board_best.time
+'''
+UPSERT_BOARD_PERIOD_BEST = '''
+    INSERT INTO board_period_best (config, period, name, time) VALUES (?, ?, ?, ?)
+    ON CONFLICT (config, period, name) DO UPDATE SET time = excluded.time
+    WHERE excluded.time < board_period_best.time
+'''
+
+# ------------------------------ Logging ------------------------------
+# Application and access logs are JSON lines (MAZE_LOG_FORMAT=text for plain
+# messages). Loggers only put records on a queue; a writer thread formats
+# and writes them, so the event loop never blocks on stdout. The server sets
+# this up when it starts (main() or the app's lifespan); merely importing the
+# module leaves the process's logging configuration alone. What the server
+# logs while it is imported (database and bundle setup) is held until then.
+
+LOG_LEVEL = os.environ.get("MAZE_LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.environ.get("MAZE_LOG_FORMAT", "json")
+LOG_FLUSH_INTERVAL_S = 0.05
+LOG_RECORD_FIELDS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message"}
+
+logger = logging.getLogger("maze")
+request_id_var: ContextVar[str] = ContextVar("request_id", default="")
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; ``extra=`` fields are included as keys"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in LOG_RECORD_FIELDS and value not in ("", None):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class TextFormatter(logging.Formatter):
+    """The message followed by its ``extra=`` fields as key=value pairs"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = " ".join(f"{key}={value}" for key, value in vars(record).items()
+                          if key not in LOG_RECORD_FIELDS and value not in ("", None))
+        line = f"{record.getMessage()} {fields}" if fields else record.getMessage()
+        if record.exc_info:
+            line += "\n" + self.formatException(record.exc_info)
+        return line
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """Queue records as they are: all formatting happens on the listener thread"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Records never leave the process, so there is nothing to pickle-proof
+        return record
+
+class RequestIdFilter(logging.Filter):
+    """Tag records with the id of the request being handled (runs in the logging caller)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "request_id", ""):
+            record.request_id = request_id_var.get()
+        return True
+
+class StartupLogBuffer(logging.Handler):
+    """Holds the server's records from before setup_logging(), which replays them"""
+
+    def __init__(self, capacity: int = 1000) -> None:
+        super().__init__()
+        self.records: "deque[logging.LogRecord]" = deque(maxlen=capacity)
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.records.append(record)
+        if record.levelno >= logging.WARNING and not logging.getLogger().handlers:
+            # Nothing else would show it if the server is never started
+            logging.lastResort.handle(record)
+
+_startup_log_buffer = StartupLogBuffer()
+logger.addHandler(_startup_log_buffer)
+logger.setLevel(LOG_LEVEL)
+
+class BatchingLogWriter:
+    """A thread that wakes every LOG_FLUSH_INTERVAL_S and writes out everything queued since.
+
+    Waking per record, as logging.handlers.QueueListener does, would make the
+    writer contend with the event loop for the GIL on every log call.
+    """
+
+    def __init__(self, records: queue.SimpleQueue, *handlers: logging.Handler) -> None:
+        self.queue = records
+        self.handlers = handlers
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="maze-log-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopping.wait(LOG_FLUSH_INTERVAL_S):
+            self.drain()
+        self.drain()
+
+    def drain(self) -> None:
+        while True:
+            try:
+                record = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+    def stop(self) -> None:
+        """Write out what is still queued, then end the thread"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+_log_writer: Optional[BatchingLogWriter] = None
+
+def setup_logging(stream=None) -> None:
+    """Route the root logger through a queue to one stdout writer thread (idempotent)"""
+    global _log_writer
+    if _log_writer is not None:
+        return
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(TextFormatter() if LOG_FORMAT == "text" else JsonFormatter())
+    handler = DeferredQueueHandler(records)
+    handler.addFilter(RequestIdFilter())
+    # Not in the output, so not worth looking up on every record
+    logging.logThreads = logging.logProcesses = logging.logMultiprocessing = False
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(LOG_LEVEL)
+    logger.removeHandler(_startup_log_buffer)
+    for record in _startup_log_buffer.records:
+        handler.handle(record)
+    _startup_log_buffer.records.clear()
+    _log_writer = BatchingLogWriter(records, output)
+    _log_writer.start()
+    atexit.register(stop_logging)
+
+def stop_logging() -> None:
+    """Write out whatever is still queued and stop the writer thread"""
+    global _log_writer
+    if _log_writer is not None:
+        _log_writer.stop()
+        _log_writer = None
+
 def init_database():
     """Initialize SQLite database for leaderboard"""
     conn = sqlite3.connect(DATABASE_FILE)
     cursor = conn.cursor()
-    cursor.execute('''
+    cursor.execute(f'''
         CREATE TABLE IF NOT EXISTS scores (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             name TEXT NOT NULL,
             time REAL NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            grid_size INTEGER NOT NULL DEFAULT {DEFAULT_GRID_SIZE},
+            algorithm TEXT NOT NULL DEFAULT '{DEFAULT_ALGORITHM}',
+            seed INTEGER,
+            config TEXT NOT NULL DEFAULT '{DEFAULT_CONFIG}'
         )
     ''')
+    # Older databases: ADD COLUMN with a constant default only rewrites the
+    # schema, so existing rows pick up the default configuration instantly
+    columns = {row[1] for row in cursor.execute("PRAGMA table_info(scores)")}
+    for column, ddl in (
+        ("grid_size", f"grid_size INTEGER NOT NULL DEFAULT {DEFAULT_GRID_SIZE}"),
+        ("algorithm", f"algorithm TEXT NOT NULL DEFAULT '{DEFAULT_ALGORITHM}'"),
+        ("seed", "seed INTEGER"),
+        ("config", f"config TEXT NOT NULL DEFAULT '{DEFAULT_CONFIG}'"),
+    ):
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE scores ADD COLUMN {ddl}")
     cursor.execute('''
         CREATE INDEX IF NOT EXISTS idx_name_time ON scores (name, time)
     ''')
+    # Client run ids already stored, so a replayed run is not saved twice.
+    # Kept apart from scores: a new table needs no index build over old rows
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS score_runs (
+            run_id TEXT PRIMARY KEY,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) WITHOUT ROWID
+    ''')
+    # One row per (configuration, player) with their best time; the
+    # (config, time, name) index serves keyset pagination of each board
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS board_best (
+            config TEXT NOT NULL,
+            name TEXT NOT NULL,
+            time REAL NOT NULL,
+            PRIMARY KEY (config, name)
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_board_best_rank ON board_best (config, time, name)
+    ''')
+    # Per-period best times (daily / weekly), maintained on insert
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS board_period_best (
+            config TEXT NOT NULL,
+            period TEXT NOT NULL,
+            name TEXT NOT NULL,
+            time REAL NOT NULL,
+            PRIMARY KEY (config, period, name)
+        )
+    ''')
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_board_period_rank ON board_period_best (config, period, time, name)
+    ''')
+    # Frozen boards of expired periods, keyed "<config>/<period>"; never change once written
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS period_snapshots (
+            period TEXT PRIMARY KEY,
+            body TEXT NOT NULL,
+            frozen_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            name TEXT PRIMARY KEY,
+            last_id INTEGER NOT NULL DEFAULT 0,
+            done INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    
+    row = cursor.execute("SELECT last_id, done FROM schema_migrations WHERE name = 'board_rollups'").fetchone()
+    done = row is not None and bool(row[1])
+    pending = False
+    if not done:
+        # Only a rowid seek: is anything left for the background migration?
+        last_id = row[0] if row is not None else 0
+        pending = cursor.execute("SELECT 1 FROM scores WHERE id > ? LIMIT 1", (last_id,)).fetchone() is not None
     
     conn.commit()
     conn.close()
-    print("✅ Database initialized successfully")
-init_database()
-class ScoreIn(BaseModel):
-    name: str = Field(min_length=1, max_length=64)
-    time: float = Field(ge=0.0, lt=36000)
-app = FastAPI(title="Maze Runner Game", version="1.0.0")
-
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-HTML_TEMPLATE = """<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8" />
-    <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=0" />
-    <title>Maze Runner</title>
-    <style>
-        /* Embedded CSS */
-        * { box-sizing: border-box; }
-        html, body { height: 100%; margin: 0; font-family: system-ui, -apple-system, Segoe UI, Roboto, Arial, sans-serif; background: #0b1020; color: #e9eef7; }
-        #app { min-height: 100%; width: 100%; padding: 0; }
-        .hidden { display: none !important; }
-
-        .screen { 
-            display: none; 
-            width: 100%; 
-            opacity: 0;
-            transform: translateY(20px);
-            transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-        }
-        .screen.active { 
-            display: block; 
-            opacity: 1;
-            transform: translateY(0);
-        }
-        
-        /* Disable animations on mobile for leaderboard to prevent positioning issues */
-        @media (max-width: 768px) {
-            #leaderboard-screen.active {
-                transform: none !important;
-                transition: none !important;
-                animation: none !important;
-            }
-            
-            /* Also disable base screen animations for leaderboard on mobile */
-            #leaderboard-screen {
-                transform: none !important;
-                transition: none !important;
-                animation: none !important;
-            }
-        }
-
-        /* PC-specific screen overrides */
-        @media (hover: hover) and (pointer: fine) {
-            .screen { 
-                max-width: none !important;
-                width: 100vw !important;
-                height: 100vh !important;
-            }
-            .screen.active { 
-                display: flex !important; 
-            }
-        }
-        
-        /* Ensure interactive elements are clickable on mobile */
-        @media (max-width: 768px) {
-            #home-screen.active, #game-screen.active {
-                z-index: 200 !important;
-                position: relative !important;
-            }
-            
-            #home-screen.active .card, #game-screen.active .card {
-                z-index: 201 !important;
-            }
-            
-            button, input, label {
-                z-index: 202 !important;
-                position: relative !important;
-            }
-        }
-
-        .card { 
-            background: #141a2f; 
-            border: 1px solid #283150; 
-            border-radius: 12px; 
-            padding: 24px; 
-            margin: 0 auto; 
-            width: 100%; 
-            max-width: 480px; 
-            text-align: center; 
-            box-shadow: 0 8px 24px rgba(0,0,0,0.3);
-            animation: slideIn 0.5s ease-out;
-            transition: transform 0.3s ease, box-shadow 0.3s ease;
-        }
-        
-        /* Disable card animations on mobile */
-        @media (max-width: 768px) {
-            .card {
-                animation: none !important;
-                transition: none !important;
-            }
-        }
-        .card:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 12px 32px rgba(0,0,0,0.4);
-        }
-        @keyframes slideIn {
-            from { opacity: 0; transform: translateY(30px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
-
-        .card h1, .card h2 { margin-top: 0; }
-
-        label { display: block; margin-bottom: 8px; color: #b8c4e0; }
-        input { 
-            width: 100%; 
-            padding: 12px 14px; 
-            border-radius: 8px; 
-            border: 1px solid #394268; 
-            background: #11172a; 
-            color: #e9eef7;
-            transition: border-color 0.2s ease, box-shadow 0.2s ease;
-        }
-        input:focus { 
-            outline: none; 
-            border-color: #3b82f6; 
-            box-shadow: 0 0 0 3px rgba(59, 130, 246, 0.1);
-        }
-
-        button { 
-            margin-top: 12px; 
-            padding: 12px 16px; 
-            border-radius: 10px; 
-            border: 1px solid #3b82f6; 
-            background: #2563eb; 
-            color: white; 
-            cursor: pointer; 
-            font-weight: 600;
-            transition: all 0.2s ease;
-            position: relative;
-            overflow: hidden;
-            transform: translateZ(0);
-        }
-        button:hover { 
-            background: #1d4ed8; 
-            transform: translateY(-2px) translateZ(0);
-            box-shadow: 0 8px 20px rgba(37, 99, 235, 0.4);
-        }
-        
-        button[style*="background: #059669"]:hover,
-        button[style*="background: #059669"]:hover {
-            background: #047857 !important; /* Darker green on hover */
-            border-color: #047857 !important;
-            box-shadow: 0 8px 20px rgba(4, 120, 87, 0.4) !important;
-        }
-        button:active { 
-            transform: translateY(0) translateZ(0);
-            box-shadow: 0 4px 12px rgba(37, 99, 235, 0.3);
-        }
-
-        /* Color picker styles */
-        .color-option {
-            width: 40px;
-            height: 40px;
-            border-radius: 50%;
-            border: 3px solid transparent;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            position: relative;
-            box-shadow: 0 2px 8px rgba(0, 0, 0, 0.3);
-            flex-shrink: 0;
-        }
-
-        .color-option:hover {
-            transform: scale(1.1);
-            box-shadow: 0 4px 16px rgba(0, 0, 0, 0.4);
-        }
-
-        .color-option.selected {
-            border-color: #ffffff;
-            box-shadow: 0 0 0 3px #3b82f6, 0 4px 16px rgba(0, 0, 0, 0.4);
-            transform: scale(1.15);
-        }
-
-        .color-option.selected::after {
-            content: '✓';
-            position: absolute;
-            top: 50%;
-            left: 50%;
-            transform: translate(-50%, -50%);
-            color: white;
-            font-weight: bold;
-            font-size: 16px;
-            text-shadow: 1px 1px 2px rgba(0, 0, 0, 0.8);
-        }
-
-        /* Mobile color picker adjustments */
-        @media (max-width: 768px) {
-            .color-option {
-                width: 36px;
-                height: 36px;
-            }
-            
-            .color-option.selected::after {
-                font-size: 14px;
-            }
-        }
-
-        /* Shape picker styles */
-        .shape-option {
-            width: 40px;
-            height: 40px;
-            border-radius: 8px;
-            border: 3px solid transparent;
-            cursor: pointer;
-            transition: all 0.3s ease;
-            position: relative;
-            box-shadow: 0 2px 8px rgba(0, 0, 0, 0.3);
-            flex-shrink: 0;
-            display: flex;
-            align-items: center;
-            justify-content: center;
-        }
-
-        .shape-option:hover {
-            transform: scale(1.1);
-            box-shadow: 0 4px 16px rgba(0, 0, 0, 0.4);
-            border-color: rgba(59, 130, 246, 0.5);
-            background: #4b5563;
-        }
-
-        .shape-option.selected {
-            border-color: #3b82f6;
-            box-shadow: 0 0 0 3px rgba(59, 130, 246, 0.3), 0 4px 16px rgba(0, 0, 0, 0.4);
-            transform: scale(1.15);
-        }
-
-        .shape-preview {
-            width: 24px;
-            height: 24px;
-            background: #e9eef7;
-            border-radius: 2px;
-        }
-
-        .shape-preview.circle {
-            border-radius: 50%;
-        }
-
-        .shape-preview.star {
-            background: transparent;
-            color: #e9eef7;
-            font-size: 20px;
-            line-height: 24px;
-            text-align: center;
-        }
-
-        .shape-preview.diamond {
-            transform: rotate(45deg);
-        }
-
-        .shape-preview.triangle {
-            background: transparent;
-            width: 0;
-            height: 0;
-            border-left: 12px solid transparent;
-            border-right: 12px solid transparent;
-            border-bottom: 20px solid #e9eef7;
-        }
-
-        .shape-preview.square {
-            border-radius: 0;
-        }
-
-        .shape-preview.rose {
-            background: transparent;
-            color: #e9eef7;
-            font-size: 20px;
-            line-height: 24px;
-            text-align: center;
-        }
-
-
-
-        /* Mobile shape picker adjustments */
-        @media (max-width: 768px) {
-            .shape-option {
-                width: 36px;
-                height: 36px;
-            }
-            
-            .shape-preview {
-                width: 20px;
-                height: 20px;
-            }
-            
-            .shape-preview.star {
-                font-size: 16px;
-                line-height: 20px;
-            }
-            
-            .shape-preview.triangle {
-                border-left-width: 10px;
-                border-right-width: 10px;
-                border-bottom-width: 16px;
-            }
-            
-            .shape-preview.rose {
-                font-size: 16px;
-                line-height: 20px;
-            }
-
-        }
-
-        /* Loading button state */
-        button.loading {
-            pointer-events: none;
-            opacity: 0.7;
-        }
-        button.loading::after {
-            content: '';
-            position: absolute;
-            width: 16px;
-            height: 16px;
-            top: 50%;
-            left: 50%;
-            margin: -8px 0 0 -8px;
-            border: 2px solid transparent;
-            border-top: 2px solid white;
-            border-radius: 50%;
-            animation: spin 1s linear infinite;
-        }
+    board_migration.done = done
+    if pending:
+        logger.info("Leaderboard rollups will be built in the background", extra={"database": DATABASE_FILE})
+    elif not done:
+        finish_board_migration()
+    logger.info("Database initialized", extra={"database": DATABASE_FILE})
+
+# ------------------------------ Board Migration ------------------------------
+# Builds the per-configuration rollups from ``scores`` after startup, in
+# short batches on a worker thread, so the server is up at once and other
+# writers only ever wait for one batch. Progress is recorded per batch, so an
+# interrupted migration resumes where it stopped. Until it completes, boards
+# and ranks are computed from ``scores`` itself (slower, but complete), and
+# the tables the rollups replace are dropped only once schema_migrations
+# marks them done.
+
+class BoardMigration:
+    """Whether the rollups are complete (until then, reads go to ``scores``)"""
 
-        @keyframes spin {
-            0% { transform: rotate(0deg); }
-            100% { transform: rotate(360deg); }
-        }
-
-        #game-screen { width: 100%; }
-        .hud { 
-            display: flex; 
-            justify-content: space-between; 
-            align-items: center; 
-            margin: 0 auto 12px; 
-            max-width: 640px;
-            animation: fadeInDown 0.6s ease-out;
-        }
-        @keyframes fadeInDown {
-            from { opacity: 0; transform: translateY(-20px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
-
-        #timer { 
-            font-size: 24px; 
-            font-weight: 700;
-            background: linear-gradient(135deg, #3b82f6, #1d4ed8);
-            padding: 8px 16px;
-            border-radius: 8px;
-            box-shadow: 0 2px 8px rgba(59, 130, 246, 0.3);
-            animation: float 3s ease-in-out infinite;
-            transition: all 0.3s ease;
-        }
-
-        #timer:hover {
-            animation: pulse 1s ease-in-out infinite;
-            transform: scale(1.1);
-        }
-
-        #player-label { 
-            font-size: 14px; 
-            color: #a3b1d9;
-            background: rgba(163, 177, 217, 0.1);
-            padding: 6px 12px;
-            border-radius: 6px;
-            border: 1px solid rgba(163, 177, 217, 0.2);
-            transition: all 0.3s ease;
-        }
-
-        #player-label:hover {
-            background: rgba(163, 177, 217, 0.2);
-            border-color: rgba(163, 177, 217, 0.4);
-            transform: scale(1.05);
-        }
-
-        #game-canvas { 
-            display: block; 
-            margin: 0 auto; 
-            background: #0f172a; 
-            border: 2px solid #334155; 
-            border-radius: 8px; 
-            width: 100%; 
-            height: auto; 
-            max-width: 640px;
-            animation: zoomIn 0.8s ease-out;
-            box-shadow: 0 8px 32px rgba(0, 0, 0, 0.4);
-            transition: all 0.3s ease;
-        }
-
-        #game-canvas:hover {
-            border-color: #3b82f6;
-            box-shadow: 0 12px 40px rgba(59, 130, 246, 0.3);
-        }
-        @keyframes zoomIn {
-            from { opacity: 0; transform: scale(0.9); }
-            to { opacity: 1; transform: scale(1); }
-        }
-
-        .controls { 
-            display: grid; 
-            place-items: center; 
-            margin-top: 16px;
-            animation: fadeInUp 0.6s ease-out 0.2s both;
-        }
-        @keyframes fadeInUp {
-            from { opacity: 0; transform: translateY(20px); }
-            to { opacity: 1; transform: translateY(0); }
-        }
-
-        .dpad { display: grid; grid-template-rows: auto auto; gap: 12px; align-items: center; }
-        .dpad .top-row { display: flex; justify-content: center; }
-        .dpad .bottom-row { display: flex; justify-content: center; gap: 12px; }
-        .dpad button { 
-            width: 64px; 
-            height: 64px; 
-            border-radius: 12px; 
-            font-size: 24px; 
-            background: linear-gradient(135deg, #1e293b, #334155);
-            border: 1px solid #475569;
-            transition: all 0.3s ease;
-            position: relative;
-            overflow: hidden;
-        }
-
-        .dpad button::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: -100%;
-            width: 100%;
-            height: 100%;
-            background: linear-gradient(90deg, transparent, rgba(255, 255, 255, 0.1), transparent);
-            transition: left 0.5s ease;
-        }
-
-        .dpad button:hover::before {
-            left: 100%;
-        }
-
-        .dpad button:hover {
-            background: linear-gradient(135deg, #334155, #475569);
-            transform: scale(1.1) rotate(2deg);
-            box-shadow: 0 8px 20px rgba(0, 0, 0, 0.4);
-            border-color: #3b82f6;
-        }
-
-        .dpad button:active {
-            transform: scale(0.95);
-            transition: transform 0.1s ease;
-        }
-
-        .overlay { 
-            position: fixed; 
-            inset: 0; 
-            display: grid; 
-            place-items: center; 
-            background: rgba(0,0,0,0.7);
-            opacity: 0;
-            visibility: hidden;
-            transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-            backdrop-filter: blur(4px);
-        }
-        .overlay.active { 
-            opacity: 1;
-            visibility: visible;
-        }
-        .overlay.hidden { 
-            opacity: 0;
-            visibility: hidden;
-        }
-
-        .modal { 
-            background: linear-gradient(135deg, #0b1224, #141a2f);
-            border: 1px solid #2b345a; 
-            padding: 24px; 
-            border-radius: 12px; 
-            width: 90%; 
-            max-width: 420px; 
-            text-align: center;
-            transform: scale(0.9) translateY(20px);
-            transition: all 0.4s cubic-bezier(0.4, 0, 0.2, 1);
-            box-shadow: 0 20px 60px rgba(0, 0, 0, 0.5);
-        }
-        .overlay.active .modal {
-            transform: scale(1) translateY(0);
-        }
-
-        .modal-actions { display: flex; gap: 12px; justify-content: center; margin-top: 16px; }
-
-        .table { 
-            width: 100%; 
-            border-collapse: collapse; 
-            margin-top: 12px;
-            animation: fadeIn 0.6s ease-out 0.3s both;
-        }
-        @keyframes fadeIn {
-            from { opacity: 0; }
-            to { opacity: 1; }
-        }
-
-        .table th, .table td { 
-            border-bottom: 1px solid #233152; 
-            padding: 10px; 
-            text-align: left;
-            transition: background-color 0.2s ease;
-        }
-        .table th { color: #9fb4dd; font-weight: 600; }
-        .table tbody tr {
-            transition: all 0.3s ease;
-            transform: translateX(0);
-        }
-
-        .table tbody tr:hover {
-            background: rgba(59, 130, 246, 0.15);
-            transform: translateX(5px);
-            box-shadow: 0 2px 8px rgba(59, 130, 246, 0.2);
-        }
-
-        /* Loading spinner */
-        .loading-spinner {
-            display: inline-block;
-            width: 20px;
-            height: 20px;
-            border: 2px solid rgba(255, 255, 255, 0.3);
-            border-radius: 50%;
-            border-top-color: #fff;
-            animation: spin 1s ease-in-out infinite;
-            margin-right: 8px;
-        }
-
-        /* Progress bar */
-        .progress-container {
-            width: 100%;
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 10px;
-            padding: 3px;
-            margin: 16px 0;
-            overflow: hidden;
-            position: relative;
-        }
-
-        .progress-container::before {
-            content: '';
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            background: linear-gradient(90deg, transparent, rgba(255, 255, 255, 0.1), transparent);
-            animation: shimmer 2s infinite;
-        }
-
-        @keyframes shimmer {
-            0% { transform: translateX(-100%); }
-            100% { transform: translateX(100%); }
-        }
-
-        .progress-bar {
-            height: 6px;
-            background: linear-gradient(90deg, #3b82f6, #1d4ed8, #3b82f6);
-            background-size: 200% 100%;
-            border-radius: 8px;
-            width: 0%;
-            transition: width 0.3s ease;
-            box-shadow: 0 0 10px rgba(59, 130, 246, 0.5);
-            animation: gradientMove 3s ease infinite;
-        }
-
-        @keyframes gradientMove {
-            0% { background-position: 0% 50%; }
-            50% { background-position: 100% 50%; }
-            100% { background-position: 0% 50%; }
-        }
-
-        /* Enhanced visual effects */
-        @keyframes pulse {
-            0%, 100% { transform: scale(1); opacity: 1; }
-            50% { transform: scale(1.05); opacity: 0.8; }
-        }
-
-        @keyframes float {
-            0%, 100% { transform: translateY(0px); }
-            50% { transform: translateY(-5px); }
-        }
-
-        /* Critical fix for leaderboard positioning on all devices - top of screen on mobile */
-        #leaderboard-screen.active {
-            position: relative !important;
-            top: 0 !important;
-            left: 0 !important;
-            right: 0 !important;
-            bottom: 0 !important;
-            margin: 0 !important;
-            transform: none !important;
-            display: flex !important;
-            align-items: flex-start !important;
-            justify-content: center !important;
-            min-height: 100vh !important;
-            width: 100% !important;
-            box-sizing: border-box !important;
-            padding-top: 16px !important;
-        }
-        
-        /* Force mobile leaderboard to stay at top - highest priority */
-        @media (max-width: 768px) {
-            #leaderboard-screen.active {
-                align-items: flex-start !important;
-                justify-content: flex-start !important;
-                padding-top: 16px !important;
-            }
-            
-            /* Ensure the card itself doesn't get centered */
-            #leaderboard-screen.active .card {
-                align-self: flex-start !important;
-                margin-top: 0 !important;
-            }
-        }
-        
-        /* Force mobile leaderboard to stay at top and visible */
-        @media (max-width: 768px) {
-            #leaderboard-screen.active {
-                position: fixed !important;
-                top: 0 !important;
-                left: 0 !important;
-                right: 0 !important;
-                bottom: 0 !important;
-                transform: none !important;
-                transition: none !important;
-                z-index: 100 !important;
-            }
-        }
-
-        #leaderboard-screen.active .card {
-            position: relative !important;
-            top: auto !important;
-            left: auto !important;
-            right: auto !important;
-            bottom: auto !important;
-            transform: none !important;
-            margin: 0 auto !important;
-            max-height: 85vh !important;
-            height: auto !important;
-            display: flex !important;
-            flex-direction: column !important;
-        }
-        
-        /* Ensure mobile leaderboard card stays visible and properly positioned */
-        @media (max-width: 768px) {
-            #leaderboard-screen.active .card {
-                position: relative !important;
-                top: auto !important;
-                left: auto !important;
-                right: auto !important;
-                bottom: auto !important;
-                transform: none !important;
-                transition: none !important;
-                animation: none !important;
-                margin: 0 auto !important;
-                max-height: 85vh !important;
-                height: auto !important;
-                display: flex !important;
-                flex-direction: column !important;
-                width: 100% !important;
-                max-width: 95vw !important;
-                align-self: flex-start !important;
-            }
-        }
-
-        /* Maze generation animation */
-        .maze-building {
-            position: absolute;
-            top: 0;
-            left: 0;
-            right: 0;
-            bottom: 0;
-            background: rgba(11, 16, 32, 0.95);
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            justify-content: center;
-            z-index: 10;
-            border-radius: 8px;
-        }
-
-        .maze-building.hidden {
-            display: none;
-        }
-
-        .maze-building::before {
-            content: 'Building maze...';
-            color: #3b82f6;
-            font-size: 18px;
-            font-weight: 600;
-            margin-bottom: 16px;
-            text-align: center;
-        }
-
-        #canvas-container {
-            position: relative;
-            display: inline-block;
-            margin: 0 auto;
-        }
-
-        #maze-building-overlay .progress-container {
-            width: 200px;
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 10px;
-            padding: 4px;
-            overflow: hidden;
-        }
-
-        #maze-building-overlay .progress-bar {
-            height: 8px;
-            background: linear-gradient(90deg, #3b82f6, #1d4ed8);
-            border-radius: 6px;
-            width: 0%;
-            transition: width 0.2s ease;
-            box-shadow: 0 0 10px rgba(59, 130, 246, 0.5);
-        }
-
-        .table-scroll {
-            max-height: 50vh;
-            overflow-y: auto;
-            overflow-x: hidden;
-            margin-top: 12px;
-            border: 1px solid #233152;
-            border-radius: 8px;
-            background: rgba(20, 26, 47, 0.8);
-        }
-        
-        /* Mobile table scroll adjustments */
-        @media (max-width: 768px) {
-            .table-scroll {
-                max-height: none !important;
-                flex: 1 !important;
-                min-height: 200px !important;
-            }
-        }
-
-        /* Custom scrollbar for table container */
-        .table-scroll::-webkit-scrollbar {
-            width: 8px;
-        }
-
-        .table-scroll::-webkit-scrollbar-track {
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 4px;
-        }
-
-        .table-scroll::-webkit-scrollbar-thumb {
-            background: rgba(59, 130, 246, 0.6);
-            border-radius: 4px;
-        }
-
-        .table-scroll::-webkit-scrollbar-thumb:hover {
-            background: rgba(59, 130, 246, 0.8);
-        }
-
-        #leaderboard-loading { 
-            align-self: center; 
-            margin: 16px 0;
-        }
-
-        /* Show on-screen controls only on touch/mobile devices */
-        .controls { display: none; }
-        
-        /* JavaScript fallback for mobile detection */
-        .mobile-device .controls { display: grid !important; }
-        
-        .mobile-device #game-screen {
-            display: flex !important;
-            flex-direction: column !important;
-            min-height: 100vh !important;
-            padding: 0 !important;
-        }
-        
-        .mobile-device .hud { 
-            position: absolute !important;
-            top: 12px !important;
-            left: 12px !important;
-            right: 12px !important;
-            display: flex !important;
-            justify-content: space-between !important;
-            align-items: center !important;
-            margin: 0 !important;
-            max-width: none !important;
-            z-index: 10 !important;
-        }
-        
-        .mobile-device #canvas-container {
-            flex: 1 !important;
-            display: flex !important;
-            align-items: center !important;
-            justify-content: center !important;
-            padding: 60px 12px 12px 12px !important;
-        }
-        
-        .mobile-device #timer { order: 1 !important; }
-        .mobile-device #player-label { order: 2 !important; }
-        
-        /* Mobile leaderboard fixes */
-        .mobile-device #leaderboard-screen {
-            padding: 8px !important;
-            display: flex !important;
-            align-items: flex-start !important;
-            justify-content: center !important;
-            min-height: 100vh !important;
-            width: 100% !important;
-            position: fixed !important;
-            top: 0 !important;
-            left: 0 !important;
-            right: 0 !important;
-            bottom: 0 !important;
-            transform: none !important;
-            transition: none !important;
-            animation: none !important;
-            z-index: 100 !important;
-        }
-        
-        .mobile-device #leaderboard-screen .card {
-            max-height: 90vh !important;
-            height: auto !important;
-            display: flex !important;
-            flex-direction: column !important;
-            margin: 0 !important;
-            padding: 16px !important;
-            width: 100% !important;
-            max-width: 95vw !important;
-        }
-        
-        .mobile-device #leaderboard-screen .card h2 {
-            margin-top: 0 !important;
-            margin-bottom: 12px !important;
-            font-size: 20px !important;
-            flex-shrink: 0 !important;
-        }
-        
-        .mobile-device .table-scroll {
-            flex: 1 !important;
-            max-height: none !important;
-            margin-top: 8px !important;
-            margin-bottom: 8px !important;
-            min-height: 200px !important;
-        }
-        
-        .mobile-device #play-again-btn {
-            margin-top: 8px !important;
-            flex-shrink: 0 !important;
-        }
-        
-        .mobile-device #leaderboard-loading {
-            margin: 8px 0 !important;
-        }
-        
-        /* Force mobile leaderboard centering with highest priority */
-        @media (max-width: 768px) {
-            /* Prevent body scroll on mobile */
-            html, body {
-                height: 100vh !important;
-                overflow: hidden !important;
-                position: fixed !important;
-                width: 100% !important;
-            }
-            
-            #app {
-                height: 100vh !important;
-                overflow: hidden !important;
-            }
-            
-            #leaderboard-screen.active {
-                display: flex !important;
-                align-items: flex-start !important;
-                justify-content: flex-start !important;
-                height: 100vh !important;
-                width: 100% !important;
-                padding: 16px 8px 8px 8px !important;
-                position: fixed !important;
-                top: 0 !important;
-                left: 0 !important;
-                right: 0 !important;
-                bottom: 0 !important;
-                margin: 0 !important;
-                transform: none !important;
-                transition: none !important;
-                z-index: 100 !important;
-            }
-            
-            #leaderboard-screen.active .card {
-                max-height: 85vh !important;
-                height: auto !important;
-                margin: 0 !important;
-                position: relative !important;
-                top: auto !important;
-                left: auto !important;
-                right: auto !important;
-                bottom: auto !important;
-                transform: none !important;
-                transition: none !important;
-                animation: none !important;
-                display: flex !important;
-                flex-direction: column !important;
-                width: 100% !important;
-                max-width: 95vw !important;
-            }
-        }
-        
-        /* Mobile device detection - multiple approaches for better compatibility */
-        @media (hover: none) and (pointer: coarse), 
-               (max-width: 768px), 
-               (pointer: coarse), 
-               (max-width: 1024px) and (orientation: portrait) {
-            /* Prevent body scroll on mobile */
-            html, body {
-                height: 100vh !important;
-                overflow: hidden !important;
-                position: fixed !important;
-                width: 100% !important;
-            }
-            
-            #app {
-                height: 100vh !important;
-                overflow: hidden !important;
-            }
-            
-            .controls { 
-                display: grid; 
-                z-index: 200;
-                position: relative;
-            }
-            
-            /* Mobile game screen layout */
-            #game-screen {
-                display: flex !important;
-                flex-direction: column !important;
-                height: 100vh !important;
-                padding: 0 !important;
-                overflow: hidden !important;
-            }
-            
-            /* Mobile HUD positioning */
-            .hud { 
-                position: absolute;
-                top: 12px;
-                left: 12px;
-                right: 12px;
-                display: flex;
-                justify-content: space-between;
-                align-items: center;
-                margin: 0;
-                max-width: none;
-                z-index: 200;
-            }
-            
-            /* Canvas container for mobile */
-            #canvas-container {
-                flex: 1;
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                padding: 60px 12px 12px 12px; /* top padding for HUD */
-            }
-            
-            /* Ensure timer left and player name right on mobile */
-            #timer { order: 1; }
-            #player-label { order: 2; }
-            
-            /* Mobile leaderboard fixes - POSITIONED AT TOP */
-            #leaderboard-screen {
-                display: flex !important;
-                align-items: flex-start !important;
-                justify-content: center !important;
-                height: 100vh !important;
-                width: 100% !important;
-                padding: 16px 8px 8px 8px !important;
-                position: fixed !important;
-                top: 0 !important;
-                left: 0 !important;
-                right: 0 !important;
-                bottom: 0 !important;
-                margin: 0 !important;
-                transform: none !important;
-                transition: none !important;
-                z-index: 100 !important;
-            }
-            
-            #leaderboard-screen .card {
-                max-height: 85vh !important;
-                height: auto !important;
-                display: flex !important;
-                flex-direction: column !important;
-                margin: 0 !important;
-                padding: 20px !important;
-                width: 100% !important;
-                max-width: 95vw !important;
-                position: relative !important;
-                top: auto !important;
-                left: auto !important;
-                right: auto !important;
-                bottom: auto !important;
-                transform: none !important;
-            }
-            
-            #leaderboard-screen .card h2 {
-                margin-top: 0 !important;
-                margin-bottom: 16px !important;
-                font-size: 22px !important;
-                flex-shrink: 0 !important;
-            }
-            
-            .table-scroll {
-                flex: 1 !important;
-                max-height: none !important;
-                margin: 12px 0 !important;
-                min-height: 200px !important;
-            }
-            
-            #play-again-btn {
-                margin-top: 16px !important;
-                flex-shrink: 0 !important;
-            }
-            
-            #leaderboard-loading {
-                margin: 12px 0 !important;
-            }
-        }
-
-        @media (hover: hover) and (pointer: fine) {
-            /* Desktop: use full viewport and prevent scroll while playing */
-            html, body { height: 100%; overflow: hidden; }
-            #app { width: 100vw; height: 100vh; }
-
-            /* Game screen specific layout for desktop */
-            #game-screen.active { 
-                position: fixed !important;
-                top: 0 !important;
-                left: 0 !important;
-                width: 100vw !important;
-                height: 100vh !important;
-                display: flex !important;
-                flex-direction: column !important;
-                align-items: center !important;
-                justify-content: center !important;
-                overflow: hidden; /* avoid scroll while playing */
-            }
-            
-            .hud { 
-                position: absolute; 
-                top: 20px; 
-                left: 20px; 
-                right: 20px; 
-                display: flex; 
-                justify-content: space-between; 
-                align-items: center; 
-                margin: 0; 
-                max-width: none; 
-                pointer-events: none; /* let clicks pass through */
-                z-index: 10;
-            }
-            
-            #canvas-container { 
-                display: flex;
-                align-items: center;
-                justify-content: center;
-                position: relative;
-            }
-            
-            #timer, #player-label { pointer-events: auto; }
-
-            /* Ensure name left and timer right in HUD */
-            #player-label { order: 1; }
-            #timer { order: 2; margin-left: auto; }
-
-            /* Center all main screens properly on PC */
-            #home-screen.active, #leaderboard-screen.active, #loading-screen.active {
-                align-items: center !important;
-                justify-content: center !important;
-                height: 100vh !important;
-                width: 100vw !important;
-                padding: 20px !important;
-                position: fixed !important;
-                top: 0 !important;
-                left: 0 !important;
-                right: 0 !important;
-                bottom: 0 !important;
-                box-sizing: border-box !important;
-                margin: 0 !important;
-            }
-
-            /* Ensure cards are properly sized on PC */
-            #home-screen .card, #loading-screen .card {
-                max-width: 500px !important;
-                width: 100% !important;
-                margin: 0 auto !important;
-                flex-shrink: 0 !important;
-            }
-            
-            #leaderboard-screen .card {
-                max-width: 800px !important;
-                width: 100% !important;
-                max-height: 90vh !important;
-                margin: 0 auto !important;
-                flex-shrink: 0 !important;
-                overflow-x: hidden !important;
-                display: flex !important;
-                flex-direction: column !important;
-                align-items: stretch !important;
-                overflow: hidden !important;
-            }
-        }
-
-        @media (min-width: 720px) {
-            .dpad button { width: 72px; height: 72px; font-size: 28px; }
-        } 
-
-        /* Fallback centering for mobile and general cases */
-        @media not all and (hover: hover) and (pointer: fine) {
-            /* Prevent body scroll on mobile */
-            html, body {
-                height: 100vh !important;
-                overflow: hidden !important;
-                position: fixed !important;
-                width: 100% !important;
-            }
-            
-            #app {
-                height: 100vh !important;
-                overflow: hidden !important;
-            }
-            
-            #home-screen.active, #loading-screen.active {
-                display: grid !important;
-                place-items: center !important;
-                height: 100vh !important;
-                width: 100% !important;
-                padding: 16px !important;
-                overflow: hidden !important;
-            }
-
-            #game-screen.active {
-                display: grid !important;
-                place-items: center !important;
-                height: 100vh !important;
-                width: 100% !important;
-                overflow: hidden !important;
-            }
-
-            /* Special handling for leaderboard to ensure proper mobile positioning at top */
-            #leaderboard-screen.active {
-                display: flex !important;
-                align-items: flex-start !important;
-                justify-content: flex-start !important;
-                height: 100vh !important;
-                width: 100% !important;
-                padding: 16px 8px 8px 8px !important;
-                position: fixed !important;
-                top: 0 !important;
-                left: 0 !important;
-                right: 0 !important;
-                bottom: 0 !important;
-                margin: 0 !important;
-                transform: none !important;
-                transition: none !important;
-                z-index: 100 !important;
-            }
-
-            #leaderboard-screen .card {
-                max-height: 85vh;
-                height: auto;
-                display: flex;
-                flex-direction: column;
-                align-items: stretch;
-                overflow: hidden;
-                position: relative !important;
-                top: auto !important;
-                left: auto !important;
-                right: auto !important;
-                bottom: auto !important;
-                transform: none !important;
-                transition: none !important;
-                animation: none !important;
-                width: 100% !important;
-                max-width: 95vw !important;
-            }
-        }
-    </style>
-</head>
-
-<body>
-    <div id="app">
-        <!-- Loading Screen -->
-        <section id="loading-screen" class="screen active">
-            <div class="card">
-                <h1>Maze Runner</h1>
-                <div class="progress-container">
-                    <div class="progress-bar" id="loading-progress"></div>
-                </div>
-                <p>Loading game...</p>
-            </div>
-        </section>
-
-        <!-- Home Screen -->
-        <section id="home-screen" class="screen">
-            <div class="card">
-                <h1>Maze Runner</h1>
-                <label for="player-name">Enter your name</label>
-                <input id="player-name" type="text" placeholder="Player" />
-                
-                <label for="player-color" style="margin-top: 16px;">Choose your color</label>
-                <div style="display: flex; gap: 8px; margin-top: 8px; justify-content: center; flex-wrap: wrap;">
-                    <div class="color-option" data-color="#22c55e" style="background: #22c55e;"></div>
-                    <div class="color-option" data-color="#3b82f6" style="background: #3b82f6;"></div>
-                    <div class="color-option" data-color="#f97316" style="background: #f97316;"></div>
-                    <div class="color-option" data-color="#8b5cf6" style="background: #8b5cf6;"></div>
-                    <div class="color-option" data-color="#ec4899" style="background: #ec4899;"></div>
-                    <div class="color-option" data-color="#f59e0b" style="background: #f59e0b;"></div>
-                    <div class="color-option" data-color="#10b981" style="background: #10b981;"></div>
-                    <div class="color-option" data-color="#ef4444" style="background: #ef4444;"></div>
-                    </div>
-                    
-                <label for="player-shape" style="margin-top: 16px;">Choose your shape</label>
-                <div style="display: flex; gap: 8px; margin-top: 8px; justify-content: center; flex-wrap: wrap;">
-                    <div class="shape-option" data-shape="circle" style="background: #374151;">
-                        <div class="shape-preview circle"></div>
-                        </div>
-                    <div class="shape-option" data-shape="star" style="background: #374151;">
-                        <div class="shape-preview star">★</div>
-                    </div>
-                    <div class="shape-option" data-shape="diamond" style="background: #374151;">
-                        <div class="shape-preview diamond"></div>
-                    </div>
-                    <div class="shape-option" data-shape="triangle" style="background: #374151;">
-                        <div class="shape-preview triangle"></div>
-                        </div>
-                    <div class="shape-option" data-shape="square" style="background: #374151;">
-                        <div class="shape-preview square"></div>
-                    </div>
-                    <div class="shape-option" data-shape="rose" style="background: #374151;">
-                        <div class="shape-preview rose">✿</div>
-                    </div>
-                    
-                </div>
-                
-                <div style="display: flex; gap: 12px; margin-top: 16px;">
-                    <button id="start-btn" style="flex: 1;">Start Game</button>
-                    <button id="home-leaderboard-btn" style="flex: 1; background: #059669; border-color: #059669;">View Leaderboard</button>
-                </div>
-            </div>
-        </section>
-
-        <!-- Game Screen -->
-        <section id="game-screen" class="screen">
-            <div class="hud">
-                <div id="timer">00.00</div>
-                <div id="player-label"></div>
-            </div>
-            
-            <div id="canvas-container">
-                <canvas id="game-canvas" width="640" height="640"></canvas>
-                <div id="maze-building-overlay" class="maze-building hidden">
-                    <div class="progress-container">
-                        <div class="progress-bar" id="maze-progress"></div>
-                    </div>
-                </div>
-            </div>
-            
-            <div class="controls">
-                <div class="dpad">
-                    <div class="top-row">
-                        <button id="btn-up" aria-label="Up">▲</button>
-                    </div>
-                    <div class="bottom-row">
-                        <button id="btn-left" aria-label="Left">◀</button>
-                        <button id="btn-down" aria-label="Down">▼</button>
-                        <button id="btn-right" aria-label="Right">▶</button>
-                    </div>
-                </div>
-            </div>
-
-            <!-- Win Overlay -->
-            <div id="win-overlay" class="overlay hidden">
-                <div class="modal">
-                    <h2>🎉 You finished the maze!</h2>
-                    <p id="final-time">Time: 0.00s</p>
-                    <div class="modal-actions">
-                        <button id="view-leaderboard-btn">View Leaderboard</button>
-                        <button id="try-again-btn">Try Again</button>
-                    </div>
-                </div>
-            </div>
-        </section>
-
-        <!-- Leaderboard Screen -->
-        <section id="leaderboard-screen" class="screen">
-            <div class="card">
-                <h2>Leaderboard</h2>
-                <div id="leaderboard-loading" class="hidden">
-                    <span class="loading-spinner"></span> Loading scores...
-                </div>
-                <div class="table-scroll">
-                <table class="table" id="leaderboard-table">
-                    <thead>
-                        <tr>
-                            <th>Rank</th>
-                            <th>Player</th>
-                            <th>Best Time (s)</th>
-                        </tr>
-                    </thead>
-                    <tbody id="leaderboard-body"></tbody>
-                </table>
-                </div>
-                <button id="play-again-btn">Play Again</button>
-            </div>
-        </section>
-    </div>
-
-    <!-- Pyodide loader with fallback -->
-    <script src="https://cdn.jsdelivr.net/pyodide/v0.24.1/full/pyodide.js"></script>
-    <script>
-        // Force show controls on mobile devices - JavaScript fallback
-        function detectMobile() {
-            const isMobile = /Android|webOS|iPhone|iPad|iPod|BlackBerry|IEMobile|Opera Mini/i.test(navigator.userAgent) ||
-                           ('ontouchstart' in window) ||
-                           (navigator.maxTouchPoints > 0) ||
-                           (window.innerWidth <= 768);
-            
-            if (isMobile) {
-                document.documentElement.style.setProperty('--force-mobile-controls', 'grid');
-                document.body.classList.add('mobile-device');
-            }
-        }
-        
-        // Color picker functionality
-        function initializeColorPicker() {
-            const colorOptions = document.querySelectorAll('.color-option');
-            const defaultColor = '#22c55e';
-            
-            // Set default color as selected
-            document.querySelector(`[data-color="${defaultColor}"]`).classList.add('selected');
-            
-            colorOptions.forEach(option => {
-                option.addEventListener('click', function() {
-                    // Remove selection from all options
-                    colorOptions.forEach(opt => opt.classList.remove('selected'));
-                    // Add selection to clicked option
-                    this.classList.add('selected');
-                    
-                    // Update the color preview in the player name input if it has a value
-                    const nameInput = document.getElementById('player-name');
-                    if (nameInput && nameInput.value.trim()) {
-                        updatePlayerPreview();
-                    }
-                });
-            });
-        }
-        
-        // Shape picker functionality
-        function initializeShapePicker() {
-            const shapeOptions = document.querySelectorAll('.shape-option');
-            const defaultShape = 'circle';
-            
-            // Set default shape as selected
-            document.querySelector(`[data-shape="${defaultShape}"]`).classList.add('selected');
-            
-            shapeOptions.forEach(option => {
-                option.addEventListener('click', function() {
-                    // Remove selection from all options
-                    shapeOptions.forEach(opt => opt.classList.remove('selected'));
-                    // Add selection to clicked option
-                    this.classList.add('selected');
-                    
-                    // Update the player preview if name input has a value
-                    const nameInput = document.getElementById('player-name');
-                    if (nameInput && nameInput.value.trim()) {
-                        updatePlayerPreview();
-                    }
-                });
-            });
-        }
-        
-        // Update player preview with selected color and shape
-        function updatePlayerPreview() {
-            const nameInput = document.getElementById('player-name');
-            const selectedColor = getSelectedColor();
-            const selectedShape = getSelectedShape();
-            const playerName = nameInput.value.trim() || 'Player';
-            
-            // Add a small preview next to the input
-            let previewElement = document.getElementById('player-preview');
-            if (!previewElement) {
-                previewElement = document.createElement('div');
-                previewElement.id = 'player-preview';
-                previewElement.style.cssText = 'margin-top: 8px; font-size: 14px; color: #94a3b8; text-align: center;';
-                nameInput.parentNode.insertBefore(previewElement, nameInput.nextSibling);
-            }
-            
-            // Create shape symbol based on selection
-            let shapeSymbol = '●'; // default circle
-            if (selectedShape === 'star') shapeSymbol = '★';
-            else if (selectedShape === 'diamond') shapeSymbol = '◆';
-            else if (selectedShape === 'triangle') shapeSymbol = '▲';
-            else if (selectedShape === 'square') shapeSymbol = '■';
-            else if (selectedShape === 'rose') shapeSymbol = '✿';
-            
-            previewElement.innerHTML = `<span style="color: ${selectedColor};">${shapeSymbol}</span> ${playerName}`;
-        }
-        
-        // Get selected color
-        function getSelectedColor() {
-            const selectedOption = document.querySelector('.color-option.selected');
-            return selectedOption ? selectedOption.dataset.color : '#22c55e';
-        }
-        
-        // Get selected shape
-        function getSelectedShape() {
-            const selectedOption = document.querySelector('.shape-option.selected');
-            return selectedOption ? selectedOption.dataset.shape : 'circle';
-        }
-        
-        // Run mobile detection
-        detectMobile();
-        
-        // Initialize color picker
-        initializeColorPicker();
-        
-        // Initialize shape picker
-        initializeShapePicker();
-        
-        // Add name input listener for live preview
-        const nameInput = document.getElementById('player-name');
-        if (nameInput) {
-            nameInput.addEventListener('input', updatePlayerPreview);
-        }
-        
-        // Re-run on resize
-        window.addEventListener('resize', detectMobile);
-    </script>
-    <script>
-        // Embedded Python game code
-        const PYTHON_GAME_CODE = `
-# pyright: reportMissingImports=false
-from js import document, window, JSON
-from math import floor
-import random
-import time
-import json
-from pyodide.ffi import create_proxy, to_js
-
-# ------------------------------ Config ------------------------------
-GRID_SIZE = 20               # cells per side
-CELL_PIXELS = 32             # canvas pixels per cell (640px canvas)
-WALL_THICKNESS = 2
-DEFAULT_PLAYER_COLOR = "#22c55e"  # Default color, can be changed
-PATH_COLOR = "#0f172a"
-WALL_COLOR = "#334155"
-START_POS = (0, 0)
-EXIT_POS = (GRID_SIZE - 1, GRID_SIZE - 1)
-# Toggle for animated vs instant maze generation
-USE_ANIMATED_BUILD = False
-
-# Backend API base - use current host and port for standalone version
-def _compute_api_base_url() -> str:
-    return f"{window.location.protocol}//{window.location.host}/api"
-
-API_BASE_URL = _compute_api_base_url()
-
-# ------------------------------ State ------------------------------
-class GameState:
     def __init__(self) -> None:
-        self.player_name: str = ""
-        self.player_color: str = DEFAULT_PLAYER_COLOR  # Player's chosen color
-        self.player_shape: str = "circle"  # Player's chosen shape
-        self.grid_width: int = GRID_SIZE
-        self.grid_height: int = GRID_SIZE
-        self.maze_walls = None  # dict with walls per cell
-        self.player_cell = list(START_POS)
-        self.start_time_s: float | None = None
-        self.finished: bool = False
-        self.final_time_s: float = 0.0
-        self.submitted: bool = False
-        self.maze_generating: bool = False
-
-state = GameState()
-
-canvas = document.getElementById("game-canvas")
-ctx = canvas.getContext("2d") if canvas else None
-
-timer_el = document.getElementById("timer")
-player_label_el = document.getElementById("player-label")
-win_overlay_el = document.getElementById("win-overlay")
-final_time_el = document.getElementById("final-time")
-leaderboard_body_el = document.getElementById("leaderboard-body")
-leaderboard_loading_el = document.getElementById("leaderboard-loading")
-leaderboard_table_el = document.getElementById("leaderboard-table")
-maze_building_overlay = document.getElementById("maze-building-overlay")
-maze_progress_bar = document.getElementById("maze-progress")
-
-# Screens
-loading_screen = document.getElementById("loading-screen")
-home_screen = document.getElementById("home-screen")
-game_screen = document.getElementById("game-screen")
-leaderboard_screen = document.getElementById("leaderboard-screen")
-
-# Buttons
-start_btn = document.getElementById("start-btn")
-home_leaderboard_btn = document.getElementById("home-leaderboard-btn")
-play_again_btn = document.getElementById("play-again-btn")
-view_leaderboard_btn = document.getElementById("view-leaderboard-btn")
-try_again_btn = document.getElementById("try-again-btn")
-
-btn_up = document.getElementById("btn-up")
-btn_down = document.getElementById("btn-down")
-btn_left = document.getElementById("btn-left")
-btn_right = document.getElementById("btn-right")
-
-# Keep proxies to prevent garbage collection
-_event_proxies = {}
-
-# ------------------------------ Utility ------------------------------
-
-def show_screen(screen_id: str) -> None:
-    # Smooth transition between screens
-    for s in [loading_screen, home_screen, game_screen, leaderboard_screen]:
-        if s and s.id == screen_id:
-            s.classList.add("active")
-        elif s:
-            s.classList.remove("active")
-
-
-def set_overlay_visible(visible: bool) -> None:
-    if visible:
-        win_overlay_el.classList.remove("hidden")
-        win_overlay_el.classList.add("active")
-    else:
-        win_overlay_el.classList.remove("active")
-        win_overlay_el.classList.add("hidden")
-
+        self.done = False
+        self.task: Optional[asyncio.Task] = None
 
-def format_time_s(seconds: float) -> str:
-    return f"{seconds:.2f}"
+board_migration = BoardMigration()
 
+def migrate_board_rollups_batch(batch_size: int = MIGRATION_BATCH_SIZE) -> Optional[tuple]:
+    """Fold the next batch of scores into the rollups.
 
+    Returns (scores migrated, {(config, name): best time}) or None when no
+    scores are left.
+    """
+    conn = sqlite3.connect(DATABASE_FILE)
+    row = conn.execute("SELECT last_id FROM schema_migrations WHERE name = 'board_rollups'").fetchone()
+    last_id = row[0] if row is not None else 0
+    rows = conn.execute(
+        "SELECT id, config, name, time, created_at FROM scores WHERE id > ? ORDER BY id LIMIT ?",
+        (last_id, batch_size)
+    ).fetchall()
+    if not rows:
+        conn.close()
+        return None
+    best: Dict[tuple, float] = {}
+    period_best: Dict[tuple, float] = {}
+    for _id, config, name, time_val, created_at in rows:
+        if (config, name) not in best or time_val < best[(config, name)]:
+            best[(config, name)] = time_val
+        if created_at:
+            when = datetime.strptime(str(created_at)[:10], "%Y-%m-%d")
+            for board in ("daily", "weekly"):
+                key = (config, period_key(board, when), name)
+                if key not in period_best or time_val < period_best[key]:
+                    period_best[key] = time_val
+    with conn:
+        conn.executemany(UPSERT_BOARD_BEST, [(*key, t) for key, t in best.items()])
+        conn.executemany(UPSERT_BOARD_PERIOD_BEST, [(*key, t) for key, t in period_best.items()])
+        conn.execute('''
+            INSERT INTO schema_migrations (name, last_id) VALUES ('board_rollups', ?)
+            ON CONFLICT (name) DO UPDATE SET last_id = excluded.last_id
+        ''', (rows[-1][0],))
+    conn.close()
+    return len(rows), best
 
+def finish_board_migration() -> None:
+    """Mark the rollups complete, then drop the tables they replace"""
+    conn = sqlite3.connect(DATABASE_FILE)
+    with conn:
+        conn.execute('''
+            INSERT INTO schema_migrations (name, done) VALUES ('board_rollups', 1)
+            ON CONFLICT (name) DO UPDATE SET done = 1
+        ''')
+        conn.execute("DROP TABLE IF EXISTS best_scores")
+        conn.execute("DROP TABLE IF EXISTS period_best")
+        conn.execute(
+            "UPDATE period_snapshots SET period = ? || '/' || period WHERE instr(period, '/') = 0",
+            (DEFAULT_CONFIG,)
+        )
+    conn.close()
+    board_migration.done = True
 
-
-def show_loading_state(button, loading: bool = True):
-    # Show/hide loading state on buttons
-    if loading:
-        button.classList.add("loading")
-        button.disabled = True
-    else:
-        button.classList.remove("loading")
-        button.disabled = False
-
-
-# ------------------------------ Maze Generation ------------------------------
-# Maze represented with walls for each cell: dict keyed by (x,y) -> {N,S,E,W: bool}
-# True means wall exists
-
-async def generate_maze_animated(width: int, height: int) -> dict:
-    # Generate maze with visual animation
-    state.maze_generating = True
-    
-    # Show maze building overlay
-    maze_building_overlay.classList.remove("hidden")
-    
-    # Initialize all walls
-    walls = {}
-    for y in range(height):
-        for x in range(width):
-            walls[(x, y)] = {'N': True, 'S': True, 'E': True, 'W': True}
-    
-    visited = set()
-    stack = [(0, 0)]
-    visited.add((0, 0))
-    
-    opposite = {'N': 'S', 'S': 'N', 'E': 'W', 'W': 'E'}
-    total_cells = width * height
-    processed_cells = 1
-    
-    # Draw initial state
-    draw_maze(walls)
-    
-    # Animation frame counter for smooth updates
-    frame_count = 0
-    update_frequency = 3  # Update every 3 frames for smooth animation
-    
-    while stack:
-        cx, cy = stack[-1]
-        unvisited_neighbors = []
-        for dx, dy, direction in [(0,-1,'N'), (0,1,'S'), (1,0,'E'), (-1,0,'W')]:
-            nx, ny = cx + dx, cy + dy
-            if 0 <= nx < width and 0 <= ny < height:
-                if (nx, ny) not in visited:
-                    unvisited_neighbors.append((nx, ny, direction))
-
-        if unvisited_neighbors:
-            nx, ny, direction = random.choice(unvisited_neighbors)
-            # carve wall
-            walls[(cx, cy)][direction] = False
-            walls[(nx, ny)][opposite[direction]] = False
-            visited.add((nx, ny))
-            stack.append((nx, ny))
-            
-            # Update progress and redraw
-            processed_cells += 1
-            progress = (processed_cells / total_cells) * 100
-            maze_progress_bar.style.width = f"{progress}%"
-            
-            # Only redraw every few frames for smooth animation
-            frame_count += 1
-            if frame_count % update_frequency == 0:
-                draw_maze(walls)
-                
-                # Use JavaScript Promise for smooth delay
-                await window.pyodide.runPythonAsync("import asyncio; await asyncio.sleep(0.03)")
-        else:
-            stack.pop()
-    
-    # Final render to ensure complete maze
-    draw_maze(walls)
-    
-    # Hide overlay and finish
-    maze_building_overlay.classList.add("hidden")
-    state.maze_generating = False
-    return walls
-
-
-def generate_maze(width: int, height: int) -> dict:
-    # Synchronous maze generation (fallback)
-    def neighbors(cx: int, cy: int):
-        for dx, dy, direction in [(0,-1,'N'), (0,1,'S'), (1,0,'E'), (-1,0,'W')]:
-            nx, ny = cx + dx, cy + dy
-            if 0 <= nx < width and 0 <= ny < height:
-                yield nx, ny, direction
-
-    # Initialize all walls
-    walls = {}
-    for y in range(height):
-        for x in range(width):
-            walls[(x, y)] = {'N': True, 'S': True, 'E': True, 'W': True}
-
-    visited = set()
-    stack = [(0, 0)]
-    visited.add((0, 0))
-
-    opposite = {'N': 'S', 'S': 'N', 'E': 'W', 'W': 'E'}
-
-    while stack:
-        cx, cy = stack[-1]
-        unvisited_neighbors = []
-        for nx, ny, direction in neighbors(cx, cy):
-            if (nx, ny) not in visited:
-                unvisited_neighbors.append((nx, ny, direction))
-
-        if unvisited_neighbors:
-            nx, ny, direction = random.choice(unvisited_neighbors)
-            # carve wall
-            walls[(cx, cy)][direction] = False
-            walls[(nx, ny)][opposite[direction]] = False
-            visited.add((nx, ny))
-            stack.append((nx, ny))
-        else:
-            stack.pop()
-
-    return walls
-
-# ------------------------------ Rendering ------------------------------
-
-def clear_canvas() -> None:
-    if not ctx:
+async def run_board_migration(batch_size: int = MIGRATION_BATCH_SIZE) -> None:
+    """Migrate batch by batch on a worker thread, keeping the rank indexes current"""
+    migrated = 0
+    try:
+        while True:
+            batch = await asyncio.to_thread(migrate_board_rollups_batch, batch_size)
+            if batch is None:
+                break
+            count, best = batch
+            migrated += count
+            for (config, name), time_val in best.items():
+                get_rank_index(config).record(name, time_val)
+            await asyncio.sleep(MIGRATION_PAUSE_S)
+        await asyncio.to_thread(finish_board_migration)
+    except Exception:
+        logger.exception("Leaderboard migration failed; it resumes on the next start")
         return
-    ctx.fillStyle = PATH_COLOR
-    ctx.fillRect(0, 0, canvas.width, canvas.height)
+    logger.info("Migrated scores into per-configuration leaderboards", extra={"scores": migrated})
 
+def start_board_migration() -> None:
+    if not board_migration.done and board_migration.task is None:
+        board_migration.task = asyncio.get_running_loop().create_task(run_board_migration())
 
-def draw_maze(walls: dict) -> None:
-    clear_canvas()
-    if not ctx:
-        return
-    ctx.strokeStyle = WALL_COLOR
-    ctx.lineWidth = WALL_THICKNESS
-    
-    # Draw walls with smooth animation effect
-    for (x, y), w in walls.items():
-        px = x * CELL_PIXELS
-        py = y * CELL_PIXELS
-        if w['N']:
-            ctx.beginPath(); ctx.moveTo(px, py); ctx.lineTo(px + CELL_PIXELS, py); ctx.stroke()
-        if w['S']:
-            ctx.beginPath(); ctx.moveTo(px, py + CELL_PIXELS); ctx.lineTo(px + CELL_PIXELS, py + CELL_PIXELS); ctx.stroke()
-        if w['W']:
-            ctx.beginPath(); ctx.moveTo(px, py); ctx.lineTo(px, py + CELL_PIXELS); ctx.stroke()
-        if w['E']:
-            ctx.beginPath(); ctx.moveTo(px + CELL_PIXELS, py); ctx.lineTo(px + CELL_PIXELS, py + CELL_PIXELS); ctx.stroke()
-
-    # draw start & exit with glow effect
-    ctx.shadowColor = "#0ea5e9"
-    ctx.shadowBlur = 10
-    ctx.fillStyle = "#0ea5e9"
-    rectpad = 6
-    sx, sy = START_POS
-    ex, ey = EXIT_POS
-    ctx.fillRect(sx * CELL_PIXELS + rectpad, sy * CELL_PIXELS + rectpad, CELL_PIXELS - 2*rectpad, CELL_PIXELS - 2*rectpad)
-    
-    ctx.shadowColor = "#f97316"
-    ctx.fillStyle = "#f97316"
-    ctx.fillRect(ex * CELL_PIXELS + rectpad, ey * CELL_PIXELS + rectpad, CELL_PIXELS - 2*rectpad, CELL_PIXELS - 2*rectpad)
-    
-    # Reset shadow
-    ctx.shadowBlur = 0
-
+async def stop_board_migration() -> None:
+    task = board_migration.task
+    if task is not None and not task.done():
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+    board_migration.task = None
 
-def draw_player(cell_x: int, cell_y: int) -> None:
-    if not ctx:
-        return
-    
-    px = cell_x * CELL_PIXELS
-    py = cell_y * CELL_PIXELS
-    pad = 8
-    size = CELL_PIXELS - 2*pad
-    center_x = px + CELL_PIXELS // 2
-    center_y = py + CELL_PIXELS // 2
-    
-    # Add glow effect to player using selected color
-    ctx.shadowColor = state.player_color
-    ctx.shadowBlur = 15
-    ctx.fillStyle = state.player_color
-    
-    # Draw different shapes based on player selection
-    if state.player_shape == "circle":
-        ctx.beginPath()
-        ctx.arc(center_x, center_y, size // 2, 0, 2 * 3.14159)
-        ctx.fill()
-    
-    elif state.player_shape == "star":
-        # Draw a star using multiple triangles
-        ctx.save()
-        ctx.translate(center_x, center_y)
-        ctx.rotate(3.14159 / 2)  # Rotate 90 degrees
-        
-        # Draw 5-pointed star
-        for i in range(5):
-            ctx.rotate(2 * 3.14159 / 5)
-            ctx.beginPath()
-            ctx.moveTo(0, -size // 2)
-            ctx.lineTo(size // 8, -size // 4)
-            ctx.lineTo(size // 2, -size // 4)
-            ctx.lineTo(size // 4, 0)
-            ctx.lineTo(size // 2, size // 4)
-            ctx.lineTo(size // 8, size // 4)
-            ctx.closePath()
-            ctx.fill()
-        ctx.restore()
-    
-    elif state.player_shape == "diamond":
-        ctx.beginPath()
-        ctx.moveTo(center_x, py + pad)
-        ctx.lineTo(px + CELL_PIXELS - pad, center_y)
-        ctx.lineTo(center_x, py + CELL_PIXELS - pad)
-        ctx.lineTo(px + pad, center_y)
-        ctx.closePath()
-        ctx.fill()
-    
-    elif state.player_shape == "triangle":
-        ctx.beginPath()
-        ctx.moveTo(center_x, py + pad)
-        ctx.lineTo(px + pad, py + CELL_PIXELS - pad)
-        ctx.lineTo(px + CELL_PIXELS - pad, py + CELL_PIXELS - pad)
-        ctx.closePath()
-        ctx.fill()
-    
-    elif state.player_shape == "square":
-        ctx.fillRect(px + pad, py + pad, size, size)
-    
-    elif state.player_shape == "rose":
-        # Draw a beautiful rose using petals
-        ctx.save()
-        ctx.translate(center_x, center_y)
-        
-        # Draw multiple layers of petals for a realistic rose
-        for layer in range(3):
-            petal_count = 8 - layer * 2  # More petals in outer layers
-            petal_size = size // 2 - layer * 4
-            
-            for i in range(petal_count):
-                ctx.rotate(2 * 3.14159 / petal_count)
-                ctx.fillStyle = state.player_color
-                
-                # Draw petal shape using ellipse
-                ctx.beginPath()
-                ctx.ellipse(0, -petal_size // 2, petal_size // 3, petal_size // 2, 0, 0, 2 * 3.14159)
-                ctx.fill()
-    
-        # Draw center
-        ctx.fillStyle = state.player_color
-        ctx.beginPath()
-        ctx.arc(0, 0, size // 8, 0, 2 * 3.14159)
-        ctx.fill()
-        
-        ctx.restore()
-    
-    else:
-        # Fallback to circle
-        ctx.beginPath()
-        ctx.arc(center_x, center_y, size // 2, 0, 2 * 3.14159)
-        ctx.fill()
-    
-    # Reset shadow
-    ctx.shadowBlur = 0
+init_database()
 
-# ------------------------------ Game Logic ------------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    setup_logging()
+    start_lag_probe()
+    start_board_migration()
+    yield
+    await stop_board_migration()
+    await stop_lag_probe()
 
-def can_move_to(from_x: int, from_y: int, dir_str: str) -> bool:
-    w = state.maze_walls[(from_x, from_y)]
-    if w[dir_str]:
-        return False
-    if dir_str == 'N':
-        return from_y - 1 >= 0
-    if dir_str == 'S':
-        return from_y + 1 < state.grid_height
-    if dir_str == 'W':
-        return from_x - 1 >= 0
-    if dir_str == 'E':
-        return from_x + 1 < state.grid_width
-    return False
-
-
-def try_move(dir_str: str) -> None:
-    if state.finished or state.maze_walls is None:
-        return
-    x, y = state.player_cell
-    if not can_move_to(x, y, dir_str):
-        return
-    if dir_str == 'N':
-        y -= 1
-    elif dir_str == 'S':
-        y += 1
-    elif dir_str == 'W':
-        x -= 1
-    elif dir_str == 'E':
-        x += 1
-    state.player_cell = [x, y]
-    render()
-    check_win()
-
-
-def check_win() -> None:
-    if tuple(state.player_cell) == EXIT_POS:
-        state.finished = True
-        if state.start_time_s is not None:
-            state.final_time_s = time.time() - state.start_time_s
-        final_time_el.innerText = f"Time: {format_time_s(state.final_time_s)}s"
-        set_overlay_visible(True)
-        # auto submit once
-        if not state.submitted:
-            window.pyodide.runPythonAsync("await submit_score()")
-            state.submitted = True
-
-
-def render() -> None:
-    if state.maze_walls is None:
-        return
-    draw_maze(state.maze_walls)
-    draw_player(state.player_cell[0], state.player_cell[1])
-
-
-async def reset_and_start() -> None:
-    # Start new game with animated maze generation
-    state.grid_width = GRID_SIZE
-    state.grid_height = GRID_SIZE
-    state.player_cell = list(START_POS)
-    state.start_time_s = time.time()
-    state.finished = False
-    state.final_time_s = 0.0
-    state.submitted = False
-    
-    # Preserve player color and shape when resetting
-    if not state.player_color:
-        state.player_color = DEFAULT_PLAYER_COLOR
-    if not state.player_shape:
-        state.player_shape = "circle"
-    
-    # Create colored player label with selected color and shape
-    shape_symbols = {"circle": "●", "star": "★", "diamond": "◆", "triangle": "▲", "square": "■", "rose": "✿"}
-    shape_symbol = shape_symbols.get(state.player_shape, "●")
-    player_label_el.innerHTML = f'<span style="color: {state.player_color};">{shape_symbol}</span> {state.player_name}'
-    timer_el.innerText = "00.00"
-    set_overlay_visible(False)
-    
-    # Generate maze (animated or instant based on flag)
+class ScoreIn(BaseModel):
+    name: str = Field(min_length=1, max_length=64)
+    time: float = Field(ge=0.0, lt=36000)
+    grid_size: int = Field(DEFAULT_GRID_SIZE, ge=MIN_GRID_SIZE, le=MAX_GRID_SIZE)
+    algorithm: str = Field(DEFAULT_ALGORITHM, pattern=ALGORITHM_PATTERN)
+    seed: Optional[int] = Field(None, ge=0, lt=2**31)
+    run_id: Optional[str] = Field(None, pattern=RUN_ID_PATTERN)
+app = FastAPI(title="Maze Runner Game", version="1.0.0", lifespan=lifespan)
+
+# ------------------------------ Metrics ------------------------------
+# Counters and fixed-bucket histograms, exposed at /metrics in the Prometheus
+# text format. Every update runs on the event loop thread, so there are no
+# locks: an update is a dict lookup and an add. Gauges are read from
+# callbacks at scrape time.
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+LOOP_LAG_INTERVAL_S = 0.25
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def _format_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{escaped}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1.0) -> None:
+        self.values[label_values] = self.values.get(label_values, 0.0) + amount
+
+    def get(self, *label_values) -> float:
+        return self.values.get(label_values, 0.0)
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {value:g}" for key, value in self.values.items()]
+
+class Gauge:
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, read) -> None:
+        self.name = name
+        self.help = help_text
+        self.read = read  # callable returning the current value
+
+    def render(self) -> List[str]:
+        return [f"{self.name} {self.read():g}"]
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [count per bucket..., count above the last bucket, sum]
+        self.series: Dict[tuple, list] = {}
+
+    def observe(self, value: float, *label_values) -> None:
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, series in self.series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), series):
+                cumulative += count
+                le = 'le="' + str(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-1]:g}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self) -> None:
+        self.metrics: List[Any] = []
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> Counter:
+        return self._register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, read) -> Gauge:
+        return self._register(Gauge(name, help_text, read))
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help_text, labels, buckets))
+
+    def _register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+HTTP_REQUESTS = metrics.counter("maze_http_requests_total", "HTTP requests by route and status", ("method", "route", "status"))
+HTTP_LATENCY = metrics.histogram("maze_http_request_duration_seconds", "HTTP request latency by route", ("method", "route"))
+DB_QUERY_LATENCY = metrics.histogram("maze_db_query_duration_seconds", "SQLite time by query", ("query",))
+CACHE_REQUESTS = metrics.counter("maze_cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result"))
+EVENT_LOOP_LAG = metrics.histogram("maze_event_loop_lag_seconds", "Extra delay of a periodic event loop wakeup")
+_http_in_flight = 0
+metrics.gauge("maze_http_requests_in_flight", "HTTP requests being handled", lambda: _http_in_flight)
+
+@contextmanager
+def db_timer(query: str):
+    """Record the time spent in a block of SQLite calls under ``query``"""
+    started = time.perf_counter()
     try:
-        if USE_ANIMATED_BUILD:
-            state.maze_walls = await generate_maze_animated(state.grid_width, state.grid_height)
+        yield
+    finally:
+        DB_QUERY_LATENCY.observe(time.perf_counter() - started, query)
+
+async def probe_event_loop_lag() -> None:
+    """Sleep a fixed interval and record how late the loop wakes us up"""
+    global _heartbeat_due
+    while True:
+        started = time.perf_counter()
+        _heartbeat_due = started + LOOP_LAG_INTERVAL_S  # read by the watchdog thread
+        await asyncio.sleep(LOOP_LAG_INTERVAL_S)
+        EVENT_LOOP_LAG.observe(max(0.0, time.perf_counter() - started - LOOP_LAG_INTERVAL_S))
+
+_lag_probe: Optional[asyncio.Task] = None
+
+def start_lag_probe() -> None:
+    """Run the lag probe, and the watchdog thread if enabled, on the running loop"""
+    global _lag_probe
+    if _lag_probe is None:
+        _lag_probe = asyncio.get_running_loop().create_task(probe_event_loop_lag())
+        start_loop_watchdog(threading.get_ident())
+
+async def stop_lag_probe() -> None:
+    global _lag_probe, _heartbeat_due
+    stop_loop_watchdog()
+    if _lag_probe is not None:
+        _lag_probe.cancel()
+        try:
+            await _lag_probe
+        except asyncio.CancelledError:
+            pass
+        _lag_probe = None
+    _heartbeat_due = None
+
+# ------------------------------ Event Loop Watchdog ------------------------------
+# A thread that notices when the lag probe oversleeps, i.e. something is
+# blocking the event loop (sqlite3 calls inside async routes, say), and
+# captures the loop thread's stack while it is still stuck. Modes
+# (MAZE_LOOP_WATCHDOG): "off"; "sample", which polls a few times a second and
+# keeps at most one stack per cooldown, cheap enough to leave on; "full",
+# which polls every few ms and captures every stall.
+
+LOOP_WATCHDOG_MODE = os.environ.get("MAZE_LOOP_WATCHDOG", "off")
+LOOP_STALL_THRESHOLD_S = float(os.environ.get("MAZE_LOOP_STALL_MS", "100")) / 1000
+LOOP_WATCHDOG_POLL_S = {"sample": 0.1, "full": 0.005}
+LOOP_STALL_COOLDOWN_S = {"sample": 10.0, "full": 0.0}
+LOOP_STALL_HISTORY = 20
+
+_heartbeat_due: Optional[float] = None
+_watchdog: Optional[threading.Thread] = None
+_watchdog_stop = threading.Event()
+loop_stalls: "deque[Dict[str, Any]]" = deque(maxlen=LOOP_STALL_HISTORY)
+# Only the watchdog thread writes this counter
+LOOP_STALLS = metrics.counter("maze_event_loop_stalls_total", "Event loop stalls over the watchdog threshold")
+
+def capture_loop_stall(loop_thread_id: int, lag_s: float) -> Optional[Dict[str, Any]]:
+    """Record the stack the event loop thread is executing right now"""
+    frame = sys._current_frames().get(loop_thread_id)
+    if frame is None:
+        return None
+    stall = {
+        "at": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "lag_ms": round(lag_s * 1000, 1),
+        "stack": traceback.format_stack(frame),
+    }
+    loop_stalls.append(stall)
+    logger.warning("Event loop blocked", extra={"lag_ms": stall["lag_ms"], "stack": "".join(stall["stack"])})
+    return stall
+
+def run_loop_watchdog(loop_thread_id: int, mode: str) -> None:
+    poll_s = LOOP_WATCHDOG_POLL_S[mode]
+    cooldown_s = LOOP_STALL_COOLDOWN_S[mode]
+    reported_due = None
+    last_capture = float("-inf")
+    while not _watchdog_stop.wait(poll_s):
+        due = _heartbeat_due
+        if due is None or due == reported_due:
+            continue
+        now = time.perf_counter()
+        lag = now - due
+        if lag < LOOP_STALL_THRESHOLD_S:
+            continue
+        reported_due = due  # one report per stalled heartbeat
+        LOOP_STALLS.inc()
+        if now - last_capture >= cooldown_s:
+            last_capture = now
+            capture_loop_stall(loop_thread_id, lag)
+
+def start_loop_watchdog(loop_thread_id: int) -> None:
+    global _watchdog
+    if LOOP_WATCHDOG_MODE not in LOOP_WATCHDOG_POLL_S or _watchdog is not None:
+        return
+    _watchdog_stop.clear()
+    _watchdog = threading.Thread(
+        target=run_loop_watchdog, args=(loop_thread_id, LOOP_WATCHDOG_MODE),
+        name="loop-watchdog", daemon=True,
+    )
+    _watchdog.start()
+
+def stop_loop_watchdog() -> None:
+    global _watchdog
+    if _watchdog is not None:
+        _watchdog_stop.set()
+        _watchdog.join()
+        _watchdog = None
+
+# ------------------------------ Idempotent Submissions ------------------------------
+# Clients send a run id with each score (Idempotency-Key header and/or run_id
+# in the body). Responses to recent run ids are kept in memory, so a retry,
+# double click or queued replay is answered from a dict lookup before any
+# rate-limit token, body parsing or write. The score_runs table (run id as its
+# primary key) catches whatever falls out of the cache.
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+IDEMPOTENCY_CACHE_SIZE = int(os.environ.get("MAZE_IDEMPOTENCY_CACHE_SIZE", "20000"))
+IDEMPOTENCY_TTL_S = float(os.environ.get("MAZE_IDEMPOTENCY_TTL_S", str(24 * 3600)))
+IDEMPOTENT_REPLAY_HEADERS = {"Idempotent-Replayed": "true"}
+
+class IdempotencyCache:
+    """Responses by idempotency key, in an LRU map whose entries expire"""
+
+    def __init__(self, size: int = IDEMPOTENCY_CACHE_SIZE, ttl_s: float = IDEMPOTENCY_TTL_S) -> None:
+        self.size = size
+        self.ttl_s = ttl_s
+        self.entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (expires, response)
+
+    def get(self, key: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            CACHE_REQUESTS.inc("idempotency", "miss")
+            return None
+        now = time.monotonic() if now is None else now
+        if entry[0] <= now:
+            del self.entries[key]
+            CACHE_REQUESTS.inc("idempotency", "miss")
+            return None
+        self.entries.move_to_end(key)
+        CACHE_REQUESTS.inc("idempotency", "hit")
+        return entry[1]
+
+    def put(self, key: str, response: Dict[str, Any], now: Optional[float] = None) -> None:
+        now = time.monotonic() if now is None else now
+        self.entries[key] = (now + self.ttl_s, response)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+idempotency_cache = IdempotencyCache()
+metrics.gauge("maze_idempotency_cache_entries", "Recent submissions remembered by run id",
+              lambda: len(idempotency_cache.entries))
+
+def header_idempotency_key(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == IDEMPOTENCY_HEADER:
+            return value.decode("latin-1")
+    return None
+
+def idempotency_cache_key(path: str, key: str) -> str:
+    """Cache key of a header key; batch responses live apart from per-run ones"""
+    return f"batch:{key}" if path == SUBMIT_BATCH_PATH else key
+
+# ------------------------------ Admission Control ------------------------------
+# Score submissions write to SQLite on the event loop, so a flood of them
+# stalls every other request. Each client address and each player name gets
+# a token bucket (429 when empty), and submissions are shed with 503 while
+# too many are pending or recent writes are over the latency budget. Both
+# come with Retry-After. A rate of 0 turns that limit off.
+
+SUBMIT_BATCH_PATH = "/api/submit_scores"
+SUBMIT_PATHS = frozenset({"/api/submit_score", SUBMIT_BATCH_PATH})
+SUBMIT_RATE_PER_IP = float(os.environ.get("MAZE_SUBMIT_RATE_PER_IP", "0.5"))      # tokens/s
+SUBMIT_BURST_PER_IP = float(os.environ.get("MAZE_SUBMIT_BURST_PER_IP", "10"))
+SUBMIT_RATE_PER_NAME = float(os.environ.get("MAZE_SUBMIT_RATE_PER_NAME", "0.2"))
+SUBMIT_BURST_PER_NAME = float(os.environ.get("MAZE_SUBMIT_BURST_PER_NAME", "5"))
+# Scores sent in batches draw on their own per-address budget, one token each
+SUBMIT_BATCH_RATE_PER_IP = float(os.environ.get("MAZE_SUBMIT_BATCH_RATE_PER_IP", "1"))
+SUBMIT_BATCH_BURST_PER_IP = float(os.environ.get("MAZE_SUBMIT_BATCH_BURST_PER_IP", "100"))
+RATE_LIMIT_MAX_KEYS = int(os.environ.get("MAZE_RATE_LIMIT_MAX_KEYS", "10000"))
+SUBMIT_MAX_PENDING = int(os.environ.get("MAZE_SUBMIT_MAX_PENDING", "32"))
+SUBMIT_DB_BUDGET_S = float(os.environ.get("MAZE_SUBMIT_DB_BUDGET_MS", "50")) / 1000
+SUBMIT_LATENCY_SMOOTHING = 0.2   # weight of the newest write in the moving average
+SUBMIT_MIN_ADMIT = 0.1           # share still admitted when over budget, so the average can recover
+SHED_RETRY_AFTER_S = 2
+
+SUBMIT_REJECTED = metrics.counter(
+    "maze_submit_rejected_total", "Score submissions refused by admission control", ("reason",))
+
+class TokenBuckets:
+    """Per-key token buckets in a bounded LRU map.
+
+    A bucket idle for burst / rate seconds is full again, the same as a new
+    one, so such entries are dropped as they reach the old end of the map.
+    """
+
+    def __init__(self, rate: float, burst: float, max_keys: int = RATE_LIMIT_MAX_KEYS) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.idle_s = burst / rate if rate > 0 else 0.0
+        self.buckets: "OrderedDict[str, list]" = OrderedDict()  # key -> [tokens, updated]
+
+    def take(self, key: str, now: Optional[float] = None) -> float:
+        """Spend a token; returns 0 on success, else seconds until one is available"""
+        if self.rate <= 0:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        bucket = self.buckets.pop(key, None)
+        if bucket is None:
+            bucket = [self.burst, now]
         else:
-            state.maze_walls = generate_maze(state.grid_width, state.grid_height)
-    except Exception:
-        # Fallback to synchronous generation if animation fails
-        state.maze_walls = generate_maze(state.grid_width, state.grid_height)
-    
-    render()
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        self.buckets[key] = bucket
+        self._evict(now)
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            return 0.0
+        return (1 - bucket[0]) / self.rate
+
+    def _evict(self, now: float) -> None:
+        while self.buckets:
+            oldest = next(iter(self.buckets.values()))
+            if len(self.buckets) <= self.max_keys and now - oldest[1] < self.idle_s:
+                break
+            self.buckets.popitem(last=False)
+
+ip_buckets = TokenBuckets(SUBMIT_RATE_PER_IP, SUBMIT_BURST_PER_IP)
+name_buckets = TokenBuckets(SUBMIT_RATE_PER_NAME, SUBMIT_BURST_PER_NAME)
+batch_buckets = TokenBuckets(SUBMIT_BATCH_RATE_PER_IP, SUBMIT_BATCH_BURST_PER_IP)
+metrics.gauge("maze_rate_limit_keys", "Client addresses and names being rate limited",
+              lambda: len(ip_buckets.buckets) + len(name_buckets.buckets) + len(batch_buckets.buckets))
+
+class SubmitAdmission:
+    """Pending submissions and a moving average of their write time"""
 
-    # start ticking timer via requestAnimationFrame with persistent proxy
-    def _tick(ts):
-        if state.finished or state.start_time_s is None:
+    def __init__(self) -> None:
+        self.pending = 0
+        self.write_s = 0.0
+
+    def record_write(self, seconds: float) -> None:
+        self.write_s += SUBMIT_LATENCY_SMOOTHING * (seconds - self.write_s)
+
+    def shed_reason(self) -> Optional[str]:
+        if self.pending >= SUBMIT_MAX_PENDING:
+            return "pending"
+        if self.write_s > SUBMIT_DB_BUDGET_S:
+            # Shed more the further over budget, but let some through to re-measure
+            over = (self.write_s - SUBMIT_DB_BUDGET_S) / SUBMIT_DB_BUDGET_S
+            if random.random() < min(1 - SUBMIT_MIN_ADMIT, over):
+                return "db_latency"
+        return None
+
+submit_admission = SubmitAdmission()
+metrics.gauge("maze_submit_pending", "Score submissions being handled", lambda: submit_admission.pending)
+
+def retry_after_headers(seconds: float) -> Dict[str, str]:
+    return {"Retry-After": str(max(1, int(seconds + 0.999)))}
+
+def mark_route(scope) -> None:
+    """Label a response sent before routing with its route, for metrics and the access log"""
+    for route in app.router.routes:
+        if getattr(route, "path", None) == scope["path"]:
+            scope["route"] = route
             return
-        elapsed = time.time() - state.start_time_s
-        timer_el.innerText = format_time_s(elapsed)
-        window.requestAnimationFrame(_event_proxies['tick'])
-    _event_proxies['tick'] = create_proxy(_tick)
-    window.requestAnimationFrame(_event_proxies['tick'])
-
-# ------------------------------ Input Handlers ------------------------------
-
-def on_keydown(evt):
-    key = evt.key.lower()
-    if key in ['arrowup', 'w']:
-        try_move('N')
-    elif key in ['arrowdown', 's']:
-        try_move('S')
-    elif key in ['arrowleft', 'a']:
-        try_move('W')
-    elif key in ['arrowright', 'd']:
-        try_move('E')
-
-
-async def on_start_click(_e=None):
-    if _e and hasattr(_e, 'preventDefault'):
-        _e.preventDefault()
-    name_input = document.getElementById('player-name')
-    state.player_name = (name_input.value or 'Player').strip()
-    
-    # Get selected color and shape from JavaScript
-    try:
-        selected_color = window.getSelectedColor()
-        state.player_color = selected_color
-        selected_shape = window.getSelectedShape()
-        state.player_shape = selected_shape
-    except Exception:
-        # Fallback to defaults if JavaScript fails
-        state.player_color = DEFAULT_PLAYER_COLOR
-        state.player_shape = "circle"
-    
-    show_screen('game-screen')
-    
-    # Show loading state on start button
-    if start_btn:
-        show_loading_state(start_btn, True)
-    
-    try:
-        await reset_and_start()
-    except Exception:
-        # Fallback to synchronous version if async fails
-        reset_and_start()
-    finally:
-        # Hide loading state
-        if start_btn:
-            show_loading_state(start_btn, False)
 
+def check_name_rate(name: str) -> None:
+    """429 if this player name has submitted too often (called once the body is parsed)"""
+    wait = name_buckets.take(name.strip().casefold())
+    if wait:
+        SUBMIT_REJECTED.inc("name")
+        raise HTTPException(status_code=429, detail="Too many scores for this player, slow down",
+                            headers=retry_after_headers(wait))
 
-def on_start_click_sync(_e=None):
-    # Synchronous fallback for start button
-    if _e and hasattr(_e, 'preventDefault'):
-        _e.preventDefault()
-    name_input = document.getElementById('player-name')
-    state.player_name = (name_input.value or 'Player').strip()
-    
-    # Get selected color and shape from JavaScript
-    try:
-        selected_color = window.getSelectedColor()
-        state.player_color = selected_color
-        selected_shape = window.getSelectedShape()
-        state.player_shape = selected_shape
-    except Exception:
-        # Fallback to defaults if JavaScript fails
-        state.player_color = DEFAULT_PLAYER_COLOR
-        state.player_shape = "circle"
-    
-    show_screen('game-screen')
-    reset_and_start()
-
+class SubmitAdmissionMiddleware:
+    """Refuse submissions by client address or overload before their body is read"""
 
-def reset_leaderboard_state():
-    # Reset leaderboard to initial state
-    if leaderboard_loading_el:
-        leaderboard_loading_el.classList.add("hidden")
-    if leaderboard_table_el:
-        leaderboard_table_el.classList.remove("hidden")
-    if leaderboard_body_el:
-        leaderboard_body_el.innerHTML = ""
+    def __init__(self, app) -> None:
+        self.app = app
 
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http" or scope["path"] not in SUBMIT_PATHS:
+            await self.app(scope, receive, send)
+            return
+        key = header_idempotency_key(scope)
+        replay = idempotency_cache.get(idempotency_cache_key(scope["path"], key)) if key else None
+        if replay is not None:
+            mark_route(scope)
+            await JSONResponse(replay, headers=IDEMPOTENT_REPLAY_HEADERS)(scope, receive, send)
+            return
+        # The peer address; behind a proxy, uvicorn takes it from X-Forwarded-For
+        # only for addresses in --forwarded-allow-ips (see the Procfile)
+        client = scope["client"][0] if scope.get("client") else "unknown"
+        wait = ip_buckets.take(client)
+        reason = "ip" if wait else submit_admission.shed_reason()
+        if reason is not None:
+            SUBMIT_REJECTED.inc(reason)
+            mark_route(scope)
+            status, detail = (429, "Too many submissions, slow down") if reason == "ip" else \
+                (503, "Server busy, try again shortly")
+            response = JSONResponse({"detail": detail}, status_code=status,
+                                    headers=retry_after_headers(wait or SHED_RETRY_AFTER_S))
+            await response(scope, receive, send)
+            return
+        submit_admission.pending += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            submit_admission.pending -= 1
+
+# Registered before the metrics and access-log middleware, so it runs inside
+# them, and before CORS, so its refusals carry the CORS headers and preflight
+# requests never reach it
+app.add_middleware(SubmitAdmissionMiddleware)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
+)
 
-def on_play_again(_e=None):
-    show_screen('home-screen')
-    set_overlay_visible(False)
-    reset_leaderboard_state()
-
+class MetricsMiddleware:
+    """Count and time every HTTP request by its route template"""
 
-async def on_try_again(_e=None):
-    set_overlay_visible(False)
-    await reset_and_start()
+    def __init__(self, app) -> None:
+        self.app = app
 
+    async def __call__(self, scope, receive, send) -> None:
+        global _http_in_flight
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
 
-def on_try_again_sync(_e=None):
-    # Synchronous fallback for try again button
-    set_overlay_visible(False)
-    reset_and_start()
+        async def send_with_status(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
 
-async def on_view_leaderboard(_e=None):
-    # Load leaderboard with loading state
-    # Ensure elements exist before proceeding
-    if not leaderboard_loading_el or not leaderboard_table_el:
-        print("Leaderboard elements not found")
-        show_screen('leaderboard-screen')
-        return
-    
-    print("Showing leaderboard loading state...")
-    # Show loading state
-    leaderboard_loading_el.classList.remove("hidden")
-    leaderboard_table_el.classList.add("hidden")
-    # Also toggle inline styles as a safety net
-    leaderboard_loading_el.style.display = ""
-    leaderboard_table_el.style.display = "none"
-    
-    # Load the leaderboard data
-    await load_leaderboard()
-    
-    print("Leaderboard loaded, hiding loading state...")
-    # Hide loading, show table with a small delay to ensure smooth transition
-    await window.pyodide.runPythonAsync("import asyncio; await asyncio.sleep(0.1)")
-    
-    # Hide loading, show table
-    leaderboard_loading_el.classList.add("hidden")
-    leaderboard_table_el.classList.remove("hidden")
-    # Also toggle inline styles as a safety net
-    leaderboard_loading_el.style.display = "none"
-    leaderboard_table_el.style.display = ""
-    print("Loading state hidden, table shown")
-    
-    show_screen('leaderboard-screen')
+        _http_in_flight += 1
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            _http_in_flight -= 1
+            route = scope.get("route")
+            # Route templates keep label cardinality bounded; unknown paths share one label
+            path = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            HTTP_LATENCY.observe(time.perf_counter() - started, method, path)
+            HTTP_REQUESTS.inc(method, path, status)
+
+app.add_middleware(MetricsMiddleware)
+
+# Access log: one line per request with its duration and id. High-volume
+# routes are sampled (MAZE_ACCESS_LOG_SAMPLE="<route template or prefix*>=<rate>,...");
+# errors and slow requests are always logged.
+ACCESS_LOG = os.environ.get("MAZE_ACCESS_LOG", "1") != "0"
+ACCESS_LOG_SLOW_S = float(os.environ.get("MAZE_ACCESS_LOG_SLOW_MS", "500")) / 1000
+ACCESS_LOG_SAMPLE = os.environ.get(
+    "MAZE_ACCESS_LOG_SAMPLE", "/static/{filename}=0.1,/pyodide/*=0.1,/api/telemetry=0.1,/metrics=0.01")
+REQUEST_ID_HEADER = b"x-request-id"
+REQUEST_ID_MAX_LENGTH = 64
+
+access_logger = logging.getLogger("maze.access")
+
+def parse_sample_rates(raw: str) -> Dict[str, float]:
+    rates = {}
+    for part in raw.split(","):
+        route, _, rate = part.rpartition("=")
+        if route.strip():
+            rates[route.strip()] = float(rate)
+    return rates
+
+access_log_rates = parse_sample_rates(ACCESS_LOG_SAMPLE)
+
+def access_log_rate(route: str) -> float:
+    rate = access_log_rates.get(route)
+    if rate is not None:
+        return rate
+    for pattern, rate in access_log_rates.items():
+        if pattern.endswith("*") and route.startswith(pattern[:-1]):
+            return rate
+    return 1.0
+
+def incoming_request_id(scope) -> str:
+    """The caller's X-Request-ID if it is short and printable, else a new id"""
+    for name, value in scope["headers"]:
+        if name == REQUEST_ID_HEADER:
+            if len(value) <= REQUEST_ID_MAX_LENGTH and value.isascii() and value.decode().isprintable():
+                return value.decode()
+            break
+    # Only needs to be unique, not unguessable; getrandbits avoids a syscall
+    return f"{random.getrandbits(64):016x}"
+
+class AccessLogMiddleware:
+    """Give each request an id (echoed as X-Request-ID) and log it when done"""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = incoming_request_id(scope)
+        token = request_id_var.set(request_id)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_id(message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = [*message.get("headers", ()), (REQUEST_ID_HEADER, request_id.encode())]
+            await send(message)
 
-# ------------------------------ Leaderboard ------------------------------
-async def submit_score(_e=None):
-    if _e and hasattr(_e, 'preventDefault'):
-        _e.preventDefault()
-    
-    # Show loading state on submit button if available
-    if view_leaderboard_btn:
-        show_loading_state(view_leaderboard_btn, True)
-    
-    payload = {"name": state.player_name or "Player", "time": round(state.final_time_s, 2)}
-    url = f"{API_BASE_URL}/submit_score"
-    js_payload = to_js(payload, dict_converter=window.Object.fromEntries)
-    body_str = JSON.stringify(js_payload)
-    opts = {"method": "POST", "headers": {"Content-Type": "application/json"}, "body": body_str}
-    opts_js = to_js(opts, dict_converter=window.Object.fromEntries)
-    
-    try:
-        resp = await window.fetch(url, opts_js)
-        # regardless of result, we don't block UI; leaderboard load happens when requested
-    finally:
-        # Hide loading state
-        if view_leaderboard_btn:
-            show_loading_state(view_leaderboard_btn, False)
-
-async def load_leaderboard():
-    # Load leaderboard data with proper error handling
-    # Clear previous data
-    if leaderboard_body_el:
-        leaderboard_body_el.innerHTML = ""
-    
-    url = f"{API_BASE_URL}/leaderboard"
-    
-    async def _try_fetch_once():
-        resp = await window.fetch(url)
-        ok = bool(resp.ok)
-        text = await resp.text()
-        return ok, text
-    
-    try:
-        ok, raw = await _try_fetch_once()
-        if not ok:
-            # Retry once after brief delay (handles transient reloads)
-            await window.pyodide.runPythonAsync("import asyncio; await asyncio.sleep(0.2)")
-            ok, raw = await _try_fetch_once()
-            if not ok:
-                print(f"Leaderboard fetch failed. Raw response: {raw[:200]}")
-                if leaderboard_body_el:
-                    leaderboard_body_el.innerHTML = "<tr><td colspan=3>Error loading leaderboard.</td></tr>"
-                return
-        # Parse JSON
-        data = json.loads(raw)
-    except Exception as e:
-        print(f"Error loading leaderboard: {e}")
-        if leaderboard_body_el:
-            leaderboard_body_el.innerHTML = "<tr><td colspan=3>Error loading leaderboard.</td></tr>"
-        return
-    
-    if not data:
-        if leaderboard_body_el:
-            leaderboard_body_el.innerHTML = "<tr><td colspan=3>No scores yet.</td></tr>"
-        return
-    
-    # Build the leaderboard rows
-    rows_html = []
-    for idx, item in enumerate(data, start=1):
-        # item may be JS object or dict after JSON parse; use .get defensively
         try:
-            name = item.get('name', 'Player')
-            time_val = float(item.get('time', 9999))
-        except Exception:
-            # Fallback if item is not a dict-like
-            name = str(item['name']) if 'name' in item else 'Player'
-            time_val = float(item['time']) if 'time' in item else 9999.0
-        rows_html.append(f"<tr><td>{idx}</td><td>{name}</td><td>{time_val:.2f}</td></tr>")
-    
-    # Update the table
-    if leaderboard_body_el:
-        leaderboard_body_el.innerHTML = "".join(rows_html)
-
-def initialize_leaderboard_state():
-    # Initialize leaderboard to default state
-    if leaderboard_loading_el:
-        leaderboard_loading_el.classList.add("hidden")
-    if leaderboard_table_el:
-        leaderboard_table_el.classList.remove("hidden")
-    if leaderboard_body_el:
-        leaderboard_body_el.innerHTML = ""
-
-
-# ------------------------------ Init ------------------------------
-
-def bind_controls():
-    # Keyboard
-    _event_proxies['keydown'] = create_proxy(on_keydown)
-    window.addEventListener('keydown', _event_proxies['keydown'])
-    # Clicks (fallback if app loaded before JS boot)
-    if btn_up: _event_proxies['btn_up'] = create_proxy(lambda e: try_move('N')); btn_up.addEventListener('click', _event_proxies['btn_up'])
-    if btn_down: _event_proxies['btn_down'] = create_proxy(lambda e: try_move('S')); btn_down.addEventListener('click', _event_proxies['btn_down'])
-    if btn_left: _event_proxies['btn_left'] = create_proxy(lambda e: try_move('W')); btn_left.addEventListener('click', _event_proxies['btn_left'])
-    if btn_right: _event_proxies['btn_right'] = create_proxy(lambda e: try_move('E')); btn_right.addEventListener('click', _event_proxies['btn_right'])
-
-
-def bind_ui():
-    if start_btn:
-        _event_proxies['start'] = create_proxy(lambda e: window.pyodide.runPythonAsync("await on_start_click()"))
-        start_btn.addEventListener('click', _event_proxies['start'])
-    if home_leaderboard_btn:
-        _event_proxies['home_lb'] = create_proxy(lambda e: window.pyodide.runPythonAsync("await on_view_leaderboard()"))
-        home_leaderboard_btn.addEventListener('click', _event_proxies['home_lb'])
-    if play_again_btn:
-        _event_proxies['play_again'] = create_proxy(on_play_again)
-        play_again_btn.addEventListener('click', _event_proxies['play_again'])
-    if view_leaderboard_btn:
-        _event_proxies['view_lb'] = create_proxy(lambda e: window.pyodide.runPythonAsync("await on_view_leaderboard()"))
-        view_leaderboard_btn.addEventListener('click', _event_proxies['view_lb'])
-    if try_again_btn:
-        _event_proxies['try_again'] = create_proxy(lambda e: window.pyodide.runPythonAsync("await on_try_again()"))
-        try_again_btn.addEventListener('click', _event_proxies['try_again'])
-    bind_controls()
-    
-    # Initialize leaderboard state
-    initialize_leaderboard_state()
-
-bind_ui()
-show_screen('home-screen')
-`;
-
-        // Enhanced loading with better error handling
-        (async () => {
-            const progressBar = document.getElementById('loading-progress');
-            const loadingScreen = document.getElementById('loading-screen');
-            const homeScreen = document.getElementById('home-screen');
-            
-            let progress = 0;
-            let progressInterval;
-            
-            try {
-                console.log('Starting Pyodide initialization...');
-                
-                // Start progress simulation
-                progressInterval = setInterval(() => {
-                    progress += Math.random() * 5; // Slower progress for real loading
-                    if (progress >= 90) progress = 90; // Cap at 90% until actually loaded
-                    progressBar.style.width = progress + '%';
-                }, 200);
-                
-                // Load Pyodide with timeout
-                console.log('Loading Pyodide runtime...');
-                const timeoutPromise = new Promise((_, reject) => 
-                    setTimeout(() => reject(new Error('Pyodide load timeout')), 30000)
-                );
-                
-                const pyodide = await Promise.race([
-                    loadPyodide({
-                        indexURL: "https://cdn.jsdelivr.net/pyodide/v0.24.1/full/"
-                    }),
-                    timeoutPromise
-                ]);
-                
-                console.log('Pyodide loaded successfully');
-                window.pyodide = pyodide;
-                
-                // Complete progress bar
-                clearInterval(progressInterval);
-                progressBar.style.width = '95%';
-                
-                console.log('Running Python game code...');
-                await pyodide.runPythonAsync(PYTHON_GAME_CODE);
-                
-                console.log('Game initialized successfully!');
-                
-                // Final progress and transition
-                progressBar.style.width = '100%';
-                setTimeout(() => {
-                    loadingScreen.classList.remove('active');
-                    homeScreen.classList.add('active');
-                }, 500);
-                
-            } catch (err) {
-                console.error('Failed to initialize game:', err);
-                clearInterval(progressInterval);
-                
-                // Show error to user
-                const loadingCard = loadingScreen.querySelector('.card');
-                loadingCard.innerHTML = `
-                    <h1>Maze Runner</h1>
-                    <p style="color: #ef4444; margin: 20px 0;">
-                        ❌ Failed to load game runtime
-                    </p>
-                    <p style="font-size: 14px; color: #94a3b8;">
-                        Error: ${err.message}<br>
-                        Please check your internet connection and try refreshing the page.
-                    </p>
-                    <button onclick="location.reload()" style="margin-top: 16px;">
-                        🔄 Try Again
-                    </button>
-                `;
-            }
-        })();
-    </script>
-</body>
-</html>"""
-
-
-def get_leaderboard_scores() -> List[Dict[str, Any]]:
-    """Get best scores from database"""
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+            duration = time.perf_counter() - started
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            if status >= 500 or duration >= ACCESS_LOG_SLOW_S or random.random() < access_log_rate(route):
+                access_logger.info("request", extra={
+                    "request_id": request_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "route": route,
+                    "status": status,
+                    "duration_ms": round(duration * 1000, 2),
+                    "client": scope["client"][0] if scope.get("client") else None,
+                })
+
+if ACCESS_LOG:
+    app.add_middleware(AccessLogMiddleware)
+
+# ------------------------------ Request Profiling ------------------------------
+# Admin-triggered sampling of live requests. POST /debug/profile starts a
+# session that profiles a percentage of requests to the chosen routes, either
+# with cProfile (download as pstats) or with a thread sampling the loop
+# thread's stack (download as collapsed stacks for flamegraph.pl/speedscope).
+# Requests run on the shared event loop, so a profile also contains whatever
+# other tasks ran while the sampled request was awaiting. Only one request is
+# profiled at a time. Without MAZE_ADMIN_TOKEN the middleware is not installed
+# at all and the endpoints 404.
+
+ADMIN_TOKEN = os.environ.get("MAZE_ADMIN_TOKEN", "")
+ADMIN_TOKEN_HEADER = "X-Maze-Admin-Token"
+PROFILE_MODES = ("cprofile", "sampler")
+PROFILE_DEFAULT_ROUTES = ("/", "/api/submit_score", "/api/leaderboard")
+PROFILE_MAX_SECONDS = 600
+PROFILE_SAMPLE_INTERVAL_S = 0.002
+
+def collapse_stack(frame) -> str:
+    """Render a frame chain root-first as one collapsed-stack line"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{Path(code.co_filename).name}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class ProfileSession:
+    """One profiling window: which requests to sample and what was collected"""
+
+    def __init__(self, mode: str, percent: float, routes: tuple, seconds: float, loop_thread_id: int) -> None:
+        self.mode = mode
+        self.percent = percent
+        self.routes = frozenset(routes)
+        self.started = time.monotonic()
+        self.until = self.started + seconds
+        self.loop_thread_id = loop_thread_id
+        self.requests = 0
+        self.busy = False
+        self.stopped = False
+        self.stats: Optional[pstats.Stats] = None
+        self.stacks: Dict[str, int] = {}
+        self.stacks_lock = threading.Lock()
+        if mode == "sampler":
+            threading.Thread(target=self.sample_stacks, name="profile-sampler", daemon=True).start()
+
+    def active(self) -> bool:
+        return not self.stopped and time.monotonic() < self.until
+
+    def stop(self) -> None:
+        self.stopped = True
+
+    def wants(self, path: str) -> bool:
+        return (not self.busy and path in self.routes and self.active()
+                and random.random() * 100 < self.percent)
+
+    async def run(self, request_call) -> None:
+        self.busy = True
+        self.requests += 1
+        profile = None
+        if self.mode == "cprofile":
+            profile = cProfile.Profile()
+            profile.enable()
+        try:
+            await request_call
+        finally:
+            if profile is not None:
+                profile.disable()
+                if self.stats is None:
+                    self.stats = pstats.Stats(profile)
+                else:
+                    self.stats.add(profile)
+            self.busy = False
+
+    def sample_stacks(self) -> None:
+        while self.active():
+            time.sleep(PROFILE_SAMPLE_INTERVAL_S)
+            if not self.busy:
+                continue
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is None:
+                continue
+            stack = collapse_stack(frame)
+            with self.stacks_lock:
+                self.stacks[stack] = self.stacks.get(stack, 0) + 1
+
+    def pstats_bytes(self) -> bytes:
+        # Same format as Stats.dump_stats, loadable with pstats.Stats(path)
+        return marshal.dumps(self.stats.stats if self.stats is not None else {})
+
+    def collapsed_text(self) -> str:
+        with self.stacks_lock:
+            stacks = sorted(self.stacks.items())
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "percent": self.percent,
+            "routes": sorted(self.routes),
+            "active": self.active(),
+            "seconds_left": max(0.0, round(self.until - time.monotonic(), 1)),
+            "requests_profiled": self.requests,
+            "stack_samples": sum(self.stacks.values()),
+        }
+
+profile_session: Optional[ProfileSession] = None
+
+class ProfilingMiddleware:
+    """Hand sampled requests to the active profile session"""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        session = profile_session
+        if session is None or scope["type"] != "http" or not session.wants(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        await session.run(self.app(scope, receive, send))
+
+def require_admin(request: Request) -> None:
+    """Dependency: 404 unless MAZE_ADMIN_TOKEN is set and the request carries it"""
+    supplied = request.headers.get(ADMIN_TOKEN_HEADER, "")
+    if not ADMIN_TOKEN or not hmac.compare_digest(supplied.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=404, detail="Not found")
+
+if ADMIN_TOKEN:
+    app.add_middleware(ProfilingMiddleware)
+
+# ------------------------------ Static Assets ------------------------------
+# The page is a small HTML shell plus content-hashed assets. Everything is
+# read, hashed and compressed (gzip, and brotli when available) once at
+# startup; requests only pick the encoding and compare validators.
+
+STATIC_DIR = Path(__file__).resolve().parent / "static"
+STATIC_MEDIA_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".py": "text/x-python; charset=utf-8",
+}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+SHELL_CACHE_CONTROL = "no-cache"
+
+class StaticAsset:
+    def __init__(self, name: str, data: bytes, media_type: str) -> None:
+        self.name = name
+        self.data = data
+        self.media_type = media_type
+        digest = hashlib.sha256(data).hexdigest()
+        self.etag = f'"{digest[:16]}"'
+        stem, dot, suffix = name.rpartition(".")
+        self.versioned_name = f"{stem}.{digest[:12]}.{suffix}" if dot else f"{name}.{digest[:12]}"
+        self.url = f"/static/{self.versioned_name}"
+        self.encoded: Dict[str, bytes] = {"gzip": gzip.compress(data, compresslevel=9)}
+        if brotli is not None:
+            self.encoded["br"] = brotli.compress(data, quality=11)
+
+    @classmethod
+    def from_file(cls, path: Path) -> "StaticAsset":
+        media_type = STATIC_MEDIA_TYPES.get(path.suffix, "application/octet-stream")
+        return cls(path.name, path.read_bytes(), media_type)
+
+def pick_encoding(accept_encoding: str, available) -> Optional[str]:
+    """Choose the best precompressed variant the client accepts"""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0"):
+            continue
+        accepted.add(token.strip().lower())
+    for encoding in ("br", "gzip"):
+        if encoding in available and (encoding in accepted or "*" in accepted):
+            return encoding
+    return None
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match", "")
+    if not if_none_match:
+        return False
+    matched = etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    CACHE_REQUESTS.inc("http_revalidate", "hit" if matched else "miss")
+    return matched
+
+def asset_response(asset: StaticAsset, request: Request, cache_control: str) -> Response:
+    headers = {"ETag": asset.etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+    if etag_matches(request, asset.etag):
+        return Response(status_code=304, headers=headers)
+    encoding = pick_encoding(request.headers.get("accept-encoding", ""), asset.encoded)
+    body = asset.data
+    if encoding is not None:
+        body = asset.encoded[encoding]
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=asset.media_type, headers=headers)
+
+# ------------------------------ Pyodide Runtime ------------------------------
+# The runtime can be vendored (``python maze_game_standalone.py vendor-pyodide``)
+# and served from this app with long-lived caching; the CDN stays as fallback.
+
+PYODIDE_VERSION = "0.24.1"
+PYODIDE_PYTHON_VERSION = (3, 11)  # CPython bundled with this Pyodide release
+PYODIDE_CDN_URL = f"https://cdn.jsdelivr.net/pyodide/v{PYODIDE_VERSION}/full/"
+PYODIDE_LOCAL_URL = f"/pyodide/v{PYODIDE_VERSION}/"
+PYODIDE_LOCAL_DIR = Path(os.environ.get(
+    "PYODIDE_LOCAL_DIR",
+    Path(__file__).resolve().parent / "vendor" / "pyodide" / f"v{PYODIDE_VERSION}",
+))
+PYODIDE_CORE_FILES = ("pyodide.js", "pyodide.asm.js", "pyodide.asm.wasm", "python_stdlib.zip", "pyodide-lock.json")
+PYODIDE_LOAD_TIMEOUT_MS = 30000
+# MAZE_WORKER_MODE=1 runs Pyodide and the game in a Web Worker by default;
+# clients can pick a mode with ?worker=1 / ?worker=0 and fall back to the
+# main thread when workers or OffscreenCanvas are unavailable
+WORKER_MODE = os.environ.get("MAZE_WORKER_MODE", "0") == "1"
+PYODIDE_MEDIA_TYPES = {
+    ".js": "application/javascript; charset=utf-8",
+    ".wasm": "application/wasm",
+    ".zip": "application/zip",
+    ".json": "application/json",
+}
+
+class VendoredFile:
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.media_type = PYODIDE_MEDIA_TYPES.get(path.suffix, "application/octet-stream")
+        self.etag = f'"{hashlib.sha256(path.read_bytes()).hexdigest()[:16]}"'
+        # Precompressed variants written next to the file by vendor_pyodide()
+        self.variants: Dict[str, Path] = {}
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            variant = path.with_name(path.name + suffix)
+            if variant.is_file():
+                self.variants[encoding] = variant
+
+def load_vendored_pyodide() -> Dict[str, VendoredFile]:
+    """Index a vendored Pyodide distribution, or return {} to use the CDN only"""
+    if not (PYODIDE_LOCAL_DIR / "pyodide.js").is_file():
+        return {}
+    return {
+        path.name: VendoredFile(path)
+        for path in PYODIDE_LOCAL_DIR.iterdir()
+        if path.is_file() and path.suffix not in (".br", ".gz")
+    }
+
+def vendor_pyodide(dest: Path = PYODIDE_LOCAL_DIR) -> None:
+    """Download the Pyodide core files and precompress them for self-hosting"""
+    from urllib.request import urlopen
+
+    dest.mkdir(parents=True, exist_ok=True)
+    for name in PYODIDE_CORE_FILES:
+        with urlopen(PYODIDE_CDN_URL + name) as resp:
+            data = resp.read()
+        (dest / name).write_bytes(data)
+        (dest / f"{name}.gz").write_bytes(gzip.compress(data, compresslevel=9))
+        if brotli is not None:
+            (dest / f"{name}.br").write_bytes(brotli.compress(data, quality=11))
+        print(f"📦 Vendored {name} ({len(data) // 1024} KB)")
+    print(f"✅ Pyodide {PYODIDE_VERSION} vendored into {dest}")
+
+PYODIDE_FILES = load_vendored_pyodide()
+
+def pyodide_boot_config() -> Dict[str, Any]:
+    sources = [PYODIDE_LOCAL_URL] if PYODIDE_FILES else []
+    sources.append(PYODIDE_CDN_URL)
+    return {"version": PYODIDE_VERSION, "sources": sources, "timeoutMs": PYODIDE_LOAD_TIMEOUT_MS,
+            "workerMode": WORKER_MODE}
+
+def pyodide_preload_tags() -> str:
+    """Preload hints for the runtime files of the first Pyodide source"""
+    base = PYODIDE_LOCAL_URL if PYODIDE_FILES else PYODIDE_CDN_URL
+    tags = ['    <link rel="preconnect" href="https://cdn.jsdelivr.net" crossorigin />']
+    tags.append(f'    <link rel="preload" href="{base}pyodide.js" as="script" />')
+    tags.append(f'    <link rel="preload" href="{base}pyodide.asm.js" as="script" />')
+    tags.append(f'    <link rel="preload" href="{base}pyodide.asm.wasm" as="fetch" crossorigin />')
+    tags.append(f'    <link rel="preload" href="{base}python_stdlib.zip" as="fetch" crossorigin />')
+    return "\n".join(tags)
+
+GAME_MODULE_NAME = "maze_game"
+ENGINE_MODULE_NAME = "maze_engine"
+ENGINE_FILE = Path(__file__).resolve().parent / f"{ENGINE_MODULE_NAME}.py"
+
+def build_game_bundle(modules: Dict[str, bytes]) -> Optional[StaticAsset]:
+    """Compile the game modules into a zip of .pyc files for Pyodide to import.
+
+    Bytecode is only valid for the same CPython minor version, so the bundle
+    is skipped (and the client runs the source) when this server's Python
+    does not match the one inside Pyodide.
+    """
+    if sys.version_info[:2] != PYODIDE_PYTHON_VERSION:
+        logger.warning("Game bundle skipped: server Python does not match Pyodide's", extra={
+            "pyodide": PYODIDE_VERSION,
+            "pyodide_python": ".".join(map(str, PYODIDE_PYTHON_VERSION)),
+            "server_python": sys.version.split()[0],
+        })
+        return None
+    started = time.perf_counter()
+    for name, source in modules.items():
+        compile(source, f"{name}.py", "exec")
+    compile_ms = (time.perf_counter() - started) * 1000
+    buffer = io.BytesIO()
+    pyc_size = 0
+    with tempfile.TemporaryDirectory() as tmp, zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as bundle:
+        for name, source in modules.items():
+            src_path = Path(tmp) / f"{name}.py"
+            pyc_path = Path(tmp) / f"{name}.pyc"
+            src_path.write_bytes(source)
+            py_compile.compile(
+                str(src_path), cfile=str(pyc_path), doraise=True,
+                invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+            )
+            pyc = pyc_path.read_bytes()
+            pyc_size += len(pyc)
+            bundle.writestr(f"{name}.pyc", pyc)
+    # compile_ms: parse+compile time each page load saves (measured on this server)
+    logger.info("Game bundle built", extra={"bytecode_kb": pyc_size // 1024, "compile_ms": round(compile_ms, 1)})
+    return StaticAsset("game.zip", buffer.getvalue(), "application/zip")
+
+def build_static_assets() -> tuple:
+    """Load the versioned assets and render the HTML shell that references them"""
+    assets = {}
+    for name in ("style.css", "app.js", "worker.js", "game.py"):
+        assets[name] = StaticAsset.from_file(STATIC_DIR / name)
+    # The shared engine sits next to this server, which imports it too
+    assets[ENGINE_FILE.name] = StaticAsset.from_file(ENGINE_FILE)
+    bundle = build_game_bundle({
+        ENGINE_MODULE_NAME: assets[ENGINE_FILE.name].data,
+        GAME_MODULE_NAME: assets["game.py"].data,
+    })
+    if bundle is not None:
+        assets["game.zip"] = bundle
+    shell = (STATIC_DIR / "index.html").read_text(encoding="utf-8")
+    for name, asset in assets.items():
+        shell = shell.replace("{{" + name + "}}", asset.url)
+    asset_urls = {name: asset.url for name, asset in assets.items()}
+    asset_urls["game_module"] = GAME_MODULE_NAME
+    asset_urls["engine_module"] = ENGINE_MODULE_NAME
+    shell = shell.replace("{{assets_json}}", json.dumps(asset_urls))
+    shell = shell.replace("{{pyodide_json}}", json.dumps(pyodide_boot_config()))
+    shell = shell.replace("{{pyodide_preload}}", pyodide_preload_tags())
+    html_shell = StaticAsset("index.html", shell.encode("utf-8"), STATIC_MEDIA_TYPES[".html"])
+    return assets, html_shell, build_service_worker(assets, html_shell)
+
+def build_service_worker(assets: Dict[str, StaticAsset], html_shell: StaticAsset) -> StaticAsset:
+    """Render sw.js with a cache version and precache list for this build"""
+    pyodide_base = pyodide_boot_config()["sources"][0]
+    precache = [asset.url for asset in assets.values()]
+    precache += [pyodide_base + name for name in PYODIDE_CORE_FILES]
+    source = (STATIC_DIR / "sw.js").read_text(encoding="utf-8")
+    source = source.replace("{{cache_version}}", html_shell.etag.strip('"'))
+    source = source.replace("{{asset_urls_json}}", json.dumps(precache))
+    source = source.replace("{{immutable_prefixes_json}}", json.dumps(
+        ["/static/", PYODIDE_LOCAL_URL, PYODIDE_CDN_URL]
+    ))
+    return StaticAsset("sw.js", source.encode("utf-8"), STATIC_MEDIA_TYPES[".js"])
+
+STATIC_ASSETS, HTML_SHELL, SERVICE_WORKER = build_static_assets()
+# Lookup by versioned file name (immutable) and by plain name (revalidated)
+_static_by_versioned_name = {asset.versioned_name: asset for asset in STATIC_ASSETS.values()}
+
+
+LEADERBOARD_PAGE_SIZE = 50
+LEADERBOARD_MAX_PAGE_SIZE = 200
+
+LEADERBOARD_SNAPSHOT_SIZE = 1000
+SNAPSHOT_CACHE_SIZE = 64
+# How far back past daily/weekly boards can be requested
+PERIOD_HISTORY_DAYS = int(os.environ.get("MAZE_PERIOD_HISTORY_DAYS", "730"))
+
+def get_leaderboard_scores(after: Optional[tuple] = None, limit: int = LEADERBOARD_PAGE_SIZE,
+                           period: Optional[str] = None, config: str = DEFAULT_CONFIG) -> List[Dict[str, Any]]:
+    """Get a page of best scores, ordered by (time, name), starting after a cursor.
+
+    With ``period`` the page comes from that period's rollup, otherwise from
+    the all-time board of ``config``. Both are a seek on a
+    (config, [period,] time, name) index. While the rollups are still being
+    built, the page is grouped from ``scores`` instead.
+    """
+    if not board_migration.done:
+        return get_leaderboard_scores_unrolled(after, limit, period, config)
     conn = sqlite3.connect(DATABASE_FILE)
     cursor = conn.cursor()
-    cursor.execute('''
-        SELECT name, MIN(time) as best_time 
-        FROM scores 
-        GROUP BY name 
-        ORDER BY best_time ASC
-        LIMIT 50
-    ''')
-    
-    results = cursor.fetchall()
+    if period is None:
+        table, where, params = "board_best", "config = ?", [config]
+    else:
+        table, where, params = "board_period_best", "config = ? AND period = ?", [config, period]
+    if after is not None:
+        where += " AND (time, name) > (?, ?)"
+        params += [after[0], after[1]]
+    with db_timer(f"{table}_page"):
+        cursor.execute(f'''
+            SELECT name, time FROM {table}
+            WHERE {where}
+            ORDER BY time, name
+            LIMIT ?
+        ''', (*params, limit))
+        results = cursor.fetchall()
     conn.close()
     scores = []
     for name, time_val in results:
@@ -2312,55 +1422,932 @@ def get_leaderboard_scores() -> List[Dict[str, Any]]:
     
     return scores
 
-def save_score(name: str, time_val: float) -> bool:
-    """Save a score to database"""
+def period_bounds(period: str) -> tuple:
+    """[start, end) of a ``day:``/``week:`` period key, as created_at strings"""
+    board, _, raw = period.partition(":")
+    if board == "day":
+        start = datetime.strptime(raw, "%Y-%m-%d")
+        end = start + timedelta(days=1)
+    else:
+        start = datetime.strptime(f"{raw}-1", "%G-W%V-%u")
+        end = start + timedelta(days=7)
+    return f"{start:%Y-%m-%d}", f"{end:%Y-%m-%d}"
+
+def get_leaderboard_scores_unrolled(after: Optional[tuple], limit: int,
+                                    period: Optional[str], config: str) -> List[Dict[str, Any]]:
+    """get_leaderboard_scores() computed from ``scores`` (a scan; only used mid-migration)"""
+    where, params = "config = ?", [config]
+    if period is not None:
+        where += " AND created_at >= ? AND created_at < ?"
+        params += list(period_bounds(period))
+    outer, outer_params = "", []
+    if after is not None:
+        outer, outer_params = "WHERE (time, name) > (?, ?)", [after[0], after[1]]
+    conn = sqlite3.connect(DATABASE_FILE)
+    with db_timer("scores_page"):
+        rows = conn.execute(f'''
+            SELECT name, time FROM (
+                SELECT name, MIN(time) AS time FROM scores WHERE {where} GROUP BY name
+            ) {outer}
+            ORDER BY time, name
+            LIMIT ?
+        ''', (*params, *outer_params, limit)).fetchall()
+    conn.close()
+    return [{"name": name, "time": round(float(time_val), 2)} for name, time_val in rows]
+
+def save_score(name: str, time_val: float, grid_size: int = DEFAULT_GRID_SIZE,
+               algorithm: str = DEFAULT_ALGORITHM, seed: Optional[int] = None,
+               run_id: Optional[str] = None) -> bool:
+    """Save a score to database; a run id that is already stored is not saved again"""
     try:
         conn = sqlite3.connect(DATABASE_FILE)
         cursor = conn.cursor()
         
-        cursor.execute(
-            "INSERT INTO scores (name, time) VALUES (?, ?)",
-            (name.strip(), round(float(time_val), 2))
-        )
+        name = name.strip()
+        time_val = round(float(time_val), 2)
+        config = config_key(grid_size, algorithm, seed)
+        now = datetime.now(timezone.utc)
+        if run_id is not None:
+            with db_timer("insert_run"):
+                cursor.execute(INSERT_RUN, (run_id,))
+            if cursor.rowcount == 0:
+                # Duplicate run id: the first submission already updated the boards
+                conn.close()
+                return True
+        with db_timer("insert_score"):
+            cursor.execute(
+                INSERT_SCORE,
+                (name, time_val, now.strftime("%Y-%m-%d %H:%M:%S"), grid_size, algorithm, seed, config)
+            )
+        with db_timer("upsert_board_best"):
+            cursor.execute(UPSERT_BOARD_BEST, (config, name, time_val))
+        with db_timer("upsert_board_period_best"):
+            cursor.executemany(
+                UPSERT_BOARD_PERIOD_BEST,
+                [(config, period_key(board, now), name, time_val) for board in ("daily", "weekly")]
+            )
         
-        conn.commit()
+        with db_timer("commit"):
+            conn.commit()
         conn.close()
+        get_rank_index(config).record(name, time_val)
         return True
-    except Exception as e:
-        print(f"Error saving score: {e}")
+    except Exception:
+        logger.exception("Error saving score")
         return False
 
+def save_scores(scores: List[ScoreIn]) -> Optional[List[bool]]:
+    """Save a batch of scores in one transaction; None if it failed.
+
+    Returns, per score, False if its run id was already stored (or repeats
+    an earlier one in the batch). The rollups and rank index are updated
+    once per (config, player) with that player's best time in the batch.
+    """
+    try:
+        now = datetime.now(timezone.utc)
+        created_at = now.strftime("%Y-%m-%d %H:%M:%S")
+        periods = [period_key(board, now) for board in ("daily", "weekly")]
+        conn = sqlite3.connect(DATABASE_FILE)
+        run_ids = [score.run_id for score in scores if score.run_id]
+        known = set()
+        if run_ids:
+            with db_timer("select_run_ids"):
+                known = {row[0] for row in conn.execute(
+                    f"SELECT run_id FROM score_runs WHERE run_id IN ({','.join('?' * len(run_ids))})", run_ids)}
+        stored = []
+        runs = []
+        rows = []
+        best: Dict[tuple, float] = {}
+        for score in scores:
+            if score.run_id in known:
+                stored.append(False)
+                continue
+            if score.run_id:
+                known.add(score.run_id)
+                runs.append((score.run_id,))
+            name = score.name.strip()
+            time_val = round(float(score.time), 2)
+            config = config_key(score.grid_size, score.algorithm, score.seed)
+            rows.append((name, time_val, created_at, score.grid_size, score.algorithm, score.seed, config))
+            if time_val < best.get((config, name), float("inf")):
+                best[(config, name)] = time_val
+            stored.append(True)
+        with db_timer("insert_runs"):
+            conn.executemany(INSERT_RUN, runs)
+        with db_timer("insert_scores"):
+            conn.executemany(INSERT_SCORE, rows)
+        with db_timer("upsert_board_best"):
+            conn.executemany(UPSERT_BOARD_BEST, [(config, name, t) for (config, name), t in best.items()])
+        with db_timer("upsert_board_period_best"):
+            conn.executemany(UPSERT_BOARD_PERIOD_BEST, [
+                (config, period, name, t) for (config, name), t in best.items() for period in periods
+            ])
+        with db_timer("commit"):
+            conn.commit()
+        conn.close()
+        for (config, name), time_val in best.items():
+            get_rank_index(config).record(name, time_val)
+        return stored
+    except Exception:
+        logger.exception("Error saving scores")
+        return None
+
+# ------------------------------ Rank Index ------------------------------
+# Order-statistic index over every player's best time, so rank lookups are
+# O(log n) instead of a scan of ``scores``. Times are quantized into
+# centisecond buckets (scores are stored rounded to 0.01s) and counted in a
+# Fenwick tree; the tree is kept in a dict so only touched nodes use memory.
+
+RANK_BUCKET_SECONDS = 0.01
+RANK_MAX_TIME = 36000.0
+
+class RankIndex:
+    def __init__(self, max_time: float = RANK_MAX_TIME, bucket_s: float = RANK_BUCKET_SECONDS) -> None:
+        self.bucket_s = bucket_s
+        self.size = int(max_time / bucket_s) + 1
+        self.tree: Dict[int, int] = {}
+        self.best: Dict[str, float] = {}
+
+    def _bucket(self, time_val: float) -> int:
+        return min(max(int(round(time_val / self.bucket_s)), 0), self.size - 1)
+
+    def _add(self, bucket: int, delta: int) -> None:
+        i = bucket + 1
+        tree = self.tree
+        while i <= self.size:
+            tree[i] = tree.get(i, 0) + delta
+            i += i & -i
+
+    def _count_below(self, bucket: int) -> int:
+        """Number of players whose best time falls in a bucket < ``bucket``"""
+        i = bucket
+        tree = self.tree
+        total = 0
+        while i > 0:
+            total += tree.get(i, 0)
+            i -= i & -i
+        return total
+
+    def clear(self) -> None:
+        self.tree.clear()
+        self.best.clear()
+
+    def record(self, name: str, time_val: float) -> bool:
+        """Register a run; returns True if it improved the player's best"""
+        best = self.best.get(name)
+        if best is not None and best <= time_val:
+            return False
+        if best is not None:
+            self._add(self._bucket(best), -1)
+        self._add(self._bucket(time_val), 1)
+        self.best[name] = time_val
+        return True
+
+    def rank(self, name: str, time_val: float) -> Dict[str, Any]:
+        """Rank a time against every other player's best (ties share a rank)"""
+        bucket = self._bucket(time_val)
+        ahead = self._count_below(bucket)
+        own_best = self.best.get(name)
+        if own_best is not None and self._bucket(own_best) < bucket:
+            ahead -= 1  # don't rank a player against themselves
+        total = len(self.best) + (0 if own_best is not None else 1)
+        return rank_result(ahead, total)
+
+def rank_result(ahead: int, total: int) -> Dict[str, Any]:
+    rank = ahead + 1
+    return {
+        "rank": rank,
+        "total": total,
+        "percentile": round(100.0 * (total - rank) / total, 2),
+    }
+
+def rank_from_scores(config: str, name: str, time_val: float) -> Dict[str, Any]:
+    """RankIndex.rank() counted from ``scores`` (a scan; only used mid-migration)"""
+    conn = sqlite3.connect(DATABASE_FILE)
+    with db_timer("scores_rank"):
+        ahead, players, own = conn.execute('''
+            SELECT COALESCE(SUM(time < ? AND name != ?), 0), COUNT(*), COALESCE(SUM(name = ?), 0)
+            FROM (SELECT name, MIN(time) AS time FROM scores WHERE config = ? GROUP BY name)
+        ''', (time_val, name, name, config)).fetchone()
+    conn.close()
+    return rank_result(ahead, players + (0 if own else 1))
+
+# One index per maze configuration that has scores; created only when scores
+# are written or reloaded, so ranking arbitrary configurations can't grow it
+rank_indexes: Dict[str, RankIndex] = {}
+# Stands in for configurations nobody has played (never written to)
+EMPTY_RANK_INDEX = RankIndex()
+
+def get_rank_index(config: str) -> RankIndex:
+    """The index of ``config``, created if needed (write path only)"""
+    index = rank_indexes.get(config)
+    if index is None:
+        index = rank_indexes[config] = RankIndex()
+    return index
+
+def rebuild_rank_indexes() -> None:
+    """Reload every player's best time per configuration from the database"""
+    conn = sqlite3.connect(DATABASE_FILE)
+    with db_timer("rank_rebuild"):
+        rows = conn.execute("SELECT config, name, time FROM board_best").fetchall()
+    conn.close()
+    rank_indexes.clear()
+    for config, name, time_val in rows:
+        get_rank_index(config).record(name, float(time_val))
+
+rebuild_rank_indexes()
+
+def board_config(
+    grid: int = Query(DEFAULT_GRID_SIZE, ge=MIN_GRID_SIZE, le=MAX_GRID_SIZE),
+    algorithm: str = Query(DEFAULT_ALGORITHM, pattern=ALGORITHM_PATTERN),
+    seed: Optional[int] = Query(None, ge=0, lt=2**31),
+) -> str:
+    """Resolve the maze configuration query parameters to a board key"""
+    return config_key(grid, algorithm, seed)
+
 @app.get("/", response_class=HTMLResponse)
-async def serve_game():
+async def serve_game(request: Request):
     """Serve the main game page"""
-    return HTMLResponse(content=HTML_TEMPLATE)
+    return asset_response(HTML_SHELL, request, SHELL_CACHE_CONTROL)
+
+@app.get("/sw.js")
+async def serve_service_worker(request: Request):
+    """Serve the service worker from the root so it controls the whole app"""
+    return asset_response(SERVICE_WORKER, request, SHELL_CACHE_CONTROL)
+
+@app.get("/static/{filename}")
+async def serve_static(filename: str, request: Request):
+    """Serve a game asset; content-hashed names are cacheable forever"""
+    asset = _static_by_versioned_name.get(filename)
+    if asset is not None:
+        return asset_response(asset, request, IMMUTABLE_CACHE_CONTROL)
+    asset = STATIC_ASSETS.get(filename)
+    if asset is not None:
+        return asset_response(asset, request, SHELL_CACHE_CONTROL)
+    raise HTTPException(status_code=404, detail="Not found")
+
+@app.get(PYODIDE_LOCAL_URL + "{filename}")
+async def serve_pyodide(filename: str, request: Request):
+    """Serve the vendored Pyodide runtime with long-lived caching"""
+    vendored = PYODIDE_FILES.get(filename)
+    if vendored is None:
+        raise HTTPException(status_code=404, detail="Not found")
+    headers = {"ETag": vendored.etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+    if etag_matches(request, vendored.etag):
+        return Response(status_code=304, headers=headers)
+    encoding = pick_encoding(request.headers.get("accept-encoding", ""), vendored.variants)
+    path = vendored.path
+    if encoding is not None:
+        path = vendored.variants[encoding]
+        headers["Content-Encoding"] = encoding
+    return FileResponse(path, media_type=vendored.media_type, headers=headers)
 
 @app.post("/api/submit_score")
-async def submit_score(score: ScoreIn) -> Dict[str, str]:
+async def submit_score(score: ScoreIn, request: Request):
     """Submit a score to the leaderboard"""
+    header_key = request.headers.get("idempotency-key")
+    if header_key is not None and not re.fullmatch(RUN_ID_PATTERN, header_key):
+        raise HTTPException(status_code=422, detail="Idempotency-Key must be 8-64 of A-Z a-z 0-9 _ -")
+    run_id = header_key or score.run_id
+    # The middleware already answered repeats of a header key; a body-only run id is checked here
+    if header_key is None and run_id:
+        replay = idempotency_cache.get(run_id)
+        if replay is not None:
+            return JSONResponse(replay, headers=IDEMPOTENT_REPLAY_HEADERS)
+    check_name_rate(score.name)
     try:
-        success = save_score(score.name, score.time)
+        started = time.perf_counter()
+        success = save_score(score.name, score.time, score.grid_size, score.algorithm, score.seed, run_id)
+        submit_admission.record_write(time.perf_counter() - started)
         if success:
-            return {"status": "ok"}
+            response = {"status": "ok"}
+            if run_id:
+                idempotency_cache.put(run_id, response)
+            return response
         else:
             raise HTTPException(status_code=500, detail="Failed to save score")
     except Exception as exc:
-        print(f"Error submitting score: {exc}")
+        logger.exception("Error submitting score")
         raise HTTPException(status_code=500, detail=str(exc))
 
+# Batches: offline queues, bots and imports send many scores in one request
+# and one transaction. Besides the request's own address token, each score
+# spends a token from the address's batch budget, and each player name in
+# the batch spends one name token, so a player's queued runs go up together.
+SUBMIT_BATCH_MAX = int(os.environ.get("MAZE_SUBMIT_BATCH_MAX", "100"))
+SUBMIT_BATCH_MAX_BYTES = SUBMIT_BATCH_MAX * 512
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl", "application/jsonlines")
+
+async def read_limited_body(request: Request, limit: int, detail: str) -> bytes:
+    """The request body, or 413 as soon as it is known to be over ``limit`` bytes"""
+    length = request.headers.get("content-length", "")
+    if length.isdigit() and int(length) > limit:
+        raise HTTPException(status_code=413, detail=detail)
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            raise HTTPException(status_code=413, detail=detail)
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+def parse_score_batch(body: bytes, content_type: str) -> List[Any]:
+    """Items of a JSON array, or of NDJSON (one object per line)"""
+    try:
+        if content_type.split(";")[0].strip() in NDJSON_MEDIA_TYPES:
+            return [json.loads(line) for line in body.splitlines() if line.strip()]
+        items = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Scores must be a JSON array or NDJSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Scores must be a JSON array or NDJSON")
+    return items
+
+@app.post("/api/submit_scores")
+async def submit_scores(request: Request) -> JSONResponse:
+    """Submit up to SUBMIT_BATCH_MAX scores at once.
+
+    The body is a JSON array of scores, or NDJSON. Results come back in input
+    order, one per score: ``ok``, ``duplicate`` (its run id was already
+    recorded), ``invalid`` (with the validation errors) or ``rate_limited``
+    (with ``retry_after``).
+    """
+    header_key = request.headers.get("idempotency-key")
+    if header_key is not None and not re.fullmatch(RUN_ID_PATTERN, header_key):
+        raise HTTPException(status_code=422, detail="Idempotency-Key must be 8-64 of A-Z a-z 0-9 _ -")
+    body = await read_limited_body(request, SUBMIT_BATCH_MAX_BYTES, "Score batch too large")
+    items = parse_score_batch(body, request.headers.get("content-type", ""))
+    if len(items) > SUBMIT_BATCH_MAX:
+        raise HTTPException(status_code=413, detail=f"At most {SUBMIT_BATCH_MAX} scores per batch")
+
+    client = request.client.host if request.client else "unknown"
+    results: List[Optional[Dict[str, Any]]] = [None] * len(items)
+    accepted = []
+    name_waits: Dict[str, float] = {}
+    for i, item in enumerate(items):
+        try:
+            score = ScoreIn.model_validate(item)
+        except ValidationError as exc:
+            results[i] = {"status": "invalid", "errors": exc.errors(include_url=False, include_context=False)}
+            continue
+        if score.run_id and idempotency_cache.get(score.run_id) is not None:
+            results[i] = {"status": "duplicate"}
+            continue
+        name = score.name.strip().casefold()
+        if name not in name_waits:
+            name_waits[name] = name_buckets.take(name)
+        wait = name_waits[name]
+        reason = "name" if wait else None
+        if not wait:
+            wait = batch_buckets.take(client)
+            reason = "batch" if wait else None
+        if reason is not None:
+            SUBMIT_REJECTED.inc(reason)
+            results[i] = {"status": "rate_limited", "retry_after": max(1, int(wait + 0.999))}
+            continue
+        accepted.append((i, score))
+
+    if accepted:
+        started = time.perf_counter()
+        stored = save_scores([score for _, score in accepted])
+        submit_admission.record_write(time.perf_counter() - started)
+        if stored is None:
+            raise HTTPException(status_code=500, detail="Failed to save scores")
+        for (i, score), new in zip(accepted, stored):
+            results[i] = {"status": "ok" if new else "duplicate"}
+            if score.run_id:
+                idempotency_cache.put(score.run_id, {"status": "ok"})
+    response = {"accepted": sum(result["status"] == "ok" for result in results), "results": results}
+    if header_key:
+        idempotency_cache.put(idempotency_cache_key(SUBMIT_BATCH_PATH, header_key), response)
+    return JSONResponse(response)
+
+def parse_leaderboard_cursor(raw: str) -> tuple:
+    """Parse a ``<time>,<name>`` keyset cursor"""
+    time_part, sep, name = raw.partition(",")
+    try:
+        if not sep:
+            raise ValueError(raw)
+        return (float(time_part), name)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor, expected <time>,<name>")
+
+def format_leaderboard_cursor(row: Dict[str, Any]) -> str:
+    return quote(f"{row['time']},{row['name']}", safe="")
+
+def parse_period(board: str, raw: str, now: datetime) -> str:
+    """Validate a ``YYYY-MM-DD`` (daily) or ``YYYY-Www`` (weekly) period.
+
+    It must have started, and no more than PERIOD_HISTORY_DAYS ago.
+    """
+    try:
+        if board == "daily":
+            when = datetime.strptime(raw, "%Y-%m-%d")
+        else:
+            when = datetime.strptime(f"{raw}-1", "%G-W%V-%u")
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid {board} period: {raw}")
+    when = when.replace(tzinfo=timezone.utc)
+    if when > now or when < now - timedelta(days=PERIOD_HISTORY_DAYS):
+        raise HTTPException(status_code=400, detail=f"{board.capitalize()} period out of range: {raw}")
+    return period_key(board, when)
+
+class PeriodSnapshot:
+    """The frozen top of an expired period's board, paged like the live one"""
+
+    def __init__(self, body: bytes) -> None:
+        self.body = body
+        self.rows = json.loads(body)
+        self.keys = [(row["time"], row["name"]) for row in self.rows]
+        # A full snapshot was cut off; rows past it are read from the rollup
+        self.complete = len(self.rows) < LEADERBOARD_SNAPSHOT_SIZE
+
+    def page(self, after: Optional[tuple], limit: int) -> Optional[List[Dict[str, Any]]]:
+        """Rows after the cursor, or None if the page runs past a cut-off snapshot"""
+        start = 0 if after is None else bisect.bisect_right(self.keys, after)
+        rows = self.rows[start:start + limit]
+        if len(rows) < limit and not self.complete:
+            return None
+        return rows
+
+# Expired periods never change, so their boards are frozen once and kept
+_snapshot_cache: "OrderedDict[str, PeriodSnapshot]" = OrderedDict()
+
+def get_period_snapshot(config: str, period_id: str) -> Optional[PeriodSnapshot]:
+    """Return the frozen board of an expired period, freezing it on first use.
+
+    Periods nobody played in are not frozen (None), so requests for
+    arbitrary configurations and dates never write to the database.
+    """
+    period = f"{config}/{period_id}"
+    snapshot = _snapshot_cache.get(period)
+    if snapshot is not None:
+        CACHE_REQUESTS.inc("period_snapshot", "hit")
+        _snapshot_cache.move_to_end(period)
+        return snapshot
+    CACHE_REQUESTS.inc("period_snapshot", "miss")
+    conn = sqlite3.connect(DATABASE_FILE)
+    with db_timer("snapshot_read"):
+        row = conn.execute("SELECT body FROM period_snapshots WHERE period = ?", (period,)).fetchone()
+    if row is None:
+        conn.close()
+        scores = get_leaderboard_scores(None, LEADERBOARD_SNAPSHOT_SIZE, period_id, config)
+        if not scores:
+            return None
+        text = json.dumps(scores, separators=(",", ":"))
+        conn = sqlite3.connect(DATABASE_FILE)
+        with db_timer("snapshot_write"):
+            conn.execute("INSERT OR IGNORE INTO period_snapshots (period, body) VALUES (?, ?)", (period, text))
+            conn.commit()
+            row = conn.execute("SELECT body FROM period_snapshots WHERE period = ?", (period,)).fetchone()
+    conn.close()
+    snapshot = PeriodSnapshot(row[0].encode("utf-8"))
+    _snapshot_cache[period] = snapshot
+    if len(_snapshot_cache) > SNAPSHOT_CACHE_SIZE:
+        _snapshot_cache.popitem(last=False)
+    return snapshot
+
 @app.get("/api/leaderboard")
-async def get_leaderboard() -> JSONResponse:
-    """Get the leaderboard data"""
+async def get_leaderboard(
+    request: Request,
+    after: Optional[str] = None,
+    limit: int = Query(LEADERBOARD_PAGE_SIZE, ge=1, le=LEADERBOARD_MAX_PAGE_SIZE),
+    board: str = Query("all", pattern="^(all|daily|weekly)$"),
+    period: Optional[str] = None,
+    config: str = Depends(board_config),
+) -> Response:
+    """Get a page of the leaderboard; the next page's cursor is in X-Next-Cursor.
+
+    ``board`` picks the all-time, daily or weekly board. ``period`` selects a
+    past day (YYYY-MM-DD) or ISO week (YYYY-Www) within the last
+    PERIOD_HISTORY_DAYS; pages of expired periods are immutable and served
+    from a frozen snapshot. ``grid``/``algorithm``/``seed`` pick the maze
+    configuration (default 20x20 DFS).
+    """
+    cursor = parse_leaderboard_cursor(after) if after is not None else None
+    period_id = None
+    headers = {}
+    if board != "all":
+        now = datetime.now(timezone.utc)
+        current = period_key(board, now)
+        period_id = parse_period(board, period, now) if period else current
+        # Expired periods are only frozen from complete rollups
+        if period_id < current and board_migration.done:
+            headers["Cache-Control"] = "public, max-age=31536000, immutable"
+            snapshot = get_period_snapshot(config, period_id)
+            scores = snapshot.page(cursor, limit) if snapshot is not None else []
+            if scores is not None:
+                if snapshot is not None and cursor is None and len(scores) == len(snapshot.rows):
+                    body = snapshot.body
+                else:
+                    body = json.dumps(scores, separators=(",", ":")).encode("utf-8")
+                headers["ETag"] = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+                if len(scores) == limit:
+                    headers["X-Next-Cursor"] = format_leaderboard_cursor(scores[-1])
+                if etag_matches(request, headers["ETag"]):
+                    return Response(status_code=304, headers=headers)
+                return Response(content=body, media_type="application/json", headers=headers)
     try:
-        scores = get_leaderboard_scores()
-        return JSONResponse(content=scores)
+        scores = get_leaderboard_scores(cursor, limit, period_id, config)
+        if len(scores) == limit:
+            headers["X-Next-Cursor"] = format_leaderboard_cursor(scores[-1])
+        return JSONResponse(content=scores, headers=headers)
     except Exception as exc:
-        print(f"Error getting leaderboard: {exc}")
+        logger.exception("Error getting leaderboard")
         raise HTTPException(status_code=500, detail=str(exc))
 
+@app.get("/api/rank")
+async def get_rank(
+    name: str = Query(min_length=1, max_length=64),
+    time: float = Query(ge=0.0, lt=36000),
+    config: str = Depends(board_config),
+) -> JSONResponse:
+    """Absolute rank and percentile of a time among all players' best times"""
+    name = name.strip()
+    if board_migration.done:
+        result = rank_indexes.get(config, EMPTY_RANK_INDEX).rank(name, round(time, 2))
+    else:
+        # The indexes fill in as the migration runs; until then count from scores
+        result = rank_from_scores(config, name, round(time, 2))
+    return JSONResponse(content={"name": name, "time": round(time, 2), **result})
+
+@app.get("/api/maze")
+async def get_maze(
+    grid: int = Query(DEFAULT_GRID_SIZE, ge=MIN_GRID_SIZE, le=MAX_GRID_SIZE),
+    algorithm: str = Query(DEFAULT_ALGORITHM, pattern=ALGORITHM_PATTERN),
+    seed: Optional[int] = Query(None, ge=0, lt=2**31),
+) -> JSONResponse:
+    """A maze from the shared engine, as its carve order; seeded mazes never change"""
+    if algorithm != DEFAULT_ALGORITHM:
+        raise HTTPException(status_code=400, detail=f"Unsupported algorithm: {algorithm}")
+    cache_control = IMMUTABLE_CACHE_CONTROL if seed is not None else "no-store"
+    # A random maze still scores on the unseeded board of its size and algorithm
+    config = config_key(grid, algorithm, seed)
+    if seed is None:
+        seed = random.randrange(2**31)
+    carves = list(maze_engine.iter_carves(grid, grid, random.Random(seed)))
+    return JSONResponse(
+        content={"grid_size": grid, "algorithm": algorithm, "seed": seed,
+                 "config": config, "carves": carves},
+        headers={"Cache-Control": cache_control},
+    )
+
+# ------------------------------ Real User Monitoring ------------------------------
+# Browsers beacon batches of boot-phase and per-game timings (see app.js);
+# they are folded into histograms served by /metrics and nothing else is kept.
+# Everything here comes from the client: label values are whitelisted and
+# numbers clamped so a bad or hostile beacon can't grow the series.
+
+TELEMETRY_MAX_BYTES = 16 * 1024
+TELEMETRY_MAX_EVENTS = 50
+TELEMETRY_MAX_MS = 10 * 60 * 1000
+RUM_MODES = ("main", "worker")
+# boot phases (app.js / worker.js markPhase names) plus the game's own
+RUM_BOOT_PHASES = ("pyodide_script", "pyodide_runtime", "game_fetch", "game_run", "worker_total", "total")
+RUM_FRAME_STATS = ("p50", "p95", "p99")
+RUM_PHASE_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0, 60.0)
+RUM_FRAME_BUCKETS = (0.004, 0.008, 0.0167, 0.025, 0.0334, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+RUM_PHASES = metrics.histogram(
+    "maze_rum_phase_seconds", "Client-reported load and game phase durations", ("phase", "mode"), RUM_PHASE_BUCKETS)
+RUM_FRAMES = metrics.histogram(
+    "maze_rum_frame_seconds", "Client-reported frame interval percentiles, one sample per game",
+    ("stat", "mode"), RUM_FRAME_BUCKETS)
+RUM_EVENTS = metrics.counter("maze_rum_events_total", "Telemetry events by kind (rejected: malformed)", ("kind",))
+
+def telemetry_seconds(value: Any) -> Optional[float]:
+    """A client-reported millisecond value in seconds, or None if implausible"""
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    if not 0 <= value <= TELEMETRY_MAX_MS:
+        return None
+    return value / 1000
+
+def record_telemetry(batch: Dict[str, Any]) -> int:
+    """Fold one beacon into the RUM histograms; returns the events accepted"""
+    mode = batch.get("mode") if batch.get("mode") in RUM_MODES else "main"
+    events = batch.get("events")
+    if not isinstance(events, list):
+        return 0
+    accepted = 0
+    for event in events[:TELEMETRY_MAX_EVENTS]:
+        kind = event.get("kind") if isinstance(event, dict) else None
+        samples = []
+        if kind == "boot" and isinstance(event.get("phases"), dict):
+            samples = [(RUM_PHASES, phase, event["phases"].get(phase)) for phase in RUM_BOOT_PHASES]
+        elif kind == "first_move":
+            samples = [(RUM_PHASES, "first_move", event.get("page_ms"))]
+        elif kind == "game":
+            samples = [(RUM_PHASES, "maze_generation", event.get("maze_ms")),
+                       (RUM_PHASES, "first_render", event.get("first_render_ms"))]
+            if event.get("frames"):
+                samples += [(RUM_FRAMES, stat, event.get(f"frame_{stat}")) for stat in RUM_FRAME_STATS]
+        recorded = 0
+        for histogram, label, value in samples:
+            seconds = telemetry_seconds(value)
+            if seconds is not None:
+                histogram.observe(seconds, label, mode)
+                recorded += 1
+        if recorded:
+            RUM_EVENTS.inc(kind)
+            accepted += 1
+        else:
+            RUM_EVENTS.inc("rejected")
+    return accepted
+
+@app.post("/api/telemetry", status_code=204)
+async def post_telemetry(request: Request) -> Response:
+    """Receive a batch of client timings (sent with navigator.sendBeacon)"""
+    body = await request.body()
+    if len(body) > TELEMETRY_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Telemetry batch too large")
+    try:
+        batch = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Telemetry must be JSON")
+    if not isinstance(batch, dict):
+        raise HTTPException(status_code=400, detail="Telemetry must be a JSON object")
+    record_telemetry(batch)
+    return Response(status_code=204)
+
+# ------------------------------ Spectator Rooms ------------------------------
+# Each race room encodes one frame per tick and fans the same bytes out to all
+# viewers. Viewers hold a single "latest frame" slot, so a slow socket skips
+# ahead to a keyframe instead of building up a queue.
+
+SPECTATOR_TICK_S = 0.1
+SPECTATOR_MAX_VIEWERS = 500
+RACE_MAX_ROOMS = 1000  # publishers opening a new room beyond this are refused
+
+class SpectatorViewer:
+    def __init__(self, websocket: WebSocket) -> None:
+        self.websocket = websocket
+        self.pending: Optional[bytes] = None
+        self.resync = True  # next frame must be a keyframe
+        self.wakeup = asyncio.Event()
+
+class RaceRoom:
+    def __init__(self, room_id: str) -> None:
+        self.room_id = room_id
+        self.players: Dict[str, List] = {}   # name -> [x, y, finished]
+        self.dirty: Dict[str, Optional[List]] = {}  # changes since last tick, None = left
+        self.viewers: set = set()
+        self.publishers = 0
+        self.seq = 0
+        self.task: Optional[asyncio.Task] = None
+        # Metrics
+        self.frames_encoded = 0
+        self.keyframes_encoded = 0
+        self.encode_time_s = 0.0
+        self.fanout_time_s = 0.0
+        self.frames_sent = 0
+        self.dropped_frames = 0
+
+    def update_player(self, name: str, x: int, y: int, finished: bool) -> None:
+        entry = [int(x), int(y), bool(finished)]
+        if self.players.get(name) != entry:
+            self.players[name] = entry
+            self.dirty[name] = entry
+
+    def remove_player(self, name: str) -> None:
+        if self.players.pop(name, None) is not None:
+            self.dirty[name] = None
+
+    def _encode(self, frame: Dict[str, Any]) -> bytes:
+        started = time.perf_counter()
+        data = json.dumps(frame, separators=(",", ":")).encode("utf-8")
+        self.encode_time_s += time.perf_counter() - started
+        self.frames_encoded += 1
+        return data
+
+    def tick(self) -> None:
+        """Encode this tick's delta (and keyframe if needed) once and fan it out"""
+        if not self.dirty and not any(v.resync for v in self.viewers):
+            return
+        self.seq += 1
+        delta = None
+        if self.dirty:
+            delta = self._encode({"t": "d", "seq": self.seq, "p": self.dirty})
+            self.dirty = {}
+        keyframe = None
+
+        started = time.perf_counter()
+        for viewer in self.viewers:
+            if viewer.pending is not None:
+                # Viewer did not drain the previous frame: drop it and resync
+                self.dropped_frames += 1
+                viewer.resync = True
+            if viewer.resync:
+                if keyframe is None:
+                    keyframe = self._encode({"t": "k", "seq": self.seq, "p": self.players})
+                    self.keyframes_encoded += 1
+                viewer.pending = keyframe
+                viewer.resync = False
+            elif delta is not None:
+                viewer.pending = delta
+            else:
+                continue
+            viewer.wakeup.set()
+        self.fanout_time_s += time.perf_counter() - started
+
+    async def run(self) -> None:
+        try:
+            while self.viewers or self.publishers:
+                self.tick()
+                await asyncio.sleep(SPECTATOR_TICK_S)
+        finally:
+            self.task = None
+            if not self.viewers and not self.publishers:
+                race_rooms.pop(self.room_id, None)
+
+    def ensure_running(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    def stats(self) -> Dict[str, Any]:
+        frames = max(self.frames_encoded, 1)
+        return {
+            "room": self.room_id,
+            "players": len(self.players),
+            "viewers": len(self.viewers),
+            "seq": self.seq,
+            "frames_encoded": self.frames_encoded,
+            "keyframes_encoded": self.keyframes_encoded,
+            "frames_sent": self.frames_sent,
+            "dropped_frames": self.dropped_frames,
+            "encode_time_ms_total": round(self.encode_time_s * 1000, 3),
+            "encode_time_ms_avg": round(self.encode_time_s * 1000 / frames, 4),
+            "fanout_time_ms_total": round(self.fanout_time_s * 1000, 3),
+        }
+
+race_rooms: Dict[str, RaceRoom] = {}
+metrics.gauge("maze_race_rooms", "Open race rooms", lambda: len(race_rooms))
+metrics.gauge("maze_spectator_viewers", "Connected spectators", lambda: sum(len(r.viewers) for r in race_rooms.values()))
+# Each viewer holds at most one frame; this is the spectator send backlog
+metrics.gauge("maze_spectator_pending_frames", "Spectators with an unsent frame",
+              lambda: sum(v.pending is not None for r in race_rooms.values() for v in r.viewers))
+metrics.gauge("maze_snapshot_cache_entries", "Frozen period boards held in memory", lambda: len(_snapshot_cache))
+
+def get_race_room(room_id: str) -> RaceRoom:
+    room = race_rooms.get(room_id)
+    if room is None:
+        room = race_rooms[room_id] = RaceRoom(room_id)
+    return room
+
+def parse_race_update(msg: Any) -> Optional[tuple]:
+    """(name, x, y, finished) from a publisher message, or None if it is malformed"""
+    if not isinstance(msg, dict):
+        return None
+    x, y = msg.get("x", 0), msg.get("y", 0)
+    if type(x) is not int or type(y) is not int or not (0 <= x < MAX_GRID_SIZE and 0 <= y < MAX_GRID_SIZE):
+        return None
+    return str(msg.get("name") or "Player")[:64], x, y, bool(msg.get("finished", False))
+
+@app.websocket("/ws/race/{room_id}")
+async def race_publisher(websocket: WebSocket, room_id: str):
+    """Receive position updates from a racing player"""
+    if len(room_id) > 64 or (room_id not in race_rooms and len(race_rooms) >= RACE_MAX_ROOMS):
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    room = get_race_room(room_id)
+    room.publishers += 1
+    room.ensure_running()
+    name = None
+    try:
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            try:
+                update = parse_race_update(json.loads(message.get("text") or message.get("bytes") or b""))
+            except ValueError:
+                continue  # not JSON
+            if update is None:
+                continue  # ignore malformed updates
+            if name is None:
+                name = update[0]
+            room.update_player(name, *update[1:])
+    except WebSocketDisconnect:
+        pass
+    finally:
+        room.publishers -= 1
+        if name is not None:
+            room.remove_player(name)
+
+@app.websocket("/ws/spectate/{room_id}")
+async def race_spectator(websocket: WebSocket, room_id: str):
+    """Stream binary JSON frames (keyframes and deltas) of a race room"""
+    room = race_rooms.get(room_id)
+    if room is None or len(room.viewers) >= SPECTATOR_MAX_VIEWERS:
+        await websocket.close(code=1008)
+        return
+    await websocket.accept()
+    viewer = SpectatorViewer(websocket)
+    room.viewers.add(viewer)
+    room.ensure_running()
+
+    async def _drain_client():
+        # Consume (and ignore) client messages, text or binary, so disconnects are noticed
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    reader = asyncio.create_task(_drain_client())
+    reader.add_done_callback(lambda _t: viewer.wakeup.set())
+    try:
+        while not reader.done():
+            await viewer.wakeup.wait()
+            viewer.wakeup.clear()
+            frame, viewer.pending = viewer.pending, None
+            if frame is not None:
+                await websocket.send_bytes(frame)
+                room.frames_sent += 1
+    except (WebSocketDisconnect, RuntimeError):
+        pass
+    finally:
+        reader.cancel()
+        room.viewers.discard(viewer)
+
+@app.get("/api/spectate/stats")
+async def get_spectate_stats() -> JSONResponse:
+    """Per-room spectator fan-out metrics"""
+    return JSONResponse(content=[room.stats() for room in race_rooms.values()])
+
+@app.get("/metrics")
+async def get_metrics() -> PlainTextResponse:
+    """Counters and histograms in the Prometheus text exposition format"""
+    return PlainTextResponse(metrics.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.get("/debug/loop-stalls", dependencies=[Depends(require_admin)])
+async def get_loop_stalls() -> JSONResponse:
+    """Recent event loop stalls and the stack that was blocking each one (admin only)"""
+    if LOOP_WATCHDOG_MODE not in LOOP_WATCHDOG_POLL_S:
+        raise HTTPException(status_code=404, detail="Loop watchdog is off (set MAZE_LOOP_WATCHDOG)")
+    return JSONResponse(content={
+        "mode": LOOP_WATCHDOG_MODE,
+        "threshold_ms": LOOP_STALL_THRESHOLD_S * 1000,
+        "stalls": list(loop_stalls),
+    })
+
+@app.post("/debug/profile", dependencies=[Depends(require_admin)])
+async def start_profile(
+    mode: str = Query("cprofile"),
+    percent: float = Query(10.0, gt=0, le=100),
+    seconds: float = Query(60.0, gt=0, le=PROFILE_MAX_SECONDS),
+    routes: str = Query(",".join(PROFILE_DEFAULT_ROUTES)),
+) -> JSONResponse:
+    """Start a profiling session, replacing (and discarding) any previous one"""
+    global profile_session
+    if mode not in PROFILE_MODES:
+        raise HTTPException(status_code=400, detail=f"mode must be one of {', '.join(PROFILE_MODES)}")
+    route_list = tuple(route.strip() for route in routes.split(",") if route.strip())
+    if profile_session is not None:
+        profile_session.stop()
+    profile_session = ProfileSession(mode, percent, route_list, seconds, threading.get_ident())
+    logger.info("Profiling started", extra={"mode": mode, "percent": percent, "routes": route_list, "seconds": seconds})
+    return JSONResponse(content=profile_session.status())
+
+@app.get("/debug/profile", dependencies=[Depends(require_admin)])
+async def get_profile_status() -> JSONResponse:
+    """What the current profiling session has collected so far"""
+    if profile_session is None:
+        raise HTTPException(status_code=404, detail="No profiling session")
+    return JSONResponse(content=profile_session.status())
+
+@app.get("/debug/profile.pstats", dependencies=[Depends(require_admin)])
+async def download_profile_pstats() -> Response:
+    """Aggregated cProfile data; open with pstats, snakeviz or gprof2dot"""
+    if profile_session is None or profile_session.mode != "cprofile":
+        raise HTTPException(status_code=404, detail="No cprofile session")
+    return Response(
+        content=profile_session.pstats_bytes(),
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": 'attachment; filename="maze.pstats"'},
+    )
+
+@app.get("/debug/profile.collapsed", dependencies=[Depends(require_admin)])
+async def download_profile_collapsed() -> PlainTextResponse:
+    """Sampled stacks in collapsed format, one ``frame;frame count`` line each"""
+    if profile_session is None or profile_session.mode != "sampler":
+        raise HTTPException(status_code=404, detail="No sampler session")
+    return PlainTextResponse(profile_session.collapsed_text())
+
+@app.delete("/debug/profile", dependencies=[Depends(require_admin)])
+async def stop_profile() -> Dict[str, str]:
+    """Stop and discard the current profiling session"""
+    global profile_session
+    if profile_session is not None:
+        profile_session.stop()
+    profile_session = None
+    return {"status": "ok"}
+
 def main():
     """Run the standalone maze game server"""
     import os
+    if sys.argv[1:2] == ["vendor-pyodide"]:
+        vendor_pyodide()
+        return
     port = int(os.environ.get("PORT", PORT))
     host = os.environ.get("HOST", HOST)
     
@@ -2369,13 +2356,18 @@ def main():
     print("🎯 Press Ctrl+C to stop the server")
     print("💾 Using SQLite database for persistent leaderboard storage")
     
+    # Before uvicorn starts, so its startup messages go through the queue too
+    setup_logging()
     try:
+        # AccessLogMiddleware replaces uvicorn's access log; log_config=None
+        # leaves uvicorn's own messages to the queued root handler
         uvicorn.run(
             app,
             host=host,
             port=port,
-            log_level="info",
-            access_log=True
+            log_level=LOG_LEVEL.lower(),
+            access_log=False,
+            log_config=None,
         )
     except KeyboardInterrupt:
         print("\n👋 Server stopped. Thanks for playing!")
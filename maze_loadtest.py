@@ -0,0 +1,257 @@
+"""Load generator for the Maze Runner HTTP API.
+
+Many concurrent async clients, each on its own keep-alive connection, send a
+weighted mix of page loads, leaderboard reads and score submissions, then a
+JSON report of throughput, latency percentiles and error rates is printed.
+
+    python -m maze_loadtest [--clients 64] [--duration 30] [--mix page=1,leaderboard=8,submit=1]
+    python -m maze_loadtest --url http://127.0.0.1:8001 --out report.json
+
+Without --url the app is started under uvicorn on a free localhost port, with a
+throwaway database in a temporary directory, so it runs entirely offline.
+Pointing --url at a real instance posts real (if oddly named) scores.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_MIX = "page=1,leaderboard=8,submit=1"
+OPERATIONS = {
+    "page": ("GET", "/"),
+    "leaderboard": ("GET", "/api/leaderboard"),
+    "submit": ("POST", "/api/submit_score"),
+}
+SERVER_START_TIMEOUT_S = 15.0
+PLAYER_POOL = 500
+
+
+class Connection:
+    """One keep-alive HTTP/1.1 connection speaking just enough of the protocol"""
+
+    def __init__(self, host: str, port: int) -> None:
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: bytes = b"") -> int:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        head = (
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+            f"Accept-Encoding: gzip, br\r\nContent-Length: {len(body)}\r\n"
+        )
+        if body:
+            head += "Content-Type: application/json\r\n"
+        self.writer.write(head.encode() + b"\r\n" + body)
+        status_line = await self.reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self.reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                size = int((await self.reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                await self.reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        else:
+            await self.reader.readexactly(int(headers.get("content-length", "0")))
+        if headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except OSError:
+                pass
+        self.reader = self.writer = None
+
+
+def parse_mix(raw: str) -> Dict[str, float]:
+    mix = {}
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"unknown operation {name!r} (expected {', '.join(OPERATIONS)})")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise ValueError("the mix needs at least one positive weight")
+    return mix
+
+
+def submit_body(rng: random.Random) -> bytes:
+    return json.dumps({
+        "name": f"load-{rng.randrange(PLAYER_POOL)}",
+        "time": round(rng.uniform(5, 300), 2),
+    }).encode()
+
+
+async def run_client(host: str, port: int, mix: Dict[str, float], deadline: float,
+                     seed: int, results: Dict[str, List[Tuple[float, Optional[int]]]]) -> None:
+    """Send requests back to back until the deadline; record (latency, status or None)"""
+    rng = random.Random(seed)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    conn = Connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            op = rng.choices(names, weights)[0]
+            method, path = OPERATIONS[op]
+            body = submit_body(rng) if method == "POST" else b""
+            started = time.perf_counter()
+            try:
+                status = await conn.request(method, path, body)
+            except (OSError, asyncio.IncompleteReadError, ValueError, IndexError):
+                status = None
+                await conn.close()
+            results[op].append((time.perf_counter() - started, status))
+    finally:
+        await conn.close()
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples: List[Tuple[float, Optional[int]]], elapsed: float) -> Dict[str, Any]:
+    latencies = sorted(latency for latency, _ in samples)
+    statuses: Dict[str, int] = {}
+    errors = 0
+    for _, status in samples:
+        key = str(status) if status is not None else "connection_error"
+        statuses[key] = statuses.get(key, 0) + 1
+        if status is None or status >= 400:
+            errors += 1
+    return {
+        "requests": len(samples),
+        "throughput_rps": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "errors": errors,
+        "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        "statuses": statuses,
+        "latency_ms": {
+            name: round(percentile(latencies, pct) * 1000, 2)
+            for name, pct in (("p50", 50), ("p95", 95), ("p99", 99))
+        } | {"max": round(latencies[-1] * 1000, 2) if latencies else 0.0},
+    }
+
+
+async def run_load(host: str, port: int, clients: int, duration: float,
+                   mix: Dict[str, float], seed: int) -> Dict[str, Any]:
+    results: Dict[str, List[Tuple[float, Optional[int]]]] = {op: [] for op in mix}
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        run_client(host, port, mix, deadline, seed + i, results) for i in range(clients)
+    ))
+    elapsed = time.perf_counter() - started
+    everything = [sample for samples in results.values() for sample in samples]
+    report = summarize(everything, elapsed)
+    report["by_operation"] = {op: summarize(samples, elapsed) for op, samples in results.items()}
+    report["elapsed_s"] = round(elapsed, 2)
+    return report
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_local_server(port: int, workdir: str) -> subprocess.Popen:
+    """Run the app under uvicorn with a throwaway working directory (and database)"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(
+        filter(None, [str(Path(__file__).resolve().parent), os.environ.get("PYTHONPATH")])))
+    # Every client shares one address and a small pool of names; measure the
+    # server, not the per-client rate limits (set these to test the limiter)
+    env.setdefault("MAZE_SUBMIT_RATE_PER_IP", "0")
+    env.setdefault("MAZE_SUBMIT_RATE_PER_NAME", "0")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "maze_game_standalone:app",
+         "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning", "--no-access-log"],
+        # Its access log would interleave with the report on stdout
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.monotonic() + SERVER_START_TIMEOUT_S
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"server exited with code {server.returncode}")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("server did not start listening in time")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m maze_loadtest", description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="target an already running instance instead of starting one")
+    parser.add_argument("--clients", type=int, default=64, help="concurrent keep-alive connections")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to run")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="operation weights, e.g. " + DEFAULT_MIX)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", help="also write the JSON report to this file")
+    args = parser.parse_args(argv)
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    server = None
+    workdir = None
+    if args.url:
+        target = urlsplit(args.url)
+        host, port = target.hostname or "127.0.0.1", target.port or 80
+    else:
+        workdir = tempfile.TemporaryDirectory(prefix="maze-loadtest-")
+        host, port = "127.0.0.1", free_port()
+        print(f"🚀 Starting a local server on port {port}", file=sys.stderr)
+        server = start_local_server(port, workdir.name)
+    try:
+        print(f"🔥 {args.clients} clients for {args.duration:g}s, mix {args.mix}", file=sys.stderr)
+        report = asyncio.run(run_load(host, port, args.clients, args.duration, mix, args.seed))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+        if workdir is not None:
+            workdir.cleanup()
+    report = {
+        "target": f"http://{host}:{port}",
+        "clients": args.clients,
+        "duration_s": args.duration,
+        "mix": mix,
+    } | report
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,483 @@
+// Force show controls on mobile devices - JavaScript fallback
+function detectMobile() {
+    const isMobile = /Android|webOS|iPhone|iPad|iPod|BlackBerry|IEMobile|Opera Mini/i.test(navigator.userAgent) ||
+                   ('ontouchstart' in window) ||
+                   (navigator.maxTouchPoints > 0) ||
+                   (window.innerWidth <= 768);
+
+    if (isMobile) {
+        document.documentElement.style.setProperty('--force-mobile-controls', 'grid');
+        document.body.classList.add('mobile-device');
+    }
+}
+
+// Color picker functionality
+function initializeColorPicker() {
+    const colorOptions = document.querySelectorAll('.color-option');
+    const defaultColor = '#22c55e';
+
+    // Set default color as selected
+    document.querySelector(`[data-color="${defaultColor}"]`).classList.add('selected');
+
+    colorOptions.forEach(option => {
+        option.addEventListener('click', function() {
+            // Remove selection from all options
+            colorOptions.forEach(opt => opt.classList.remove('selected'));
+            // Add selection to clicked option
+            this.classList.add('selected');
+
+            // Update the color preview in the player name input if it has a value
+            const nameInput = document.getElementById('player-name');
+            if (nameInput && nameInput.value.trim()) {
+                updatePlayerPreview();
+            }
+        });
+    });
+}
+
+// Shape picker functionality
+function initializeShapePicker() {
+    const shapeOptions = document.querySelectorAll('.shape-option');
+    const defaultShape = 'circle';
+
+    // Set default shape as selected
+    document.querySelector(`[data-shape="${defaultShape}"]`).classList.add('selected');
+
+    shapeOptions.forEach(option => {
+        option.addEventListener('click', function() {
+            // Remove selection from all options
+            shapeOptions.forEach(opt => opt.classList.remove('selected'));
+            // Add selection to clicked option
+            this.classList.add('selected');
+
+            // Update the player preview if name input has a value
+            const nameInput = document.getElementById('player-name');
+            if (nameInput && nameInput.value.trim()) {
+                updatePlayerPreview();
+            }
+        });
+    });
+}
+
+// Update player preview with selected color and shape
+function updatePlayerPreview() {
+    const nameInput = document.getElementById('player-name');
+    const selectedColor = getSelectedColor();
+    const selectedShape = getSelectedShape();
+    const playerName = nameInput.value.trim() || 'Player';
+
+    // Add a small preview next to the input
+    let previewElement = document.getElementById('player-preview');
+    if (!previewElement) {
+        previewElement = document.createElement('div');
+        previewElement.id = 'player-preview';
+        previewElement.style.cssText = 'margin-top: 8px; font-size: 14px; color: #94a3b8; text-align: center;';
+        nameInput.parentNode.insertBefore(previewElement, nameInput.nextSibling);
+    }
+
+    // Create shape symbol based on selection
+    let shapeSymbol = '●'; // default circle
+    if (selectedShape === 'star') shapeSymbol = '★';
+    else if (selectedShape === 'diamond') shapeSymbol = '◆';
+    else if (selectedShape === 'triangle') shapeSymbol = '▲';
+    else if (selectedShape === 'square') shapeSymbol = '■';
+    else if (selectedShape === 'rose') shapeSymbol = '✿';
+
+    previewElement.innerHTML = `<span style="color: ${selectedColor};">${shapeSymbol}</span> ${playerName}`;
+}
+
+// Get selected color
+function getSelectedColor() {
+    const selectedOption = document.querySelector('.color-option.selected');
+    return selectedOption ? selectedOption.dataset.color : '#22c55e';
+}
+
+// Get selected shape
+function getSelectedShape() {
+    const selectedOption = document.querySelector('.shape-option.selected');
+    return selectedOption ? selectedOption.dataset.shape : 'circle';
+}
+
+// Run mobile detection
+detectMobile();
+
+// Initialize color picker
+initializeColorPicker();
+
+// Initialize shape picker
+initializeShapePicker();
+
+// Add name input listener for live preview
+const nameInput = document.getElementById('player-name');
+if (nameInput) {
+    nameInput.addEventListener('input', updatePlayerPreview);
+}
+
+// Re-run on resize
+window.addEventListener('resize', detectMobile);
+
+// Service worker: caches the shell, game code and runtime for offline play
+if ('serviceWorker' in navigator) {
+    window.addEventListener('load', () => {
+        navigator.serviceWorker.register('/sw.js').catch(err => {
+            console.warn('Service worker registration failed:', err);
+        });
+    });
+}
+
+// Offline score queue: runs finished without a connection are kept in
+// IndexedDB and flushed together once the browser is back online
+const SCORE_QUEUE_DB = 'maze-runner';
+const SCORE_QUEUE_STORE = 'pending-scores';
+
+function openScoreQueue() {
+    return new Promise((resolve, reject) => {
+        const request = indexedDB.open(SCORE_QUEUE_DB, 1);
+        request.onupgradeneeded = () => {
+            request.result.createObjectStore(SCORE_QUEUE_STORE, { autoIncrement: true });
+        };
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+function runQueueTransaction(mode, body) {
+    return openScoreQueue().then(db => new Promise((resolve, reject) => {
+        const tx = db.transaction(SCORE_QUEUE_STORE, mode);
+        // body may return a function that collects results once the transaction completes
+        const collect = body(tx.objectStore(SCORE_QUEUE_STORE));
+        tx.oncomplete = () => { db.close(); resolve(typeof collect === 'function' ? collect() : undefined); };
+        tx.onerror = () => { db.close(); reject(tx.error); };
+    }));
+}
+
+window.mazeQueueScore = function (payload) {
+    return runQueueTransaction('readwrite', store => { store.add(payload); });
+};
+
+const SCORE_BATCH_SIZE = 50;
+let scoreQueueFlushing = false;
+window.mazeFlushScoreQueue = async function () {
+    if (scoreQueueFlushing || !navigator.onLine || !('indexedDB' in window)) return;
+    scoreQueueFlushing = true;
+    try {
+        const entries = await runQueueTransaction('readonly', store => {
+            const keys = store.getAllKeys();
+            const values = store.getAll();
+            return () => keys.result.map((key, i) => [key, values.result[i]]);
+        });
+        if (!entries || !entries.length) return;
+        const done = [];
+        // Queued runs go up in batches, one request and one transaction each
+        for (let start = 0; start < entries.length; start += SCORE_BATCH_SIZE) {
+            const batch = entries.slice(start, start + SCORE_BATCH_SIZE);
+            let resp;
+            try {
+                resp = await fetch('/api/submit_scores', {
+                    method: 'POST',
+                    headers: { 'Content-Type': 'application/json' },
+                    body: JSON.stringify(batch.map(([, payload]) => payload)),
+                });
+            } catch (err) {
+                break;  // offline again
+            }
+            // Rate limited, shedding load or failing: keep the rest for the next flush
+            if (!resp.ok) break;
+            const { results } = await resp.json();
+            // Recorded before (run_id) or rejected as invalid: drop; rate limited: keep
+            batch.forEach(([key], i) => { if (results[i].status !== 'rate_limited') done.push(key); });
+            if (results.some(result => result.status === 'rate_limited')) break;
+        }
+        if (done.length) {
+            await runQueueTransaction('readwrite', store => { done.forEach(key => store.delete(key)); });
+            console.log(`Flushed ${done.length} queued score(s)`);
+        }
+    } catch (err) {
+        console.warn('Flushing queued scores failed:', err);
+    } finally {
+        scoreQueueFlushing = false;
+    }
+};
+
+window.addEventListener('online', () => window.mazeFlushScoreQueue());
+window.addEventListener('load', () => window.mazeFlushScoreQueue());
+
+// Boot phase timings (ms since navigation start), kept for comparing runtime sources
+const bootTimings = { phases: {}, source: null, attempts: [] };
+window.MAZE_BOOT_TIMINGS = bootTimings;
+
+// Real user monitoring: boot phases and per-game timings (reported by game.py)
+// are batched and sent with sendBeacon, which survives the page being closed
+const TELEMETRY_URL = '/api/telemetry';
+const TELEMETRY_BATCH_SIZE = 20;
+const telemetryEvents = [];
+
+function flushTelemetry() {
+    if (!telemetryEvents.length || !navigator.sendBeacon) return;
+    const body = JSON.stringify({ mode: bootTimings.mode || 'main', events: telemetryEvents.splice(0) });
+    navigator.sendBeacon(TELEMETRY_URL, new Blob([body], { type: 'application/json' }));
+}
+
+window.mazeTelemetry = function (kind, data) {
+    const event = Object.assign({ kind }, data);
+    // Page open to first move, on the page's clock (a worker's clock starts later)
+    if (kind === 'first_move') event.page_ms = Math.round(performance.now());
+    telemetryEvents.push(event);
+    if (telemetryEvents.length >= TELEMETRY_BATCH_SIZE) flushTelemetry();
+};
+
+document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') flushTelemetry();
+});
+window.addEventListener('pagehide', flushTelemetry);
+
+function markPhase(name, startedAt) {
+    bootTimings.phases[name] = Math.round(performance.now() - startedAt);
+}
+
+function loadScript(src) {
+    return new Promise((resolve, reject) => {
+        const script = document.createElement('script');
+        script.src = src;
+        script.onload = resolve;
+        script.onerror = () => reject(new Error(`Failed to load ${src}`));
+        document.head.appendChild(script);
+    });
+}
+
+function withTimeout(promise, ms, message) {
+    let timer;
+    const timeout = new Promise((_, reject) => {
+        timer = setTimeout(() => reject(new Error(message)), ms);
+    });
+    return Promise.race([promise, timeout]).finally(() => clearTimeout(timer));
+}
+
+// Try each Pyodide source in order (self-hosted first when vendored, then CDN)
+async function loadPyodideRuntime() {
+    const { sources, timeoutMs } = window.MAZE_PYODIDE;
+    let lastError = null;
+    for (const indexURL of sources) {
+        const attemptStart = performance.now();
+        try {
+            await withTimeout(loadScript(indexURL + 'pyodide.js'), timeoutMs, 'Pyodide script load timeout');
+            markPhase('pyodide_script', attemptStart);
+            const runtimeStart = performance.now();
+            const pyodide = await withTimeout(loadPyodide({ indexURL }), timeoutMs, 'Pyodide load timeout');
+            markPhase('pyodide_runtime', runtimeStart);
+            bootTimings.source = indexURL;
+            bootTimings.attempts.push({ indexURL, ok: true, ms: Math.round(performance.now() - attemptStart) });
+            return pyodide;
+        } catch (err) {
+            console.warn(`Pyodide source ${indexURL} failed:`, err);
+            bootTimings.attempts.push({ indexURL, ok: false, ms: Math.round(performance.now() - attemptStart) });
+            lastError = err;
+        }
+    }
+    throw lastError || new Error('No Pyodide source configured');
+}
+
+function fetchGameAsset(url, binary) {
+    return fetch(url).then(resp => {
+        if (!resp.ok) throw new Error(`Failed to fetch game code (${resp.status})`);
+        return binary ? resp.arrayBuffer() : resp.text();
+    });
+}
+
+// Import the precompiled game and engine from the Pyodide FS, or compile the sources
+async function runGame(pyodide, data, isBundle) {
+    if (isBundle) {
+        try {
+            const moduleName = window.MAZE_ASSETS.game_module;
+            pyodide.unpackArchive(data, 'zip', { extractDir: '/home/pyodide/maze' });
+            // Import, then expose the module's names to __main__ where UI
+            // callbacks run their runPythonAsync snippets
+            await pyodide.runPythonAsync(
+                `import sys\nsys.path.insert(0, '/home/pyodide/maze')\nfrom ${moduleName} import *`
+            );
+            bootTimings.gameMode = 'bundle';
+            return;
+        } catch (err) {
+            console.warn('Precompiled game bundle failed, running source instead:', err);
+        }
+    }
+    const [PYTHON_GAME_CODE, engineSource] = await Promise.all([
+        isBundle ? fetchGameAsset(window.MAZE_ASSETS['game.py'], false) : data,
+        fetchGameAsset(window.MAZE_ASSETS['maze_engine.py'], false),
+    ]);
+    // game.py imports the shared engine module
+    pyodide.FS.mkdirTree('/home/pyodide/maze');
+    pyodide.FS.writeFile(`/home/pyodide/maze/${window.MAZE_ASSETS.engine_module}.py`, engineSource);
+    await pyodide.runPythonAsync(`import sys\nsys.path.insert(0, '/home/pyodide/maze')`);
+    await pyodide.runPythonAsync(PYTHON_GAME_CODE);
+    bootTimings.gameMode = 'source';
+}
+
+// Main-thread mode: Pyodide and the game share the page's thread
+async function bootMainThread() {
+    // Fetch the game (precompiled bundle if the server built one, else the
+    // source; both content-hashed and cached forever) alongside the runtime
+    const gameFetchStart = performance.now();
+    const bundleUrl = window.MAZE_ASSETS['game.zip'];
+    const gamePromise = fetchGameAsset(bundleUrl || window.MAZE_ASSETS['game.py'], !!bundleUrl).then(data => {
+        markPhase('game_fetch', gameFetchStart);
+        return data;
+    });
+
+    // Load Pyodide, falling back through the configured sources
+    console.log('Loading Pyodide runtime...');
+    const pyodide = await loadPyodideRuntime();
+
+    console.log('Pyodide loaded successfully');
+    window.pyodide = pyodide;
+
+    console.log('Running Python game code...');
+    const gameRunStart = performance.now();
+    await runGame(pyodide, await gamePromise, !!bundleUrl);
+    markPhase('game_run', gameRunStart);
+}
+
+// Worker mode: Pyodide and the game run in worker.js and draw to an
+// OffscreenCanvas; this thread only applies the UI updates the worker posts
+// and forwards the events it asked for. Opt in with ?worker=1 (or the
+// server's MAZE_WORKER_MODE), opt out with ?worker=0.
+function workerModeRequested() {
+    const param = new URLSearchParams(location.search).get('worker');
+    const wanted = param !== null ? param !== '0' : !!window.MAZE_PYODIDE.workerMode;
+    return wanted && typeof Worker !== 'undefined' && !!window.MAZE_ASSETS['worker.js'] &&
+        'transferControlToOffscreen' in HTMLCanvasElement.prototype;
+}
+
+function forwardEvent(worker, id, evt) {
+    const target = evt.target || {};
+    const payload = {
+        type: evt.type,
+        key: evt.key,
+        target: { id: target.id || '', dataset: Object.assign({}, target.dataset) },
+        form: { name: nameInput ? nameInput.value : '', color: getSelectedColor(), shape: getSelectedShape() },
+    };
+    if (id !== 'document') {
+        payload.scrollTop = evt.currentTarget.scrollTop;
+        payload.clientHeight = evt.currentTarget.clientHeight;
+    }
+    worker.postMessage({ type: 'event', id, event: evt.type, payload });
+}
+
+function applyUiOp(worker, msg) {
+    const el = msg.id === 'document' ? document : document.getElementById(msg.id);
+    if (!el) return;
+    switch (msg.op) {
+        case 'addClass': el.classList.add(msg.value); break;
+        case 'removeClass': el.classList.remove(msg.value); break;
+        case 'prop': el[msg.prop] = msg.value; break;
+        case 'style': el.style[msg.prop] = msg.value; break;
+        case 'listen':
+            el.addEventListener(msg.event, evt => forwardEvent(worker, msg.id, evt), { passive: true });
+            break;
+    }
+}
+
+function bootWorker() {
+    const canvas = document.getElementById('game-canvas');
+    const offscreen = canvas.transferControlToOffscreen();
+    const worker = new Worker(window.MAZE_ASSETS['worker.js']);
+    return new Promise((resolve, reject) => {
+        worker.addEventListener('message', ({ data }) => {
+            switch (data.type) {
+                case 'ui': applyUiOp(worker, data); break;
+                case 'queueScore': window.mazeQueueScore(data.payload).catch(err => console.warn('Queueing score failed:', err)); break;
+                case 'telemetry': window.mazeTelemetry(data.kind, data.data); break;
+                case 'ready':
+                    Object.assign(bootTimings.phases, data.timings.phases);
+                    Object.assign(bootTimings, { source: data.timings.source, attempts: data.timings.attempts, gameMode: data.timings.gameMode });
+                    resolve(worker);
+                    break;
+                case 'error': reject(new Error(data.message)); break;
+            }
+        });
+        worker.addEventListener('error', evt => reject(new Error(evt.message || 'Game worker failed')));
+        worker.postMessage({
+            type: 'init',
+            canvas: offscreen,
+            assets: window.MAZE_ASSETS,
+            pyodide: window.MAZE_PYODIDE,
+            search: location.search,
+        }, [offscreen]);
+    }).catch(err => {
+        worker.terminate();
+        // The transferred canvas can't be drawn from this thread any more
+        canvas.replaceWith(canvas.cloneNode(false));
+        throw err;
+    });
+}
+
+// Enhanced loading with better error handling
+(async () => {
+    const progressBar = document.getElementById('loading-progress');
+    const loadingScreen = document.getElementById('loading-screen');
+    const homeScreen = document.getElementById('home-screen');
+
+    let progress = 0;
+    let progressInterval;
+    const bootStart = performance.now();
+
+    try {
+        console.log('Starting Pyodide initialization...');
+
+        // Start progress simulation
+        progressInterval = setInterval(() => {
+            progress += Math.random() * 5; // Slower progress for real loading
+            if (progress >= 90) progress = 90; // Cap at 90% until actually loaded
+            progressBar.style.width = progress + '%';
+        }, 200);
+
+        if (workerModeRequested()) {
+            try {
+                window.mazeGameWorker = await bootWorker();
+                bootTimings.mode = 'worker';
+            } catch (err) {
+                console.warn('Worker mode failed, running on the main thread:', err);
+            }
+        }
+        if (!bootTimings.mode) {
+            await bootMainThread();
+            bootTimings.mode = 'main';
+        }
+        markPhase('total', bootStart);
+        window.mazeTelemetry('boot', { phases: Object.assign({}, bootTimings.phases), source: bootTimings.source });
+
+        // Complete progress bar
+        clearInterval(progressInterval);
+        progressBar.style.width = '95%';
+
+        console.log(`Game initialized successfully (${bootTimings.mode} thread mode)!`);
+        console.table(bootTimings.phases);
+
+        // Final progress and transition
+        progressBar.style.width = '100%';
+        setTimeout(() => {
+            loadingScreen.classList.remove('active');
+            homeScreen.classList.add('active');
+        }, 500);
+
+    } catch (err) {
+        console.error('Failed to initialize game:', err);
+        clearInterval(progressInterval);
+
+        // Show error to user
+        const loadingCard = loadingScreen.querySelector('.card');
+        loadingCard.innerHTML = `
+            <h1>Maze Runner</h1>
+            <p style="color: #ef4444; margin: 20px 0;">
+                ❌ Failed to load game runtime
+            </p>
+            <p style="font-size: 14px; color: #94a3b8;">
+                Error: ${err.message}<br>
+                Please check your internet connection and try refreshing the page.
+            </p>
+            <button onclick="location.reload()" style="margin-top: 16px;">
+                🔄 Try Again
+            </button>
+        `;
+    }
+})();
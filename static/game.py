@@ -0,0 +1,1106 @@
+# pyright: reportMissingImports=false
+import js
+from js import JSON
+import asyncio
+from math import floor
+import time
+import json
+import gc
+from collections import deque
+from contextlib import contextmanager
+from html import escape
+from pyodide.ffi import create_proxy, to_js
+
+import maze_engine
+from maze_engine import CanvasRenderer, GameCallbacks, GameState, MazeBuild, carve, new_walls, start_game, take_next_maze
+
+# The game runs on the page (main-thread mode) or inside a dedicated Web Worker
+# (worker mode, see worker.js). A worker has no DOM: it draws to an
+# OffscreenCanvas handed over by the page, posts UI changes to the page and
+# receives page events back as messages.
+IN_WORKER = not hasattr(js, "document")
+window = js  # global scope: the page's window or the worker's self
+
+# ------------------------------ Config ------------------------------
+GRID_SIZE = 20               # cells per side
+CELL_PIXELS = 32             # canvas pixels per cell (640px canvas)
+WALL_THICKNESS = 2
+DEFAULT_PLAYER_COLOR = "#22c55e"  # Default color, can be changed
+PATH_COLOR = "#0f172a"
+WALL_COLOR = "#334155"
+START_POS = (0, 0)
+EXIT_POS = (GRID_SIZE - 1, GRID_SIZE - 1)
+# Toggle for animated vs instant maze generation
+USE_ANIMATED_BUILD = False
+ANIMATED_BUILD_MS = 1200       # target length of the animated build, whatever the maze size
+BUILD_FRAME_BUDGET_S = 0.008   # cap on carve/draw work per animation frame
+INPUT_QUEUE_SIZE = 8           # pending moves kept; further key repeats are dropped
+FRAME_STATS_WINDOW = 600       # samples kept for frame-time / input-latency percentiles
+MAZE_ALGORITHM = "dfs"       # generator name, part of the leaderboard key
+# Leaderboard paging / virtualization
+LEADERBOARD_PAGE_SIZE = 50
+LEADERBOARD_ROW_HEIGHT = 42  # px, must match the #leaderboard-body tr CSS height
+LEADERBOARD_OVERSCAN = 10    # rows rendered above/below the visible window
+LEADERBOARD_BOARDS = ("all", "weekly", "daily")
+
+# Backend API base - use current host and port for standalone version
+def _compute_api_base_url() -> str:
+    return f"{window.location.protocol}//{window.location.host}/api"
+
+API_BASE_URL = _compute_api_base_url()
+
+# Optional live race room (?race=<room>): positions are published for spectators
+def _page_param(name: str) -> str:
+    # A worker's location is its script URL; the page passes its query string
+    search = window.mazePageSearch if IN_WORKER else window.location.search
+    params = window.URLSearchParams.new(search)
+    return params.get(name) or ""
+
+RACE_ROOM = _page_param("race")
+# ?debug=memory logs proxy counts and heap size at the start of every game
+DEBUG_MEMORY = _page_param("debug") == "memory"
+
+# ------------------------------ Worker Mode ------------------------------
+# Stand-ins for the few DOM elements the game touches. Writes are posted to
+# the page (app.js applies them); reads come from the values the page sends
+# along with each forwarded event.
+_remote_listeners = {}  # (element id, event type) -> handler
+_remote_form = {}       # home screen choices sent with each event
+
+
+def _post_ui(op: str, el_id: str, **fields) -> None:
+    message = {"type": "ui", "op": op, "id": el_id, **fields}
+    window.postMessage(to_js(message, dict_converter=window.Object.fromEntries))
+
+
+class RemoteClassList:
+    def __init__(self, el_id: str) -> None:
+        self._id = el_id
+
+    def add(self, cls: str) -> None:
+        _post_ui("addClass", self._id, value=cls)
+
+    def remove(self, cls: str) -> None:
+        _post_ui("removeClass", self._id, value=cls)
+
+
+class RemoteStyle:
+    def __init__(self, el_id: str) -> None:
+        object.__setattr__(self, "_id", el_id)
+
+    def __setattr__(self, prop: str, value) -> None:
+        _post_ui("style", self._id, prop=prop, value=value)
+
+
+class RemoteElement:
+    def __init__(self, el_id: str) -> None:
+        self.__dict__.update(id=el_id, classList=RemoteClassList(el_id), style=RemoteStyle(el_id),
+                             scrollTop=0, clientHeight=0, value="")
+
+    def __setattr__(self, prop: str, value) -> None:
+        self.__dict__[prop] = value
+        _post_ui("prop", self.id, prop=prop, value=value)
+
+    def addEventListener(self, event_type: str, handler, options=None) -> None:
+        _remote_listeners[(self.id, event_type)] = handler
+        _post_ui("listen", self.id, event=event_type)
+
+
+class RemoteDocument:
+    def __init__(self) -> None:
+        self._elements = {}
+
+    def getElementById(self, el_id: str) -> RemoteElement:
+        if el_id not in self._elements:
+            self._elements[el_id] = RemoteElement(el_id)
+        return self._elements[el_id]
+
+    def addEventListener(self, event_type: str, handler, options=None) -> None:
+        _remote_listeners[("document", event_type)] = handler
+        _post_ui("listen", "document", event=event_type)
+
+
+def dispatch_remote_event(el_id: str, event_type: str, evt) -> None:
+    # Called by worker.js for every event the page forwards
+    if el_id != "document":
+        scroll_top = getattr(evt, "scrollTop", None)
+        if scroll_top is not None:
+            document.getElementById(el_id).__dict__.update(scrollTop=scroll_top, clientHeight=evt.clientHeight)
+    form = getattr(evt, "form", None)
+    if form is not None:
+        _remote_form.update(color=form.color, shape=form.shape)
+        document.getElementById("player-name").__dict__["value"] = form.name
+    handler = _remote_listeners.get((el_id, event_type))
+    if handler is not None:
+        handler(evt)
+
+
+document = RemoteDocument() if IN_WORKER else js.document
+
+
+def request_frame(callback) -> None:
+    # Workers without requestAnimationFrame fall back to a ~60 Hz timer
+    if hasattr(window, "requestAnimationFrame"):
+        window.requestAnimationFrame(callback)
+    else:
+        window.setTimeout(callback, 16)
+
+
+def selected_player_style() -> tuple:
+    # Colour and shape picked on the home screen (page helpers in app.js)
+    if IN_WORKER:
+        return _remote_form.get("color") or DEFAULT_PLAYER_COLOR, _remote_form.get("shape") or "circle"
+    return window.getSelectedColor(), window.getSelectedShape()
+
+# ------------------------------ State ------------------------------
+state = GameState()
+
+class LeaderboardView:
+    # Rows fetched so far (keyset pages) and the slice currently in the DOM
+    def __init__(self) -> None:
+        self.rows: list = []
+        self.next_cursor: str | None = None
+        self.done: bool = False
+        self.loading: bool = False
+        self.rendered_range: tuple | None = None
+
+lb_view = LeaderboardView()
+lb_board = "all"  # all | weekly | daily
+
+canvas = window.mazeCanvas if IN_WORKER else document.getElementById("game-canvas")
+ctx = canvas.getContext("2d") if canvas else None
+
+timer_el = document.getElementById("timer")
+player_label_el = document.getElementById("player-label")
+win_overlay_el = document.getElementById("win-overlay")
+final_time_el = document.getElementById("final-time")
+final_rank_el = document.getElementById("final-rank")
+leaderboard_body_el = document.getElementById("leaderboard-body")
+leaderboard_loading_el = document.getElementById("leaderboard-loading")
+leaderboard_table_el = document.getElementById("leaderboard-table")
+leaderboard_scroll_el = document.getElementById("leaderboard-scroll")
+board_tabs_el = document.getElementById("board-tabs")
+maze_building_overlay = document.getElementById("maze-building-overlay")
+maze_progress_bar = document.getElementById("maze-progress")
+
+# Screens
+loading_screen = document.getElementById("loading-screen")
+home_screen = document.getElementById("home-screen")
+game_screen = document.getElementById("game-screen")
+leaderboard_screen = document.getElementById("leaderboard-screen")
+
+# Buttons
+start_btn = document.getElementById("start-btn")
+home_leaderboard_btn = document.getElementById("home-leaderboard-btn")
+play_again_btn = document.getElementById("play-again-btn")
+view_leaderboard_btn = document.getElementById("view-leaderboard-btn")
+try_again_btn = document.getElementById("try-again-btn")
+
+btn_up = document.getElementById("btn-up")
+btn_down = document.getElementById("btn-down")
+btn_left = document.getElementById("btn-left")
+btn_right = document.getElementById("btn-right")
+
+# ------------------------------ Proxy Lifetimes ------------------------------
+# JS can only call Python through proxies, which live until destroyed. The
+# page scope owns the long-lived ones (event listeners bound once, the frame
+# loop). A game has no callbacks of its own beyond the animated build's frame
+# proxy, which is destroyed as soon as the build finishes.
+
+class ProxyScope:
+    live = 0  # proxies created and not yet destroyed, across all scopes
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._proxies = {}
+
+    def __setitem__(self, key: str, proxy) -> None:
+        # Replacing a proxy destroys the old one
+        self.release(key)
+        self._proxies[key] = proxy
+        ProxyScope.live += 1
+
+    def __getitem__(self, key: str):
+        return self._proxies[key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._proxies
+
+    def __len__(self) -> int:
+        return len(self._proxies)
+
+    def release(self, key: str) -> None:
+        proxy = self._proxies.pop(key, None)
+        if proxy is not None:
+            proxy.destroy()
+            ProxyScope.live -= 1
+
+    def destroy(self) -> None:
+        for key in list(self._proxies):
+            self.release(key)
+
+    @staticmethod
+    @contextmanager
+    def temporary(fn):
+        # A proxy that lives for one with block, e.g. a callback awaited once
+        proxy = create_proxy(fn)
+        ProxyScope.live += 1
+        try:
+            yield proxy
+        finally:
+            proxy.destroy()
+            ProxyScope.live -= 1
+
+# Keep proxies to prevent garbage collection
+_event_proxies = ProxyScope("page")
+
+
+def memory_report() -> dict:
+    # Live proxy counts and the Pyodide (WebAssembly) heap size, for leak checks
+    try:
+        heap_bytes = window.pyodide._module.HEAPU8.length
+    except Exception:
+        heap_bytes = None
+    return {
+        "page_proxies": len(_event_proxies),
+        "live_proxies": ProxyScope.live,
+        "heap_bytes": heap_bytes,
+        "python_objects": len(gc.get_objects()),
+    }
+
+# ------------------------------ Utility ------------------------------
+
+def show_screen(screen_id: str) -> None:
+    # Smooth transition between screens
+    for s in [loading_screen, home_screen, game_screen, leaderboard_screen]:
+        if s and s.id == screen_id:
+            s.classList.add("active")
+        elif s:
+            s.classList.remove("active")
+
+
+def set_overlay_visible(visible: bool) -> None:
+    if visible:
+        win_overlay_el.classList.remove("hidden")
+        win_overlay_el.classList.add("active")
+    else:
+        win_overlay_el.classList.remove("active")
+        win_overlay_el.classList.add("hidden")
+
+
+def format_time_s(seconds: float) -> str:
+    return f"{seconds:.2f}"
+
+
+
+
+
+def show_loading_state(button, loading: bool = True):
+    # Show/hide loading state on buttons
+    if loading:
+        button.classList.add("loading")
+        button.disabled = True
+    else:
+        button.classList.remove("loading")
+        button.disabled = False
+
+
+# ------------------------------ Maze Generation ------------------------------
+# Generation itself lives in maze_engine (shared with the server); this adds
+# the animated build, which replays a finished build's carve order.
+
+def _carve_steps(build: MazeBuild, walls: dict):
+    # Carve events of the animated build: apply one carve, erase its wall
+    for x, y, direction in build.carves:
+        carve(walls, x, y, direction)
+        erase_wall(x, y, direction)
+        yield
+
+
+async def generate_maze_animated(build: MazeBuild) -> dict:
+    # Replay the carve order over animation frames: each frame erases only
+    # the walls carved since the last one, within a per-frame time budget
+    state.maze_generating = True
+    
+    # Show maze building overlay
+    maze_building_overlay.classList.remove("hidden")
+    
+    walls = new_walls(build.width, build.height)
+    total = len(build.carves)
+    steps = _carve_steps(build, walls)
+    
+    # Draw initial state (every wall standing)
+    draw_maze(walls)
+    
+    done = asyncio.get_event_loop().create_future()
+    started = time.perf_counter()
+    applied = 0
+    
+    def _frame(ts=None):
+        nonlocal applied
+        try:
+            frame_start = time.perf_counter()
+            # Carves due by now to finish in ANIMATED_BUILD_MS, at least one per frame
+            due = int(total * (frame_start - started) * 1000 / ANIMATED_BUILD_MS)
+            due = min(total, max(due, applied + 1))
+            while applied < due:
+                next(steps)
+                applied += 1
+                if applied % 16 == 0 and time.perf_counter() - frame_start >= BUILD_FRAME_BUDGET_S:
+                    break
+            maze_progress_bar.style.width = f"{(applied + 1) / (total + 1) * 100}%"
+            if applied < total:
+                request_frame(frame_proxy)
+            else:
+                done.set_result(None)
+        except Exception as e:
+            done.set_exception(e)
+    
+    with ProxyScope.temporary(_frame) as frame_proxy:
+        request_frame(frame_proxy)
+        await done
+    
+    # One full redraw to tidy the wall corners
+    draw_maze(walls)
+    
+    # Hide overlay and finish
+    maze_building_overlay.classList.add("hidden")
+    state.maze_generating = False
+    return walls
+
+# ------------------------------ Maze Prefetch ------------------------------
+# The next maze is built in idle slices while the home screen or the win
+# overlay is up and parked in state.next_maze, so starting a game does not
+# wait for generation.
+PREFETCH_SLICE_S = 0.004  # slice length where requestIdleCallback is missing (workers)
+
+_maze_prefetch = None  # MazeBuild in progress
+
+
+def request_idle(callback) -> None:
+    if hasattr(window, "requestIdleCallback"):
+        window.requestIdleCallback(callback)
+    else:
+        window.setTimeout(callback, 0)
+
+
+def schedule_maze_prefetch() -> None:
+    global _maze_prefetch
+    if state.next_maze is not None or _maze_prefetch is not None:
+        return
+    _maze_prefetch = MazeBuild(GRID_SIZE, GRID_SIZE)
+    if 'prefetch' not in _event_proxies:
+        _event_proxies['prefetch'] = create_proxy(_prefetch_slice)
+    request_idle(_event_proxies['prefetch'])
+
+
+def _prefetch_slice(deadline=None) -> None:
+    global _maze_prefetch
+    build = _maze_prefetch
+    if build is None:
+        return
+    budget_s = deadline.timeRemaining() / 1000 if deadline is not None else PREFETCH_SLICE_S
+    if build.advance(budget_s):
+        state.next_maze = build
+        _maze_prefetch = None
+    else:
+        request_idle(_event_proxies['prefetch'])
+
+
+def next_maze_build(width: int, height: int) -> MazeBuild:
+    # The prefetched maze if it is ready, else finish (or make) one now
+    global _maze_prefetch
+    build = take_next_maze(state, width, height)
+    if build is None:
+        pending = _maze_prefetch
+        _maze_prefetch = None
+        if pending is not None and (pending.width, pending.height) == (width, height):
+            build = pending
+        else:
+            build = MazeBuild(width, height)
+        build.advance()
+    return build
+
+# ------------------------------ Rendering ------------------------------
+
+renderer = CanvasRenderer(ctx, canvas.width, canvas.height, CELL_PIXELS,
+                          PATH_COLOR, WALL_COLOR, WALL_THICKNESS) if ctx else None
+
+
+def clear_canvas() -> None:
+    if renderer:
+        renderer.clear()
+
+
+def draw_maze(walls: dict) -> None:
+    if renderer:
+        renderer.draw_maze(walls, START_POS, EXIT_POS)
+
+
+def erase_wall(x: int, y: int, direction: str) -> None:
+    if renderer:
+        renderer.erase_wall(x, y, direction)
+
+
+def draw_player(cell_x: int, cell_y: int) -> None:
+    if renderer:
+        renderer.draw_player(cell_x, cell_y, state.player_color, state.player_shape)
+
+# ------------------------------ Game Logic ------------------------------
+
+class BrowserCallbacks(GameCallbacks):
+    # Engine hooks: redraw after a move (on the next frame), win overlay,
+    # race position updates
+    def render(self, _state) -> None:
+        frame_loop.invalidate()
+
+    def won(self, _state) -> None:
+        show_win()
+
+    def moved(self, _state) -> None:
+        publish_race_position()
+
+engine_callbacks = BrowserCallbacks()
+
+
+def can_move_to(from_x: int, from_y: int, dir_str: str) -> bool:
+    return maze_engine.can_move_to(state, from_x, from_y, dir_str)
+
+
+def try_move(dir_str: str) -> None:
+    maze_engine.try_move(state, dir_str, engine_callbacks)
+
+
+def queue_move(dir_str: str) -> None:
+    frame_loop.push_move(dir_str)
+
+
+def check_win() -> None:
+    maze_engine.check_win(state, engine_callbacks)
+
+
+def show_win() -> None:
+    final_time_el.innerText = f"Time: {format_time_s(state.final_time_s)}s"
+    set_overlay_visible(True)
+    schedule_maze_prefetch()
+    report_game_telemetry()
+    # auto submit once
+    if not state.submitted:
+        window.pyodide.runPythonAsync("await submit_score()")
+        state.submitted = True
+
+
+def render() -> None:
+    if state.maze_walls is None:
+        return
+    draw_maze(state.maze_walls)
+    draw_player(state.player_cell[0], state.player_cell[1])
+
+
+# ------------------------------ Telemetry ------------------------------
+# Per-game timings for real user monitoring. The page batches them and sends
+# them to /api/telemetry with navigator.sendBeacon (in worker mode they are
+# posted to the page first: workers have no sendBeacon).
+
+def report_telemetry(kind: str, **fields) -> None:
+    if not hasattr(window, "mazeTelemetry"):
+        return
+    try:
+        window.mazeTelemetry(kind, to_js(fields, dict_converter=window.Object.fromEntries))
+    except Exception as e:
+        print(f"Telemetry failed: {e}")
+
+
+def report_game_telemetry() -> None:
+    frames = frame_loop.game_frame_times.summary()
+    report_telemetry(
+        "game",
+        maze_ms=round(frame_loop.maze_ms, 1),
+        first_render_ms=round(frame_loop.first_render_ms or 0.0, 1),
+        frames=frames["count"],
+        frame_p50=frames.get("p50", 0.0),
+        frame_p95=frames.get("p95", 0.0),
+        frame_p99=frames.get("p99", 0.0),
+        dropped_inputs=frame_loop.game_dropped_inputs,
+    )
+
+
+# ------------------------------ Frame Loop ------------------------------
+# One requestAnimationFrame loop owns the canvas and the timer: each frame it
+# applies every queued move, renders at most once and rewrites the timer only
+# when the displayed value changes. It stops when nothing is left to do.
+
+class RollingStats:
+    def __init__(self, size: int = FRAME_STATS_WINDOW) -> None:
+        self.samples = deque(maxlen=size)
+        self.count = 0
+        self.max_ms = 0.0
+
+    def add(self, value_ms: float) -> None:
+        self.samples.append(value_ms)
+        self.count += 1
+        self.max_ms = max(self.max_ms, value_ms)
+
+    def summary(self) -> dict:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"count": 0}
+        def pct(p):
+            return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))], 2)
+        return {"count": self.count, "p50": pct(0.50), "p95": pct(0.95), "p99": pct(0.99),
+                "max": round(self.max_ms, 2)}
+
+
+class FrameLoop:
+    def __init__(self) -> None:
+        self.inputs = deque()  # (direction, queued at ms)
+        self.dirty = False
+        self.running = False
+        self.timer_text = None
+        self.last_frame_ms = None
+        self.dropped_inputs = 0
+        self.frame_times = RollingStats()
+        self.input_latency = RollingStats()
+        # Reset by begin_game; reported once the game is won
+        self.game_frame_times = RollingStats()
+        self.game_dropped_inputs = 0
+        self.game_started_ms = 0.0
+        self.maze_ms = 0.0
+        self.first_render_ms = None
+        self.first_move_reported = False
+        self._proxy = None
+
+    def push_move(self, direction: str) -> None:
+        if len(self.inputs) >= INPUT_QUEUE_SIZE:
+            self.dropped_inputs += 1
+            self.game_dropped_inputs += 1
+            return
+        self.inputs.append((direction, window.performance.now()))
+        self.start()
+
+    def invalidate(self) -> None:
+        self.dirty = True
+        self.start()
+
+    def reset_timer(self) -> None:
+        self.timer_text = None
+
+    def begin_game(self, started_ms: float, maze_ms: float) -> None:
+        self.game_frame_times = RollingStats()
+        self.game_dropped_inputs = 0
+        self.game_started_ms = started_ms
+        self.maze_ms = maze_ms
+        self.first_render_ms = None
+
+    def start(self) -> None:
+        if self.running:
+            return
+        if self._proxy is None:
+            _event_proxies['frame_loop'] = create_proxy(self._frame)
+            self._proxy = _event_proxies['frame_loop']
+        self.running = True
+        self.last_frame_ms = None
+        request_frame(self._proxy)
+
+    def _frame(self, ts=None) -> None:
+        now = window.performance.now()
+        if self.last_frame_ms is not None:
+            self.frame_times.add(now - self.last_frame_ms)
+            self.game_frame_times.add(now - self.last_frame_ms)
+        self.last_frame_ms = now
+
+        applied = []
+        while self.inputs:
+            direction, queued_at = self.inputs.popleft()
+            if maze_engine.try_move(state, direction, engine_callbacks):
+                applied.append(queued_at)
+        if self.dirty:
+            self.dirty = False
+            render()
+            if self.first_render_ms is None and state.maze_walls is not None:
+                self.first_render_ms = window.performance.now() - self.game_started_ms
+        if applied:
+            done = window.performance.now()
+            for queued_at in applied:
+                self.input_latency.add(done - queued_at)
+            if not self.first_move_reported:
+                # Once per page: the page stamps its own clock on it
+                self.first_move_reported = True
+                report_telemetry("first_move")
+        self._update_timer()
+
+        if self.inputs or self.dirty or (state.start_time_s is not None and not state.finished):
+            request_frame(self._proxy)
+        else:
+            self.running = False
+
+    def _update_timer(self) -> None:
+        if state.start_time_s is None or state.finished:
+            return
+        text = format_time_s(time.time() - state.start_time_s)
+        if text != self.timer_text:
+            self.timer_text = text
+            timer_el.innerText = text
+
+    def stats(self) -> dict:
+        return {"frame_ms": self.frame_times.summary(), "input_latency_ms": self.input_latency.summary(),
+                "dropped_inputs": self.dropped_inputs}
+
+frame_loop = FrameLoop()
+
+
+async def reset_and_start() -> None:
+    # Start new game with animated maze generation
+    if DEBUG_MEMORY:
+        print(f"Memory: {memory_report()}")
+    state.grid_width = GRID_SIZE
+    state.grid_height = GRID_SIZE
+    state.maze_walls = None  # no moves until the new maze is ready
+    state.player_cell = list(START_POS)
+    state.start_time_s = None
+    state.finished = False
+    
+    # Preserve player color and shape when resetting
+    if not state.player_color:
+        state.player_color = DEFAULT_PLAYER_COLOR
+    if not state.player_shape:
+        state.player_shape = "circle"
+    
+    # Create colored player label with selected color and shape
+    shape_symbols = {"circle": "●", "star": "★", "diamond": "◆", "triangle": "▲", "square": "■", "rose": "✿"}
+    shape_symbol = shape_symbols.get(state.player_shape, "●")
+    player_label_el.innerHTML = f'<span style="color: {state.player_color};">{shape_symbol}</span> {state.player_name}'
+    timer_el.innerText = "00.00"
+    if final_rank_el:
+        final_rank_el.innerText = ""
+    set_overlay_visible(False)
+    
+    # Take the prefetched maze (animated builds replay its carve order)
+    game_started_ms = window.performance.now()
+    build = next_maze_build(state.grid_width, state.grid_height)
+    try:
+        if USE_ANIMATED_BUILD:
+            walls = await generate_maze_animated(build)
+        else:
+            walls = build.walls
+    except Exception:
+        # Fall back to the finished maze if the animation fails
+        walls = build.walls
+    start_game(state, walls, state.grid_width, state.grid_height)
+    
+    # The frame loop draws the maze and keeps the timer running
+    frame_loop.begin_game(game_started_ms, window.performance.now() - game_started_ms)
+    frame_loop.inputs.clear()
+    frame_loop.reset_timer()
+    frame_loop.invalidate()
+    open_race_socket()
+    publish_race_position()
+
+# ------------------------------ Input Handlers ------------------------------
+
+def on_keydown(evt):
+    key = evt.key.lower()
+    if key in ['arrowup', 'w']:
+        queue_move('N')
+    elif key in ['arrowdown', 's']:
+        queue_move('S')
+    elif key in ['arrowleft', 'a']:
+        queue_move('W')
+    elif key in ['arrowright', 'd']:
+        queue_move('E')
+
+
+async def on_start_click(_e=None):
+    if _e and hasattr(_e, 'preventDefault'):
+        _e.preventDefault()
+    name_input = document.getElementById('player-name')
+    state.player_name = (name_input.value or 'Player').strip()
+    
+    # Get selected color and shape from JavaScript
+    try:
+        state.player_color, state.player_shape = selected_player_style()
+    except Exception:
+        # Fallback to defaults if JavaScript fails
+        state.player_color = DEFAULT_PLAYER_COLOR
+        state.player_shape = "circle"
+    
+    show_screen('game-screen')
+    
+    # Show loading state on start button
+    if start_btn:
+        show_loading_state(start_btn, True)
+    
+    try:
+        await reset_and_start()
+    except Exception:
+        # Fallback to synchronous version if async fails
+        reset_and_start()
+    finally:
+        # Hide loading state
+        if start_btn:
+            show_loading_state(start_btn, False)
+
+
+def on_start_click_sync(_e=None):
+    # Synchronous fallback for start button
+    if _e and hasattr(_e, 'preventDefault'):
+        _e.preventDefault()
+    name_input = document.getElementById('player-name')
+    state.player_name = (name_input.value or 'Player').strip()
+    
+    # Get selected color and shape from JavaScript
+    try:
+        state.player_color, state.player_shape = selected_player_style()
+    except Exception:
+        # Fallback to defaults if JavaScript fails
+        state.player_color = DEFAULT_PLAYER_COLOR
+        state.player_shape = "circle"
+    
+    show_screen('game-screen')
+    reset_and_start()
+
+
+def reset_leaderboard_state():
+    # Reset leaderboard to initial state
+    reset_leaderboard_view()
+    if leaderboard_loading_el:
+        leaderboard_loading_el.classList.add("hidden")
+    if leaderboard_table_el:
+        leaderboard_table_el.classList.remove("hidden")
+    if leaderboard_body_el:
+        leaderboard_body_el.innerHTML = ""
+
+
+def on_play_again(_e=None):
+    show_screen('home-screen')
+    set_overlay_visible(False)
+    reset_leaderboard_state()
+    schedule_maze_prefetch()
+
+
+async def on_try_again(_e=None):
+    set_overlay_visible(False)
+    await reset_and_start()
+
+
+def on_try_again_sync(_e=None):
+    # Synchronous fallback for try again button
+    set_overlay_visible(False)
+    reset_and_start()
+
+async def on_view_leaderboard(_e=None):
+    # Load leaderboard with loading state
+    # Ensure elements exist before proceeding
+    if not leaderboard_loading_el or not leaderboard_table_el:
+        print("Leaderboard elements not found")
+        show_screen('leaderboard-screen')
+        return
+    
+    print("Showing leaderboard loading state...")
+    # Show loading state
+    leaderboard_loading_el.classList.remove("hidden")
+    leaderboard_table_el.classList.add("hidden")
+    # Also toggle inline styles as a safety net
+    leaderboard_loading_el.style.display = ""
+    leaderboard_table_el.style.display = "none"
+    
+    # Load the leaderboard data
+    await load_leaderboard()
+    
+    print("Leaderboard loaded, hiding loading state...")
+    # Hide loading, show table with a small delay to ensure smooth transition
+    await asyncio.sleep(0.1)
+    
+    # Hide loading, show table
+    leaderboard_loading_el.classList.add("hidden")
+    leaderboard_table_el.classList.remove("hidden")
+    # Also toggle inline styles as a safety net
+    leaderboard_loading_el.style.display = "none"
+    leaderboard_table_el.style.display = ""
+    print("Loading state hidden, table shown")
+    
+    show_screen('leaderboard-screen')
+
+# ------------------------------ Leaderboard ------------------------------
+async def submit_score(_e=None):
+    if _e and hasattr(_e, 'preventDefault'):
+        _e.preventDefault()
+    
+    # Show loading state on submit button if available
+    if view_leaderboard_btn:
+        show_loading_state(view_leaderboard_btn, True)
+    
+    payload = {
+        "name": state.player_name or "Player",
+        "time": round(state.final_time_s, 2),
+        "grid_size": state.grid_width,
+        "algorithm": MAZE_ALGORITHM,
+        "run_id": state.run_id,
+    }
+    url = f"{API_BASE_URL}/submit_score"
+    js_payload = to_js(payload, dict_converter=window.Object.fromEntries)
+    body_str = JSON.stringify(js_payload)
+    headers = {"Content-Type": "application/json", "Idempotency-Key": state.run_id}
+    opts = {"method": "POST", "headers": headers, "body": body_str}
+    opts_js = to_js(opts, dict_converter=window.Object.fromEntries)
+    
+    try:
+        if not window.navigator.onLine:
+            raise ConnectionError("offline")
+        resp = await window.fetch(url, opts_js)
+        # regardless of result, we don't block UI; leaderboard load happens when requested
+        if resp.ok:
+            await load_rank(payload["name"], payload["time"])
+        elif resp.status in (429, 503):
+            # Rate limited or the server is shedding load: retry with the offline queue
+            raise ConnectionError(f"server busy ({resp.status})")
+    except Exception as e:
+        # Offline (or network failure): queue the run, it is flushed when back online
+        print(f"Queueing score for later submission: {e}")
+        try:
+            await window.mazeQueueScore(js_payload)
+        except Exception as queue_error:
+            print(f"Error queueing score: {queue_error}")
+    finally:
+        # Hide loading state
+        if view_leaderboard_btn:
+            show_loading_state(view_leaderboard_btn, False)
+
+def board_query() -> str:
+    # Maze configuration this client plays, so it only sees comparable runs
+    return f"grid={GRID_SIZE}&algorithm={MAZE_ALGORITHM}"
+
+async def load_rank(name: str, time_val: float):
+    # Show where this run places on the leaderboard in the win overlay
+    if not final_rank_el:
+        return
+    query = f"name={window.encodeURIComponent(name)}&time={time_val}&{board_query()}"
+    try:
+        resp = await window.fetch(f"{API_BASE_URL}/rank?{query}")
+        if not resp.ok:
+            return
+        data = json.loads(await resp.text())
+    except Exception as e:
+        print(f"Error loading rank: {e}")
+        return
+    final_rank_el.innerText = f"Rank #{data['rank']} of {data['total']} · faster than {data['percentile']:.1f}% of players"
+
+async def fetch_leaderboard_page() -> bool:
+    # Fetch the next keyset page and append it to lb_view.rows
+    if lb_view.loading or lb_view.done:
+        return True
+    url = f"{API_BASE_URL}/leaderboard?limit={LEADERBOARD_PAGE_SIZE}&board={lb_board}&{board_query()}"
+    if lb_view.next_cursor:
+        url += f"&after={lb_view.next_cursor}"
+    lb_view.loading = True
+    try:
+        resp = await window.fetch(url)
+        raw = await resp.text()
+        if not resp.ok:
+            print(f"Leaderboard fetch failed. Raw response: {raw[:200]}")
+            return False
+        data = json.loads(raw)
+        cursor = resp.headers.get("X-Next-Cursor")
+    finally:
+        lb_view.loading = False
+
+    for item in data:
+        # item may be JS object or dict after JSON parse; use .get defensively
+        try:
+            name = item.get('name', 'Player')
+            time_val = float(item.get('time', 9999))
+        except Exception:
+            # Fallback if item is not a dict-like
+            name = str(item['name']) if 'name' in item else 'Player'
+            time_val = float(item['time']) if 'time' in item else 9999.0
+        lb_view.rows.append((name, time_val))
+    lb_view.next_cursor = cursor
+    lb_view.done = not cursor
+    return True
+
+
+def _leaderboard_spacer(height_px: int) -> str:
+    return f'<tr class="lb-spacer"><td colspan=3 style="height: {height_px}px"></td></tr>'
+
+
+def render_leaderboard_rows(force: bool = False) -> None:
+    # Only the rows in (and near) the scroll viewport are put in the DOM
+    if not leaderboard_body_el:
+        return
+    total = len(lb_view.rows)
+    scroll_top = leaderboard_scroll_el.scrollTop if leaderboard_scroll_el else 0
+    viewport = leaderboard_scroll_el.clientHeight if leaderboard_scroll_el else 0
+    if not viewport:
+        viewport = getattr(window, "innerHeight", 0) or LEADERBOARD_PAGE_SIZE * LEADERBOARD_ROW_HEIGHT
+    first = max(0, int(scroll_top // LEADERBOARD_ROW_HEIGHT) - LEADERBOARD_OVERSCAN)
+    last = min(total, int((scroll_top + viewport) // LEADERBOARD_ROW_HEIGHT) + 1 + LEADERBOARD_OVERSCAN)
+    if not force and lb_view.rendered_range == (first, last):
+        return
+    lb_view.rendered_range = (first, last)
+
+    rows_html = []
+    if first > 0:
+        rows_html.append(_leaderboard_spacer(first * LEADERBOARD_ROW_HEIGHT))
+    for idx in range(first, last):
+        name, time_val = lb_view.rows[idx]
+        rows_html.append(f"<tr><td>{idx + 1}</td><td>{escape(name)}</td><td>{time_val:.2f}</td></tr>")
+    if last < total:
+        rows_html.append(_leaderboard_spacer((total - last) * LEADERBOARD_ROW_HEIGHT))
+    leaderboard_body_el.innerHTML = "".join(rows_html)
+
+
+async def load_more_leaderboard():
+    if await fetch_leaderboard_page():
+        render_leaderboard_rows(force=True)
+
+
+def on_leaderboard_scroll(_e=None):
+    render_leaderboard_rows()
+    # Prefetch the next page once the viewport gets near the last loaded row
+    if lb_view.done or lb_view.loading or not lb_view.rendered_range:
+        return
+    if lb_view.rendered_range[1] >= len(lb_view.rows) - LEADERBOARD_OVERSCAN:
+        window.pyodide.runPythonAsync("await load_more_leaderboard()")
+
+
+async def on_board_tab_click(evt):
+    # Switch between all-time / weekly / daily boards
+    global lb_board
+    board = evt.target.dataset.board
+    if not board or board == lb_board:
+        return
+    lb_board = board
+    for tab_board in LEADERBOARD_BOARDS:
+        tab = document.getElementById(f"board-tab-{tab_board}")
+        if not tab:
+            continue
+        if tab_board == board:
+            tab.classList.add("active")
+        else:
+            tab.classList.remove("active")
+    await load_leaderboard()
+
+
+def reset_leaderboard_view():
+    global lb_view
+    lb_view = LeaderboardView()
+    if leaderboard_scroll_el:
+        leaderboard_scroll_el.scrollTop = 0
+
+
+async def load_leaderboard():
+    # Load the first leaderboard page with proper error handling
+    # Clear previous data
+    reset_leaderboard_view()
+    if leaderboard_body_el:
+        leaderboard_body_el.innerHTML = ""
+    
+    try:
+        ok = await fetch_leaderboard_page()
+        if not ok:
+            # Retry once after brief delay (handles transient reloads)
+            await asyncio.sleep(0.2)
+            ok = await fetch_leaderboard_page()
+            if not ok:
+                if leaderboard_body_el:
+                    leaderboard_body_el.innerHTML = "<tr><td colspan=3>Error loading leaderboard.</td></tr>"
+                return
+    except Exception as e:
+        print(f"Error loading leaderboard: {e}")
+        if leaderboard_body_el:
+            leaderboard_body_el.innerHTML = "<tr><td colspan=3>Error loading leaderboard.</td></tr>"
+        return
+    
+    if not lb_view.rows:
+        if leaderboard_body_el:
+            leaderboard_body_el.innerHTML = "<tr><td colspan=3>No scores yet.</td></tr>"
+        return
+    
+    render_leaderboard_rows(force=True)
+
+def initialize_leaderboard_state():
+    # Initialize leaderboard to default state
+    if leaderboard_loading_el:
+        leaderboard_loading_el.classList.add("hidden")
+    if leaderboard_table_el:
+        leaderboard_table_el.classList.remove("hidden")
+    if leaderboard_body_el:
+        leaderboard_body_el.innerHTML = ""
+
+
+# ------------------------------ Race ------------------------------
+_race_socket = None
+
+def open_race_socket():
+    # Connect once per page; the server keeps one entry per player name
+    global _race_socket
+    if not RACE_ROOM or _race_socket is not None:
+        return
+    ws_protocol = "wss:" if window.location.protocol == "https:" else "ws:"
+    room = window.encodeURIComponent(RACE_ROOM)
+    _race_socket = window.WebSocket.new(f"{ws_protocol}//{window.location.host}/ws/race/{room}")
+    _event_proxies['race_open'] = create_proxy(lambda e: publish_race_position())
+    _race_socket.addEventListener('open', _event_proxies['race_open'])
+
+
+def publish_race_position():
+    if _race_socket is None or _race_socket.readyState != 1:
+        return
+    x, y = state.player_cell
+    payload = {"name": state.player_name or "Player", "x": x, "y": y, "finished": state.finished}
+    _race_socket.send(json.dumps(payload))
+
+# ------------------------------ Init ------------------------------
+
+def bind_controls():
+    # Keyboard
+    _event_proxies['keydown'] = create_proxy(on_keydown)
+    document.addEventListener('keydown', _event_proxies['keydown'])
+    # Clicks (fallback if app loaded before JS boot)
+    if btn_up: _event_proxies['btn_up'] = create_proxy(lambda e: queue_move('N')); btn_up.addEventListener('click', _event_proxies['btn_up'])
+    if btn_down: _event_proxies['btn_down'] = create_proxy(lambda e: queue_move('S')); btn_down.addEventListener('click', _event_proxies['btn_down'])
+    if btn_left: _event_proxies['btn_left'] = create_proxy(lambda e: queue_move('W')); btn_left.addEventListener('click', _event_proxies['btn_left'])
+    if btn_right: _event_proxies['btn_right'] = create_proxy(lambda e: queue_move('E')); btn_right.addEventListener('click', _event_proxies['btn_right'])
+
+
+def bind_ui():
+    if IN_WORKER:
+        _event_proxies['dispatch'] = create_proxy(dispatch_remote_event)
+        window.mazeDispatchEvent = _event_proxies['dispatch']
+    # Console hook: mazeFrameStats() -> frame-time / input-latency percentiles
+    _event_proxies['frame_stats'] = create_proxy(
+        lambda: to_js(frame_loop.stats(), dict_converter=window.Object.fromEntries))
+    window.mazeFrameStats = _event_proxies['frame_stats']
+    # Console hook: mazeMemory() -> live proxy counts and Pyodide heap size
+    _event_proxies['memory'] = create_proxy(
+        lambda: to_js(memory_report(), dict_converter=window.Object.fromEntries))
+    window.mazeMemory = _event_proxies['memory']
+    if start_btn:
+        _event_proxies['start'] = create_proxy(lambda e: window.pyodide.runPythonAsync("await on_start_click()"))
+        start_btn.addEventListener('click', _event_proxies['start'])
+    if home_leaderboard_btn:
+        _event_proxies['home_lb'] = create_proxy(lambda e: window.pyodide.runPythonAsync("await on_view_leaderboard()"))
+        home_leaderboard_btn.addEventListener('click', _event_proxies['home_lb'])
+    if play_again_btn:
+        _event_proxies['play_again'] = create_proxy(on_play_again)
+        play_again_btn.addEventListener('click', _event_proxies['play_again'])
+    if view_leaderboard_btn:
+        _event_proxies['view_lb'] = create_proxy(lambda e: window.pyodide.runPythonAsync("await on_view_leaderboard()"))
+        view_leaderboard_btn.addEventListener('click', _event_proxies['view_lb'])
+    if try_again_btn:
+        _event_proxies['try_again'] = create_proxy(lambda e: window.pyodide.runPythonAsync("await on_try_again()"))
+        try_again_btn.addEventListener('click', _event_proxies['try_again'])
+    if board_tabs_el:
+        _event_proxies['board_tabs'] = create_proxy(on_board_tab_click)
+        board_tabs_el.addEventListener('click', _event_proxies['board_tabs'])
+    if leaderboard_scroll_el:
+        _event_proxies['lb_scroll'] = create_proxy(on_leaderboard_scroll)
+        leaderboard_scroll_el.addEventListener('scroll', _event_proxies['lb_scroll'], to_js({"passive": True}, dict_converter=window.Object.fromEntries))
+    bind_controls()
+    
+    # Initialize leaderboard state
+    initialize_leaderboard_state()
+
+bind_ui()
+show_screen('home-screen')
+schedule_maze_prefetch()
@@ -0,0 +1,73 @@
+// Maze Runner service worker: offline play and instant repeat launches.
+// The server fills in CACHE_VERSION (hash of the HTML shell, which names every
+// content-hashed asset) and the precache lists when it starts.
+const CACHE_VERSION = '{{cache_version}}';
+const SHELL_CACHE = `maze-shell-${CACHE_VERSION}`;
+const ASSET_CACHE = `maze-assets-${CACHE_VERSION}`;
+const SHELL_URLS = ['/'];
+const ASSET_URLS = {{asset_urls_json}};
+// URL prefixes whose responses never change (hashed assets, versioned runtime)
+const IMMUTABLE_PREFIXES = {{immutable_prefixes_json}}.map(prefix => new URL(prefix, self.location.href).href);
+
+self.addEventListener('install', event => {
+    event.waitUntil((async () => {
+        const shell = await caches.open(SHELL_CACHE);
+        await shell.addAll(SHELL_URLS);
+        const assets = await caches.open(ASSET_CACHE);
+        await assets.addAll(ASSET_URLS);
+        await self.skipWaiting();
+    })());
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil((async () => {
+        const keep = new Set([SHELL_CACHE, ASSET_CACHE]);
+        for (const name of await caches.keys()) {
+            if (name.startsWith('maze-') && !keep.has(name)) {
+                await caches.delete(name);
+            }
+        }
+        await self.clients.claim();
+    })());
+});
+
+// HTML shell: answer from cache immediately, refresh it in the background
+async function staleWhileRevalidate(request, event) {
+    const cache = await caches.open(SHELL_CACHE);
+    const cached = await cache.match('/');
+    const refresh = fetch(request).then(response => {
+        if (response.ok) cache.put('/', response.clone());
+        return response;
+    });
+    if (cached) {
+        event.waitUntil(refresh.catch(() => {}));
+        return cached;
+    }
+    return refresh;
+}
+
+// Hashed assets and the Pyodide runtime: cache first, fill the cache on miss
+async function cacheFirst(request) {
+    const cache = await caches.open(ASSET_CACHE);
+    const cached = await cache.match(request.url);
+    if (cached) return cached;
+    const response = await fetch(request);
+    if (response.ok || response.type === 'opaque') {
+        cache.put(request.url, response.clone());
+    }
+    return response;
+}
+
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    if (request.method !== 'GET') return;
+    const url = new URL(request.url);
+    if (request.mode === 'navigate' && url.origin === self.location.origin && url.pathname === '/') {
+        event.respondWith(staleWhileRevalidate(request, event));
+        return;
+    }
+    if (IMMUTABLE_PREFIXES.some(prefix => request.url.startsWith(prefix))) {
+        event.respondWith(cacheFirst(request));
+    }
+    // Everything else (the API) goes straight to the network
+});
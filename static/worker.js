@@ -0,0 +1,117 @@
+// Maze Runner game worker: runs Pyodide and the game off the main thread.
+// The page transfers #game-canvas as an OffscreenCanvas and forwards input
+// and button events; the game posts UI updates back (see the Worker Mode
+// section in game.py and the worker boot path in app.js).
+const bootTimings = { phases: {}, source: null, attempts: [] };
+
+function markPhase(name, startedAt) {
+    bootTimings.phases[name] = Math.round(performance.now() - startedAt);
+}
+
+function withTimeout(promise, ms, message) {
+    let timer;
+    const timeout = new Promise((_, reject) => {
+        timer = setTimeout(() => reject(new Error(message)), ms);
+    });
+    return Promise.race([promise, timeout]).finally(() => clearTimeout(timer));
+}
+
+// Same source order as the main-thread boot: self-hosted first, then CDN
+async function loadPyodideRuntime(config) {
+    let lastError = null;
+    for (const indexURL of config.sources) {
+        const attemptStart = performance.now();
+        try {
+            importScripts(indexURL + 'pyodide.js');
+            markPhase('pyodide_script', attemptStart);
+            const runtimeStart = performance.now();
+            const pyodide = await withTimeout(loadPyodide({ indexURL }), config.timeoutMs, 'Pyodide load timeout');
+            markPhase('pyodide_runtime', runtimeStart);
+            bootTimings.source = indexURL;
+            bootTimings.attempts.push({ indexURL, ok: true, ms: Math.round(performance.now() - attemptStart) });
+            return pyodide;
+        } catch (err) {
+            console.warn(`Pyodide source ${indexURL} failed:`, err);
+            bootTimings.attempts.push({ indexURL, ok: false, ms: Math.round(performance.now() - attemptStart) });
+            lastError = err;
+        }
+    }
+    throw lastError || new Error('No Pyodide source configured');
+}
+
+function fetchGameAsset(url, binary) {
+    return fetch(url).then(resp => {
+        if (!resp.ok) throw new Error(`Failed to fetch game code (${resp.status})`);
+        return binary ? resp.arrayBuffer() : resp.text();
+    });
+}
+
+async function runGame(pyodide, assets, data, isBundle) {
+    if (isBundle) {
+        try {
+            pyodide.unpackArchive(data, 'zip', { extractDir: '/home/pyodide/maze' });
+            await pyodide.runPythonAsync(
+                `import sys\nsys.path.insert(0, '/home/pyodide/maze')\nfrom ${assets.game_module} import *`
+            );
+            bootTimings.gameMode = 'bundle';
+            return;
+        } catch (err) {
+            console.warn('Precompiled game bundle failed, running source instead:', err);
+        }
+    }
+    const [source, engineSource] = await Promise.all([
+        isBundle ? fetchGameAsset(assets['game.py'], false) : data,
+        fetchGameAsset(assets['maze_engine.py'], false),
+    ]);
+    pyodide.FS.mkdirTree('/home/pyodide/maze');
+    pyodide.FS.writeFile(`/home/pyodide/maze/${assets.engine_module}.py`, engineSource);
+    await pyodide.runPythonAsync(`import sys\nsys.path.insert(0, '/home/pyodide/maze')`);
+    await pyodide.runPythonAsync(source);
+    bootTimings.gameMode = 'source';
+}
+
+async function boot({ canvas, assets, pyodide: pyodideConfig, search }) {
+    const bootStart = performance.now();
+    // Read by game.py in worker mode
+    self.mazeCanvas = canvas;
+    self.mazePageSearch = search;
+    // IndexedDB lives with the page's queue code; hand offline runs to it
+    self.mazeQueueScore = payload => {
+        self.postMessage({ type: 'queueScore', payload });
+        return Promise.resolve();
+    };
+    // No sendBeacon in workers: the page batches and sends telemetry
+    self.mazeTelemetry = (kind, data) => {
+        self.postMessage({ type: 'telemetry', kind, data });
+    };
+
+    const gameFetchStart = performance.now();
+    const bundleUrl = assets['game.zip'];
+    const gamePromise = fetchGameAsset(bundleUrl || assets['game.py'], !!bundleUrl).then(data => {
+        markPhase('game_fetch', gameFetchStart);
+        return data;
+    });
+    const pyodide = await loadPyodideRuntime(pyodideConfig);
+    self.pyodide = pyodide;
+
+    const gameRunStart = performance.now();
+    await runGame(pyodide, assets, await gamePromise, !!bundleUrl);
+    markPhase('game_run', gameRunStart);
+    markPhase('worker_total', bootStart);
+}
+
+self.addEventListener('message', async ({ data }) => {
+    if (data.type === 'event') {
+        // Events sent before the game is up are dropped (the page is still loading)
+        if (self.mazeDispatchEvent) self.mazeDispatchEvent(data.id, data.event, data.payload);
+        return;
+    }
+    if (data.type === 'init') {
+        try {
+            await boot(data);
+            self.postMessage({ type: 'ready', timings: bootTimings });
+        } catch (err) {
+            self.postMessage({ type: 'error', message: String((err && err.message) || err) });
+        }
+    }
+});
@@ -0,0 +1,69 @@
+"""Boards served from a database created before the per-configuration rollups"""
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+import pytest
+from fastapi.testclient import TestClient
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    """The server, imported against a database with only the original ``scores`` table"""
+    monkeypatch.chdir(tmp_path)
+    conn = sqlite3.connect("leaderboard.db")
+    conn.execute('''
+        CREATE TABLE scores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            time REAL NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.executemany(
+        "INSERT INTO scores (name, time, created_at) VALUES (?, ?, ?)",
+        [("ada", 12.5, "2026-10-18 09:00:00"), ("bob", 9.25, "2026-10-18 10:00:00"),
+         ("ada", 8.0, "2026-10-12 10:00:00"), ("cy", 30.0, "2026-10-18 11:00:00")],
+    )
+    conn.commit()
+    conn.close()
+    sys.modules.pop("maze_game_standalone", None)
+    import maze_game_standalone
+    yield maze_game_standalone
+    sys.modules.pop("maze_game_standalone", None)
+
+
+EXPECTED_ALL = [{"name": "ada", "time": 8.0}, {"name": "bob", "time": 9.25}, {"name": "cy", "time": 30.0}]
+EXPECTED_DAY = [{"name": "bob", "time": 9.25}, {"name": "ada", "time": 12.5}, {"name": "cy", "time": 30.0}]
+
+
+def read_boards(client):
+    assert client.get("/api/leaderboard").json() == EXPECTED_ALL
+    page = client.get("/api/leaderboard?limit=1")
+    assert page.json() == EXPECTED_ALL[:1]
+    assert client.get(f"/api/leaderboard?after={page.headers['X-Next-Cursor']}").json() == EXPECTED_ALL[1:]
+    assert client.get("/api/leaderboard?board=daily&period=2026-10-18").json() == EXPECTED_DAY
+    assert client.get("/api/leaderboard?board=weekly&period=2026-W42").json() == EXPECTED_ALL
+    assert client.get("/api/leaderboard?board=weekly&period=2026-W41").json() == []
+    rank = client.get("/api/rank?name=dee&time=10").json()
+    assert (rank["rank"], rank["total"]) == (3, 4)
+    rank = client.get("/api/rank?name=ada&time=10").json()
+    assert (rank["rank"], rank["total"]) == (2, 3)
+
+
+def test_boards_before_migration(server):
+    # Without the lifespan the background migration never starts
+    assert not server.board_migration.done
+    read_boards(TestClient(server.app))
+
+
+def test_boards_after_migration(server):
+    with TestClient(server.app) as client:
+        deadline = time.monotonic() + 5
+        while not server.board_migration.done and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert server.board_migration.done
+        read_boards(client)